@@ -1,5 +1,16 @@
+import io
+from datetime import date
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from UI.memory_cache import estimate_size
+from UI.statistics_store import StatisticsStore
+
+
 class AppState(dict):
-    """Модифицированный словарь.
+    """Модифицированный словарь (параметры моделей пакетного запуска, см. main_batch.make_params).
 
     К атрибутам можно обращаться как через object.attr, так и через object['attr'].
 
@@ -10,29 +21,129 @@ class AppState(dict):
         f_name = m['first_name'] # То же самое
     """
 
-    def __init__(self, *args, **kwargs):
-        super(AppState, self).__init__(*args, **kwargs)
-        for arg in args:
-            if isinstance(arg, dict):
-                for k, v in arg.items():
-                    self[k] = v
-        if kwargs:
-            for k, v in kwargs.items():
-                self[k] = v
-
     def __getattr__(self, attr):
         return self.get(attr)
 
     def __setattr__(self, key, value):
         self.__setitem__(key, value)
 
-    def __setitem__(self, key, value):
-        super(AppState, self).__setitem__(key, value)
-        self.__dict__.update({key: value})
-
     def __delattr__(self, item):
         self.__delitem__(item)
 
-    def __delitem__(self, key):
-        super(AppState, self).__delitem__(key)
-        del self.__dict__[key]
+
+class RunState:
+    """Состояние программы после расчета (session.state, результат пакетного запуска и воркера).
+
+    Набор полей фиксирован (__slots__), поля, которые еще не заданы, равны None.
+    Для совместимости к полям можно обращаться как через state.attr, так и через state['attr'].
+
+    Example:
+        state = RunState(was_date_start=date(2021, 1, 1))
+        state['run_id'] = uuid.uuid4().hex
+        date_start = state.was_date_start
+    """
+
+    adapt_params: Optional[Dict[str, Any]]
+    buffer: Optional[io.BytesIO]
+    coeff_f: Optional[pd.DataFrame]
+    CRM_influence_R: Optional[float]
+    ensemble_interval: Optional[pd.DataFrame]
+    exclude_wells: Optional[List[str]]
+    fingerprints: Optional[Dict[str, str]]
+    job_id: Optional[int]
+    models_weights: Optional[Dict[str, Any]]
+    preprocessor_key: Optional[tuple]
+    run_id: Optional[str]
+    selected_wells_norm: Optional[List[str]]
+    selected_wells_ois: Optional[List[int]]
+    statistics: Optional[StatisticsStore]
+    statistics_another_models: Optional[str]
+    statistics_test_index: Optional[pd.DatetimeIndex]
+    statistics_test_only: Optional[Mapping[str, pd.DataFrame]]
+    was_calc_CRM: Optional[bool]
+    was_calc_ensemble: Optional[bool]
+    was_calc_ftor: Optional[bool]
+    was_calc_shelf: Optional[bool]
+    was_calc_wolfram: Optional[bool]
+    was_config: Any
+    was_date_end: Optional[date]
+    was_date_start: Optional[date]
+    was_date_test: Optional[date]
+    was_date_test_if_ensemble: Optional[date]
+    wellnames_key_normal: Optional[Dict[str, int]]
+    wellnames_key_ois: Optional[Dict[int, str]]
+    wells_coords_CRM: Optional[pd.DataFrame]
+    wells_ftor: Optional[List[Any]]
+
+    # Поля состояния - аннотированные выше атрибуты
+    __slots__ = tuple(__annotations__)
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, None)
+        for name, value in fields.items():
+            self[name] = value
+
+    @classmethod
+    def from_dict(cls, fields: Mapping[str, Any]) -> 'RunState':
+        """Состояние из словаря (например, сохраненного прежними версиями программы)."""
+        state = cls()
+        state.update(fields)
+        return state
+
+    def __getitem__(self, name: str) -> Any:
+        if name not in self.__slots__:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if name not in self.__slots__:
+            raise KeyError(name)
+        setattr(self, name, value)
+
+    def __contains__(self, name: object) -> bool:
+        # Как у AppState: поле есть в состоянии, если оно задано
+        return name in self.__slots__ and getattr(self, name, None) is not None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__slots__)
+
+    def __len__(self) -> int:
+        # Число всех полей состояния, как в keys() и при итерации, включая незаданные
+        return len(self.__slots__)
+
+    def __repr__(self) -> str:
+        return f'RunState(run_id={self.run_id!r}, job_id={self.job_id!r})'
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_dict()
+
+    def __setstate__(self, fields: Dict[str, Any]) -> None:
+        self.__init__()
+        self.update(fields)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((name, getattr(self, name)) for name in self.__slots__)
+
+    def get(self, name: str, default: Any = None) -> Any:
+        value = getattr(self, name, None) if name in self.__slots__ else None
+        return default if value is None else value
+
+    def update(self, fields: Mapping[str, Any] = (), **kwargs) -> None:
+        """Запись полей. Поля, которых нет в состоянии (например, удаленные из программы), пропускаются."""
+        for name, value in dict(fields, **kwargs).items():
+            if name in self.__slots__:
+                setattr(self, name, value)
+            else:
+                logger.warning(f'RunState: unknown field {name} is skipped')
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def memory_usage(self) -> pd.Series:
+        """Оценка памяти, занимаемой каждым полем, в байтах (по убыванию)."""
+        usage = pd.Series({name: estimate_size(value) for name, value in self.items()}, name='bytes')
+        return usage.sort_values(ascending=False)
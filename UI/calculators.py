@@ -0,0 +1,242 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from typing import List
+
+import pandas as pd
+from loguru import logger
+
+from frameworks_crm.class_CRM.calculator import Calculator as CalculatorCRM
+from frameworks_crm.class_CRM.config import ConfigCRM
+from frameworks_hybrid_crm_ml.class_Fedot.config import ConfigFedot
+from frameworks_hybrid_crm_ml.class_Fedot.calculator import CalculatorFedot
+from frameworks_ftor.ftor.calculator import Calculator as CalculatorFtor
+from frameworks_ftor.ftor.config import Config as ConfigFtor
+from frameworks_wolfram.wolfram.calculator import Calculator as CalculatorWolfram
+from frameworks_wolfram.wolfram.config import Config as ConfigWolfram
+from models_ensemble.calculator import Calculator as CalculatorEnsemble
+from models_ensemble.config import Config as ConfigEnsemble
+from frameworks_shelf_algo.class_Shelf.config import ConfigShelf
+from frameworks_shelf_algo.class_Shelf.calculator import CalculatorShelf
+from UI import timing
+from logs.worker import Worker
+from tools_preprocessor.preprocessor import Preprocessor
+
+# Функции расчета моделей без привязки к Streamlit.
+# Вызываются этапами расчета UI.pipeline; результаты этапов кэшируются UI.result_cache.
+
+
+def make_config_ftor(constraints: dict) -> ConfigFtor:
+    config_ftor = ConfigFtor()
+    # Если пользователь задал границы\значение параметра, которым производится адаптация на
+    # последние точки, то эти значения применяются и для самой адаптации на последние точки
+    param_last_point = config_ftor.param_name_last_points_adaptation
+    if param_last_point in constraints.keys():
+        if type(constraints[param_last_point]) == dict:
+            config_ftor.param_bounds_last_points_adaptation = constraints[param_last_point]['bounds']
+        else:
+            config_ftor.apply_last_points_adaptation = False
+    return config_ftor
+
+
+def calculate_ftor(preprocessor: Preprocessor,
+                   well_names: List[int],
+                   constraints: dict) -> CalculatorFtor:
+    ftor = CalculatorFtor(
+        make_config_ftor(constraints),
+        preprocessor.create_wells_ftor(
+            well_names,
+            user_constraints_for_adap_period=constraints,
+        ),
+        logging=True
+    )
+    return ftor
+
+
+class ShardedCalculatorFtor:
+    """Результат адаптации модели пьезопроводности, собранный из нескольких процессов.
+
+    Повторяет интерфейс CalculatorFtor, используемый extract_data_ftor:
+    список адаптированных скважин wells с результатами well.results.
+    """
+
+    def __init__(self, wells: list):
+        self.wells = wells
+
+
+def _adapt_ftor_shard(config_ftor: ConfigFtor, wells_data: list, run_id: str, n_shard: int) -> list:
+    Worker.logger.info(f'Ftor shard: start adaptation of {len(wells_data)} wells')
+    wells = []
+    with timing.run_scope(run_id), timing.span('ftor_shard', shard=n_shard, n_wells=len(wells_data)):
+        # Скважины адаптируются независимо, поэтому по одной: так замеряется время каждой скважины
+        for well_data in wells_data:
+            with timing.span('ftor_well', well=well_data.well_name):
+                wells.extend(CalculatorFtor(config_ftor, [well_data], logging=True).wells)
+    Worker.logger.success(f'Ftor shard: {len(wells)} wells adapted')
+    return wells
+
+
+def split_to_shards(items: list, n_shards: int) -> List[list]:
+    """Делит список на n_shards последовательных частей близкого размера."""
+    n_shards = max(1, min(n_shards, len(items)))
+    shard_size, remainder = divmod(len(items), n_shards)
+    shards, start = [], 0
+    for i in range(n_shards):
+        end = start + shard_size + (1 if i < remainder else 0)
+        shards.append(items[start:end])
+        start = end
+    return shards
+
+
+def ftor_processes_limit(requested: int, n_concurrent_stages: int) -> int:
+    """Число процессов адаптации модели пьезопроводности с учетом одновременно выполняемых этапов.
+
+    Пул адаптации создается внутри процесса пула DAGExecutor, поэтому вместе с процессами
+    остальных этапов расчета (n_concurrent_stages) их число не должно превышать число ядер.
+    """
+    return max(1, min(requested, (os.cpu_count() or 1) - n_concurrent_stages))
+
+
+def calculate_ftor_sharded(preprocessor: Preprocessor,
+                           well_names: List[int],
+                           constraints: dict,
+                           n_processes: int) -> ShardedCalculatorFtor:
+    """Адаптация модели пьезопроводности, распределенная по скважинам между процессами.
+
+    Адаптация каждой скважины независима, поэтому список скважин делится на части,
+    каждая часть адаптируется отдельным CalculatorFtor в пуле процессов,
+    а результаты собираются в исходном порядке скважин.
+
+    Функция выполняется в процессе пула DAGExecutor, то есть пул адаптации вложен в него:
+    n_processes нужно ограничивать с учетом остальных этапов (ftor_processes_limit).
+    """
+    config_ftor = make_config_ftor(constraints)
+    wells_data = preprocessor.create_wells_ftor(
+        well_names,
+        user_constraints_for_adap_period=constraints,
+    )
+    shards = split_to_shards(wells_data, n_processes)
+    logger.info(f'Ftor: adaptation of {len(wells_data)} wells in {len(shards)} processes')
+    with ProcessPoolExecutor(max_workers=len(shards),
+                             initializer=Worker.set_logger,
+                             initargs=(logger,)) as pool:
+        futures = [pool.submit(_adapt_ftor_shard, config_ftor, shard, timing.current_run_id(), i)
+                   for i, shard in enumerate(shards)]
+        wells = [well for future in futures for well in future.result()]
+    return ShardedCalculatorFtor(wells)
+
+
+def calculate_wolfram(preprocessor: Preprocessor,
+                      well_names: List[int],
+                      forecast_days_number: int,
+                      estimator_name_group: str,
+                      estimator_name_well: str,
+                      is_deep_grid_search: bool,
+                      window_sizes: List[int],
+                      quantiles: List[float]) -> CalculatorWolfram:
+    wolfram = CalculatorWolfram(
+        ConfigWolfram(
+            forecast_days_number,
+            estimator_name_group,
+            estimator_name_well,
+            is_deep_grid_search,
+            window_sizes,
+            quantiles,
+        ),
+        preprocessor.create_wells_wolfram(well_names),
+    )
+    return wolfram
+
+
+def calculate_CRM(date_start_adapt: date,
+                  date_end_adapt: date,
+                  date_end_forecast: date,
+                  oilfield: str,
+                  calc_CRM: bool = True,
+                  calc_CRMIP: bool = False,
+                  grad_format_data: bool = True,
+                  influence_R: int = 1300,
+                  maxiter: int = 100,
+                  p_res: int = 220) -> CalculatorCRM or None:
+    config_CRM = ConfigCRM(date_start_adapt=date_start_adapt,
+                           date_end_adapt=date_end_adapt,
+                           date_end_forecast=date_end_forecast,
+                           calc_CRM=calc_CRM,
+                           calc_CRMIP=calc_CRMIP,
+                           grad_format_data=grad_format_data,
+                           oilfield=oilfield)
+    config_CRM.INFLUENCE_R = influence_R
+    config_CRM.options_SLSQP_CRM['maxiter'] = maxiter
+    config_CRM.p_res = p_res
+    try:
+        logger.info(f'CRM: start calculations')
+        calculator_CRM = CalculatorCRM(config_CRM)
+        logger.success(f'CRM: success')
+        return calculator_CRM
+    except Exception as exc:
+        logger.exception('CRM: FAIL', exc)
+        return None
+
+
+def calculate_fedot(oilfield: str,
+                    train_start: date,
+                    train_end: date,
+                    predict_start: date,
+                    predict_end: date,
+                    wells_norm: List,
+                    coeff: pd.DataFrame,
+                    lags: pd.DataFrame = None) -> CalculatorFedot:
+    config_Fedot = ConfigFedot(oilfield=oilfield,
+                               train_start=train_start,
+                               train_end=train_end,
+                               predict_start=predict_start,
+                               predict_end=predict_end,
+                               wells_norm=wells_norm,
+                               coeff_f=coeff,
+                               lags=lags)
+    calculator_fedot = CalculatorFedot(config_Fedot)
+    return calculator_fedot
+
+
+def calculate_shelf(oilfield: str,
+                    shops: List[str],
+                    wells_ois: List[int],
+                    train_start: date,
+                    train_end: date,
+                    predict_start: date,
+                    predict_end: date,
+                    n_days_past: int,
+                    n_days_calc_avg: int) -> CalculatorShelf:
+    config_shelf = ConfigShelf(oilfield=oilfield,
+                               shops=shops,
+                               wells_ois=wells_ois,
+                               train_start=train_start,
+                               train_end=train_end,
+                               predict_start=predict_start,
+                               predict_end=predict_end,
+                               n_days_past=n_days_past,
+                               n_days_calc_avg=n_days_calc_avg)
+    results_shelf = CalculatorShelf(config_shelf)
+    return results_shelf
+
+
+def calculate_ensemble(input_data: list[dict],
+                       adaptation_days_number: int,
+                       interval_probability: float,
+                       draws: int,
+                       tune: int,
+                       chains: int,
+                       target_accept: float,
+                       name_of_y_true: str) -> tuple[dict[str, pd.DataFrame], dict]:
+    calculator_ensemble = CalculatorEnsemble(
+        ConfigEnsemble(adaptation_days_number=adaptation_days_number,
+                       interval_probability=interval_probability,
+                       draws=draws,
+                       tune=tune,
+                       chains=chains,
+                       target_accept=target_accept,
+                       name_of_y_true=name_of_y_true),
+        input_data,
+        logging=True
+    )
+    return calculator_ensemble.result_test, calculator_ensemble.weights
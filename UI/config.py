@@ -1,4 +1,5 @@
 import datetime
+import os
 
 from dateutil.relativedelta import relativedelta
 
@@ -98,6 +99,61 @@ DEFAULT_FTOR_BOUNDS = {
     },
 }
 
+# Число процессов, между которыми распределяется адаптация скважин модели пьезопроводности.
+# Пул адаптации вложен в пул этапов расчета, поэтому при расчете ограничивается числом свободных ядер
+# (UI.calculators.ftor_processes_limit)
+DEFAULT_FTOR_PROCESSES = os.cpu_count() or 1
+
+# Выполнять расчеты в фоновом процессе main_worker.py (очередь UI.jobs), не блокируя интерфейс
+BACKGROUND_JOBS = True
+# Модели, которые используют данные сессии Streamlit (правки ГТМ и темпов падения в st.session_state.shelf_json):
+# рассчитываются только в процессе интерфейса, не в пакетном запуске и не в воркере очереди
+INTERFACE_ONLY_MODELS = ('shelf',)
+# Бюджет памяти кэша результатов этапов расчета в каждом процессе, МБ
+MEMORY_CACHE_BUDGET_MB = 2048
+# Число препроцессоров (конфигураций месторождения и дат), хранящихся в кэше интерфейса
+PREPROCESSOR_CACHE_SIZE = 4
+# Подробный замер пиковой памяти Python в интервалах UI.timing (tracemalloc замедляет расчеты,
+# поэтому включается только на время внешних интервалов; пиковый RSS процесса замеряется всегда)
+TIMING_TRACE_MEMORY = False
+# Размер файла замеров UI.timing, при превышении которого он переименовывается в архивный, МБ
+TIMINGS_MAX_MB = 20
+# Период сэмплирования стека вызовов при профилировании расчета, с
+PROFILE_SAMPLING_INTERVAL = 0.01
+# Число корзин скважин при секционированном хранении данных месторождения (UI.field_layout)
+PARTITION_WELL_BUCKETS = 16
+# Хранить результаты моделей компактно (float32, без пустых дней в начале и в конце периода,
+# см. UI.statistics_store.ModelBlock.compact). Экономит память на длинных периодах адаптации
+STATISTICS_COMPACT = False
+
+# Значения параметров моделей по умолчанию (страница models_settings.py и пакетный запуск main_batch.py)
+DEFAULT_MODEL_PARAMS = {
+    # Ftor model
+    'constraints': {},
+    'ftor_processes': DEFAULT_FTOR_PROCESSES,
+    # ML model
+    'estimator_name_group': 'xgb',
+    'estimator_name_well': 'svr',
+    'is_deep_grid_search': False,
+    'quantiles': [0.1, 0.3],
+    'window_sizes': [3, 5, 7, 15, 30],
+    # CRM model
+    'CRM_influence_R': 1300,
+    'CRM_maxiter': 100,
+    'CRM_p_res': 220,
+    # Shelf model
+    'n_days_past': 30,
+    'n_days_calc_avg': 5,
+    'change_gtm_info': 0,  # счетчик изменений пользователем данных ГТМ и темпов падения
+    # Ensemble model
+    'ensemble_adapt_period': 28,
+    'interval_probability': 0.9,
+    'draws': 300,
+    'tune': 200,
+    'chains': 1,
+    'target_accept': 0.95,
+}
+
 FTOR_DECODE = {
     'permeability': {
         'label': 'Проницаемость k, мД',
@@ -1,17 +1,23 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Union, IO
 
 import numpy as np
 import pandas as pd
 import pathlib
 
 from frameworks_hybrid_crm_ml.class_Fedot.calculator import CalculatorFedot
-from UI.app_state import AppState
+from UI.app_state import RunState
 from UI.config import FTOR_DECODE
+from UI.field_data import get_well_name_index
+from UI.field_registry import field_registry
+from UI.statistics_store import KINDS, QUANTITIES, PeriodView, StatisticsStore
+from UI.timing import timed
 from frameworks_ftor.ftor.calculator import Calculator as CalculatorFtor
 from frameworks_ftor.ftor.well import Well as WellFtor
 from frameworks_wolfram.wolfram.calculator import Calculator as CalculatorWolfram
 from frameworks_shelf_algo.class_Shelf.data_postprocessor_shelf import DataPostProcessorShelf
 from frameworks_shelf_algo.class_Shelf.calculator import CalculatorShelf
+from statistics_explorer.config import ConfigStatistics
+from tools_preprocessor.preprocessor import Preprocessor
 
 
 def convert_params_to_readable(params_dict: Dict[str, Any]) -> Dict[str, Any]:
@@ -27,9 +33,10 @@ def convert_params_to_readable(params_dict: Dict[str, Any]) -> Dict[str, Any]:
 
 
 
-def extract_data_ftor(_calculator_ftor: CalculatorFtor, state: AppState) -> None:
+@timed()
+def extract_data_ftor(_calculator_ftor: CalculatorFtor, state: RunState) -> None:
     dates = pd.date_range(state.was_date_start, state.was_date_end, freq='D').date
-    state.statistics['ftor'] = pd.DataFrame(index=dates)
+    columns = {}
     for well_ftor in _calculator_ftor.wells:
         well_name_ois = well_ftor.well_name
         well_name_normal = state.wellnames_key_ois[well_name_ois]
@@ -43,15 +50,17 @@ def extract_data_ftor(_calculator_ftor: CalculatorFtor, state: AppState) -> None
         rates_oil_test_ftor = res_ftor.rates_oil_test
         rates_oil_test_ftor = pd.to_numeric(rates_oil_test_ftor)
         df = well_ftor.df_chess  # Фактические данные для визуализации
-        state.statistics['ftor'][f'{well_name_normal}_liq_true'] = df['Дебит жидкости']
-        state.statistics['ftor'][f'{well_name_normal}_liq_pred'] = rates_liq_ftor
-        state.statistics['ftor'][f'{well_name_normal}_oil_true'] = df['Дебит нефти']
-        state.statistics['ftor'][f'{well_name_normal}_oil_pred'] = rates_oil_test_ftor
+        columns[well_name_normal, 'liq', 'true'] = df['Дебит жидкости']
+        columns[well_name_normal, 'liq', 'pred'] = rates_liq_ftor
+        columns[well_name_normal, 'oil', 'true'] = df['Дебит нефти']
+        columns[well_name_normal, 'oil', 'pred'] = rates_oil_test_ftor
+    state.statistics.write('ftor', dates, columns)
 
 
-def extract_data_wolfram(_calculator_wolfram: CalculatorWolfram, state: AppState) -> None:
+@timed()
+def extract_data_wolfram(_calculator_wolfram: CalculatorWolfram, state: RunState) -> None:
     dates = pd.date_range(state.was_date_start, state.was_date_end, freq='D').date
-    state.statistics['wolfram'] = pd.DataFrame(index=dates)
+    columns = {}
     for _well_wolfram in _calculator_wolfram.wells:
         _well_name_ois = _well_wolfram.well_name
         res_wolfram = _well_wolfram.results
@@ -64,38 +73,44 @@ def extract_data_wolfram(_calculator_wolfram: CalculatorWolfram, state: AppState
         rates_oil_wolfram = res_wolfram.rates_oil_test
 
         well_name_normal = state.wellnames_key_ois[_well_name_ois]
-        state.statistics['wolfram'][f'{well_name_normal}_liq_true'] = rates_liq_true
-        state.statistics['wolfram'][f'{well_name_normal}_liq_pred'] = rates_liq_wolfram
-        state.statistics['wolfram'][f'{well_name_normal}_oil_true'] = rates_oil_true
-        state.statistics['wolfram'][f'{well_name_normal}_oil_pred'] = rates_oil_wolfram
+        columns[well_name_normal, 'liq', 'true'] = rates_liq_true
+        columns[well_name_normal, 'liq', 'pred'] = rates_liq_wolfram
+        columns[well_name_normal, 'oil', 'true'] = rates_oil_true
+        columns[well_name_normal, 'oil', 'pred'] = rates_oil_wolfram
+    state.statistics.write('wolfram', dates, columns)
 
 
+@timed()
 def extract_data_CRM(df: pd.DataFrame,
-                     state: AppState,
+                     state: RunState,
                      wells_ftor: List[WellFtor],
                      mode: str = 'CRM') -> None:
     dates = pd.date_range(state.was_date_start, state.was_date_end, freq='D').date
+    columns = {}
     for well in wells_ftor:
         well_name_normal = state.wellnames_key_ois[well.well_name]
         if well_name_normal in df.columns:
-            if mode not in state.statistics:
-                state.statistics[mode] = pd.DataFrame(index=dates)
             df_fact = well.df_chess
-            state.statistics[mode][f'{well_name_normal}_liq_true'] = df_fact['Дебит жидкости']
-            state.statistics[mode][f'{well_name_normal}_liq_pred'] = df[well_name_normal]
-            state.statistics[mode][f'{well_name_normal}_oil_true'] = np.nan
-            state.statistics[mode][f'{well_name_normal}_oil_pred'] = np.nan
-
-def extract_influence_coeff_CRM(data_coeff_f: pd.DataFrame, state: AppState) -> None:
+            columns[well_name_normal, 'liq', 'true'] = df_fact['Дебит жидкости']
+            columns[well_name_normal, 'liq', 'pred'] = df[well_name_normal]
+            columns[well_name_normal, 'oil', 'true'] = np.nan
+            columns[well_name_normal, 'oil', 'pred'] = np.nan
+    if columns:
+        state.statistics.write(mode, dates, columns)
+
+@timed()
+def extract_influence_coeff_CRM(data_coeff_f: pd.DataFrame, state: RunState) -> None:
     state['coeff_f'] = data_coeff_f
 
 
-def extract_data_fedot(fedot_entity: CalculatorFedot, state: AppState) -> None:
+@timed()
+def extract_data_fedot(fedot_entity: CalculatorFedot, state: RunState) -> None:
     state.statistics['fedot'] = fedot_entity.statistic_all
 
-def extract_data_shelf(_calculator_shelf: CalculatorShelf, state: AppState) -> None: #, _change_gtm_info: int
+@timed()
+def extract_data_shelf(_calculator_shelf: CalculatorShelf, state: RunState) -> None: #, _change_gtm_info: int
     dates = pd.date_range(state.was_date_start, state.was_date_end, freq='D').date
-    state.statistics['shelf'] = pd.DataFrame(index=dates)
+    columns = {}
     for well_shelf in _calculator_shelf.wells_list:
         well_name_ois = well_shelf
         well_name_normal = state.wellnames_key_ois[well_name_ois]
@@ -103,21 +118,26 @@ def extract_data_shelf(_calculator_shelf: CalculatorShelf, state: AppState) -> N
         res_liq = _calculator_shelf.df_result_liq[well_name_ois]
         true_oil = _calculator_shelf._df_fact_test_prd[well_name_ois]
         true_liq = _calculator_shelf._df_fact_test_prd_liq[well_name_ois]
-        state.statistics['shelf'][f'{well_name_normal}_liq_true'] = true_liq
-        state.statistics['shelf'][f'{well_name_normal}_liq_pred'] = res_liq
-        state.statistics['shelf'][f'{well_name_normal}_oil_true'] = true_oil
-        state.statistics['shelf'][f'{well_name_normal}_oil_pred'] = res_oil
+        columns[well_name_normal, 'liq', 'true'] = true_liq
+        columns[well_name_normal, 'liq', 'pred'] = res_liq
+        columns[well_name_normal, 'oil', 'true'] = true_oil
+        columns[well_name_normal, 'oil', 'pred'] = res_oil
+    state.statistics.write('shelf', dates, columns)
 
 
-def convert_tones_to_m3_for_wolfram(state: AppState, wells_ftor: List[WellFtor]) -> None:
+@timed()
+def convert_tones_to_m3_for_wolfram(state: RunState, wells_ftor: List[WellFtor]) -> None:
+    oil = QUANTITIES.index('oil')
     for well_ftor in wells_ftor:
         density_oil = well_ftor.density_oil
         well_name_normal = state.wellnames_key_ois[well_ftor.well_name]
-        state.statistics['wolfram'][f'{well_name_normal}_oil_true'] /= density_oil
-        state.statistics['wolfram'][f'{well_name_normal}_oil_pred'] /= density_oil
+        # Факт и прогноз нефти скважины
+        state.statistics.well('wolfram', well_name_normal)[oil] /= density_oil
+    state.statistics.touch('wolfram')
 
 
-def prepare_data_for_ensemble(state: AppState,
+@timed()
+def prepare_data_for_ensemble(state: RunState,
                               wells_norm: list[str],
                               name_of_y_true: str,
                               mode: str = 'liq') -> dict[str: str, str: pd.DataFrame]:
@@ -131,7 +151,7 @@ def prepare_data_for_ensemble(state: AppState,
     return input_data
 
 
-def prepare_single_df_for_ensemble(state: AppState,
+def prepare_single_df_for_ensemble(state: RunState,
                                    well_name_normal: str,
                                    name_of_y_true: str,
                                    mode: str = 'liq') -> pd.DataFrame:
@@ -140,7 +160,7 @@ def prepare_single_df_for_ensemble(state: AppState,
         models.remove('ensemble')
     dates_test = pd.date_range(state.was_date_test, state.was_date_end, freq='D').date
     input_df = pd.DataFrame(index=dates_test)
-    if state.statistics_another_models:
+    if state.statistics_another_models and state.statistics_another_models not in state.statistics:
         state.statistics[state.statistics_another_models] = state.statistics_test_only[state.statistics_another_models]
     for model in models:
         well_calculated_by_model = f'{well_name_normal}_{mode}_pred' in state.statistics[model]
@@ -152,63 +172,128 @@ def prepare_single_df_for_ensemble(state: AppState,
     return input_df
 
 
-def extract_data_ensemble(ensemble_df: pd.DataFrame,
-                          state: AppState,
-                          well_name_normal: str,
+def extract_data_ensemble(ensemble_result: Dict[str, pd.DataFrame],
+                          state: RunState,
                           mode: str = 'liq') -> None:
-    if ensemble_df.empty:
+    """Запись результатов ансамбля по скважинам в массив модели 'ensemble' (виды true, pred, lower, upper).
+
+    Доверительный интервал (state.ensemble_interval) обновляется в UI.pipeline.merge_ensemble_result.
+    """
+    if mode not in QUANTITIES:
         return
     dates = pd.date_range(state.was_date_start, state.was_date_end, freq='D').date
-    if 'ensemble' not in state.statistics:
-        state.statistics['ensemble'] = pd.DataFrame(index=dates)
-    if mode == 'oil':
-        state.statistics['ensemble'][f'{well_name_normal}_oil_true'] = ensemble_df['true']
-        state.statistics['ensemble'][f'{well_name_normal}_oil_pred'] = ensemble_df['ensemble']
-        state.ensemble_interval[f'{well_name_normal}_oil_upper'] = ensemble_df['interval_upper']
-        state.ensemble_interval[f'{well_name_normal}_oil_lower'] = ensemble_df['interval_lower']
-    elif mode == 'liq':
-        state.statistics['ensemble'][f'{well_name_normal}_liq_true'] = ensemble_df['true']
-        state.statistics['ensemble'][f'{well_name_normal}_liq_pred'] = ensemble_df['ensemble']
-        state.ensemble_interval[f'{well_name_normal}_liq_upper'] = ensemble_df['interval_upper']
-        state.ensemble_interval[f'{well_name_normal}_liq_lower'] = ensemble_df['interval_lower']
-
-
-def make_models_stop_well(statistics: Dict[str, pd.DataFrame],
+    columns = {}
+    for well_name_normal, ensemble_df in ensemble_result.items():
+        if ensemble_df.empty:
+            continue
+        columns[well_name_normal, mode, 'true'] = ensemble_df['true']
+        columns[well_name_normal, mode, 'pred'] = ensemble_df['ensemble']
+        columns[well_name_normal, mode, 'upper'] = ensemble_df['interval_upper']
+        columns[well_name_normal, mode, 'lower'] = ensemble_df['interval_lower']
+    if columns:
+        state.statistics.write('ensemble', dates, columns, kinds=KINDS)
+
+
+def trim_ensemble_interval(interval: pd.DataFrame) -> pd.DataFrame:
+    """Доверительный интервал ансамбля только за дни, рассчитанные ансамблем.
+
+    Массив модели 'ensemble' охватывает весь период расчета, а интервал известен только
+    для дней результата ансамбля: строки до первого и после последнего известного значения отбрасываются.
+    """
+    rows = np.flatnonzero(interval.notna().to_numpy().any(axis=1))
+    if not len(rows):
+        return interval.iloc[:0]
+    return interval.iloc[rows[0]:rows[-1] + 1]
+
+
+@timed()
+def make_models_stop_well(statistics: Union[StatisticsStore, Dict[str, pd.DataFrame]],
                           well_names: List[str]) -> None:
-    # Зануление значений по моделям, когда фактический дебит равен нулю или NaN
+    # Зануление значений по моделям, когда фактический дебит равен нулю или NaN.
+    # Маски строятся сразу для всех скважин модели (массив скважина x величина x день),
+    # для моделей, хранящихся таблицами, - сразу для всех столбцов таблицы
+    oil = QUANTITIES.index('oil')
     for model in statistics:
-        for well_name in well_names:
-            if f'{well_name}_oil_pred' not in statistics[model]:
-                continue
-            liq_zeros = statistics[model][f'{well_name}_liq_true'] == 0
-            liq_nans = statistics[model][f'{well_name}_liq_true'].isna()
-            statistics[model][f'{well_name}_liq_pred'][liq_zeros | liq_nans] = np.nan
-
-            oil_zeros = statistics[model][f'{well_name}_oil_true'] == 0
-            oil_nans = statistics[model][f'{well_name}_oil_true'].isna()
-            statistics[model][f'{well_name}_oil_pred'][oil_zeros | oil_nans] = np.nan
+        block = statistics.block(model) if isinstance(statistics, StatisticsStore) else None
+        if block is None:
+            _make_frame_stop_well(statistics[model], well_names)
+            continue
+        true, pred = block.kinds.index('true'), block.kinds.index('pred')
+        selected = np.zeros(len(block.wells), dtype=bool)
+        selected[[block.positions[well_name] for well_name in well_names if well_name in block.positions]] = True
+        selected &= block.present[:, oil, pred]
+        if not selected.any():
+            continue
+        values_true = block.values[:, :, true]
+        stop = (values_true == 0) | np.isnan(values_true)
+        stop &= selected[:, np.newaxis, np.newaxis]
+        np.copyto(block.values[:, :, pred], np.nan, where=stop)
+        statistics.touch(model)
+
+
+def _make_frame_stop_well(frame: pd.DataFrame, well_names: List[str]) -> None:
+    # Модель в формате statistics_explorer: столбцы '{скважина}_{величина}_{вид}'
+    columns_true, columns_pred = [], []
+    for well_name in well_names:
+        if f'{well_name}_oil_pred' not in frame:
+            continue
+        for quantity in QUANTITIES:
+            columns_true.append(f'{well_name}_{quantity}_true')
+            columns_pred.append(f'{well_name}_{quantity}_pred')
+    if not columns_pred:
+        return
+    values_true = frame[columns_true].to_numpy(dtype=float)
+    values_pred = frame[columns_pred].to_numpy(dtype=float, copy=True)
+    values_pred[(values_true == 0) | np.isnan(values_true)] = np.nan
+    frame[columns_pred] = values_pred
 
 
-def cut_statistics_test_only(state: AppState) -> Tuple[Dict[str, pd.DataFrame], pd.date_range]:
+@timed()
+def cut_statistics_test_only(state: RunState) -> Tuple[PeriodView, pd.date_range]:
     statistics_test_index = pd.date_range(state.was_date_test, state.was_date_end, freq='D')
     # обрезка данных по датам(индексу) ансамбля
     if state.was_calc_ensemble:
         statistics_test_index = pd.date_range(state.was_date_test_if_ensemble, state.was_date_end, freq='D')
-
-    statistics_test_only = {}
-    for key in state.statistics:
-        statistics_test_only[key] = state.statistics[key].copy().reindex(statistics_test_index).fillna(0)
-    return statistics_test_only, statistics_test_index
+    # Таблицы не копируются: пропуски заполняются нулями при чтении (UI.statistics_store.filled_frames)
+    return PeriodView(state.statistics, statistics_test_index), statistics_test_index
+
+
+def parse_well_names(well_names_ois: List[int], field_name: str) -> Tuple[Dict[str, int], Dict[int, str]]:
+    """Функция сопоставляет имена скважин OIS и (ГРАД?)
+
+    Parameters
+    ----------
+    well_names_ois: List[int]
+        список имен скважин в формате OIS (например 245023100).
+    field_name : str
+        Имя месторождения.
+    Returns
+    -------
+    wellnames_key_normal : Dict[str, int]
+        Ключ = имя скважины в формате ГРАД, значение - имя скважины OIS.
+    wellnames_key_ois : Dict[int, str]
+        Ключ = имя скважины OIS, значение - имя скважины в формате ГРАД.
+    """
+    return get_well_name_index(Preprocessor._path_general / field_name).map(well_names_ois)
+
+
+def export_results_to_excel(state: RunState, target: Union[str, pathlib.Path, IO]) -> None:
+    """Запись результатов расчета (прогнозы моделей, интервал ансамбля, параметры адаптации
+    и веса моделей ансамбля) в Excel-файл."""
+    with pd.ExcelWriter(target) as writer:
+        for key in state.statistics:
+            state.statistics[key].to_excel(writer, sheet_name=ConfigStatistics.MODEL_NAMES[key])
+        if not state.ensemble_interval.empty:
+            state.ensemble_interval.to_excel(writer, sheet_name='Доверит. интервал ансамбль')
+        if state.adapt_params:
+            df_adapt_params = pd.DataFrame(state.adapt_params)
+            df_adapt_params.to_excel(writer, sheet_name='Параметры адаптации пьезо')
+        if state.models_weights:
+            for mode in state.models_weights.keys():
+                pd.DataFrame.from_dict(state.models_weights[mode]).to_excel(writer, sheet_name=f'Веса моделей {mode}')
 
 
 def add_fieldshops(fieldshops: dict) -> None:
-    fieldshops_path = pathlib.Path.cwd() / 'tools_preprocessor' / 'data'
-    fieldshops_name = fieldshops_path.glob("**")
-    for fs_name in fieldshops_name:
-        if pathlib.Path(fs_name / 'welllist.feather').exists():
-            fieldshops_ceh = pd.read_feather(pathlib.Path(fs_name / 'welllist.feather'))
-            fs_name = fs_name.name
-        else:
-            continue
-        fieldshops_ceh = fieldshops_ceh.ceh.unique()
-        fieldshops[fs_name] = list(fieldshops_ceh)
\ No newline at end of file
+    """Добавляет в fieldshops цеха месторождений из реестра UI.field_registry."""
+    for field_name, entry in field_registry().items():
+        fieldshops[field_name] = list(entry['shops'])
\ No newline at end of file
@@ -0,0 +1,273 @@
+import datetime
+import pathlib
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+from loguru import logger
+
+from UI.field_indexes import index_path, is_index_fresh
+from UI.field_layout import partitioned_dataset, read_partitioned
+
+# Данные месторождений (папки tools_preprocessor/data/<месторождение>), общие для всех сессий процесса.
+
+
+class FieldDataCatalog:
+    """Каталог feather-файлов месторождений, общий для всех сессий процесса.
+
+    Каждый файл отображается в память (memory map) и читается один раз; повторное чтение
+    происходит, только если у файла изменились время изменения или размер.
+    Таблицы pandas, которые выдает каталог, разделяют массивы числовых столбцов и дат с кэшем каталога:
+    эти массивы доступны только для чтения (writeable=False), и запись в них на месте вызывает ошибку.
+    Для изменения нужна копия (.copy()) или операции, возвращающие новую таблицу. Строковые столбцы
+    (object) копируются при каждом вызове: pandas не сравнивает строки в массивах только для чтения.
+    Добавление и замена столбцов кэш не затрагивают (каждый вызов frame возвращает отдельную таблицу).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables: Dict[pathlib.Path, Tuple[tuple, pa.Table]] = {}
+        self._frames: Dict[Tuple[pathlib.Path, Optional[tuple]], Tuple[tuple, pd.DataFrame]] = {}
+
+    @staticmethod
+    def _version(path: pathlib.Path) -> tuple:
+        stat = path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def table(self, path: pathlib.Path) -> pa.Table:
+        """Arrow-таблица файла path."""
+        path = pathlib.Path(path)
+        version = self._version(path)
+        with self._lock:
+            cached = self._tables.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        table = feather.read_table(str(path), memory_map=True)
+        logger.info(f'Field data: {path} loaded ({table.num_rows} rows)')
+        with self._lock:
+            self._tables[path] = (version, table)
+        return table
+
+    @staticmethod
+    def _read_only(frame: pd.DataFrame) -> pd.DataFrame:
+        # split_blocks: у каждого столбца свой массив, поэтому to_numpy() не копирует данные
+        columns = {}
+        for column in frame:
+            values = frame[column]
+            if isinstance(values.dtype, np.dtype) and values.dtype != object:
+                values = values.to_numpy()
+                values.flags.writeable = False
+            columns[column] = values
+        return pd.DataFrame(columns, index=frame.index, copy=False)
+
+    def frame(self, path: pathlib.Path, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Таблица pandas из столбцов columns файла path (по умолчанию - все столбцы).
+
+        Массивы числовых столбцов и дат общие для всех вызывающих и доступны только для чтения:
+        для изменения на месте нужна копия (.copy()).
+        """
+        path = pathlib.Path(path)
+        key = (path, tuple(columns) if columns is not None else None)
+        version = self._version(path)
+        with self._lock:
+            cached = self._frames.get(key)
+        if cached is None or cached[0] != version:
+            table = self.table(path)
+            if columns is not None:
+                table = table.select(list(columns))
+            cached = (version, self._read_only(table.to_pandas(split_blocks=True)))
+            with self._lock:
+                self._frames[key] = cached
+        frame = cached[1].copy(deep=False)
+        for column in frame.columns[frame.dtypes == object]:
+            frame[column] = frame[column].copy()
+        return frame
+
+    def release(self, field_path: pathlib.Path) -> None:
+        """Освобождает файлы папки field_path и ее подпапок (например, перед их перезаписью: в Windows
+        файл, отображенный в память, нельзя перезаписать)."""
+        field_path = pathlib.Path(field_path)
+        with self._lock:
+            for path in [path for path in self._tables if field_path in path.parents]:
+                del self._tables[path]
+            for key in [key for key in self._frames if field_path in key[0].parents]:
+                del self._frames[key]
+
+
+CATALOG = FieldDataCatalog()
+
+
+def read_field_frame(field_path: pathlib.Path,
+                     file_name: str,
+                     columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """Таблица file_name месторождения из каталога CATALOG (массивы только для чтения, см. FieldDataCatalog)."""
+    return CATALOG.frame(pathlib.Path(field_path) / file_name, columns)
+
+
+def read_well_states(field_path: pathlib.Path,
+                     columns: Sequence[str],
+                     date_after: Optional[datetime.date] = None,
+                     sost: Optional[str] = None,
+                     charwork: Optional[str] = None,
+                     date_end: Optional[datetime.date] = None) -> pd.DataFrame:
+    """Строки sh_sost_fond.feather месторождения, отобранные по дате и состоянию скважин.
+
+    Отбор выполняется над Arrow-таблицей: читаются только столбцы columns и столбцы условий,
+    таблица pandas строится только из отобранных строк. Если файл разложен по секциям
+    (см. UI.field_layout), читаются только секции периода (date_after, date_end], иначе - таблица
+    из каталога CATALOG.
+
+    Parameters
+    ----------
+    field_path : pathlib.Path
+        папка месторождения.
+    columns : Sequence[str]
+        столбцы результата, например ['well.ois'].
+    date_after : datetime.date
+        оставить строки с датой (столбец dt) строго после date_after.
+    sost : str
+        оставить строки с состоянием скважины sost, например 'В работе'.
+    charwork : str
+        оставить строки с характером работы charwork, например 'Нефтяные'.
+    date_end : datetime.date
+        оставить строки с датой не позже date_end.
+    """
+    partitioned = partitioned_dataset(field_path, 'sh_sost_fond.feather')
+    if partitioned is not None:
+        conditions = []
+        if sost is not None:
+            conditions.append(ds.field('sost') == sost)
+        if charwork is not None:
+            conditions.append(ds.field('charwork.name') == charwork)
+        _, dataset = partitioned
+        table = read_partitioned(dataset, columns, date_after, date_end, conditions=conditions)
+        return table.to_pandas(split_blocks=True)
+
+    table = CATALOG.table(pathlib.Path(field_path) / 'sh_sost_fond.feather')
+    date_type = table.schema.field('dt').type
+    conditions = []
+    if date_after is not None:
+        conditions.append(pc.greater(table['dt'], pa.scalar(pd.Timestamp(date_after), type=date_type)))
+    if date_end is not None:
+        conditions.append(pc.less_equal(table['dt'], pa.scalar(pd.Timestamp(date_end), type=date_type)))
+    if sost is not None:
+        conditions.append(pc.equal(table['sost'], sost))
+    if charwork is not None:
+        conditions.append(pc.equal(table['charwork.name'], charwork))
+    table = table.select(list(columns))
+    if conditions:
+        mask = conditions[0]
+        for condition in conditions[1:]:
+            mask = pc.and_(mask, condition)
+        table = table.filter(mask)
+    return table.to_pandas(split_blocks=True)
+
+
+def _read_index(field_path: pathlib.Path, index_name: str) -> Optional[pd.DataFrame]:
+    """Индекс index_name месторождения (UI.field_indexes), если он построен по текущей версии исходного файла."""
+    path = index_path(field_path, index_name)
+    if not path.exists() or not is_index_fresh(field_path, index_name, CATALOG.table(path).schema.metadata):
+        return None
+    return CATALOG.frame(path)
+
+
+def read_wells_in_state(field_path: pathlib.Path,
+                        date_after: Optional[datetime.date] = None,
+                        sost: Optional[str] = None,
+                        charwork: Optional[str] = None,
+                        date_end: Optional[datetime.date] = None) -> np.ndarray:
+    """Скважины (OIS, по возрастанию), у которых в sh_sost_fond.feather есть строки с датой в периоде
+    (date_after, date_end], состоянием sost и характером работы charwork (см. read_well_states).
+
+    Если построен индекс состояний скважин (UI.field_indexes), sh_sost_fond.feather не читается.
+    """
+    index = _read_index(field_path, 'well_states.feather')
+    if index is None:
+        wells = read_well_states(field_path, ['well.ois'], date_after, sost, charwork, date_end)['well.ois']
+        return np.sort(wells.unique())
+    mask = np.ones(len(index), dtype=bool)
+    if date_after is not None:
+        mask &= (index['dt_end'] > pd.Timestamp(date_after)).to_numpy()
+    if date_end is not None:
+        mask &= (index['dt_start'] <= pd.Timestamp(date_end)).to_numpy()
+    if sost is not None:
+        mask &= (index['sost'] == sost).to_numpy()
+    if charwork is not None:
+        mask &= (index['charwork.name'] == charwork).to_numpy()
+    return np.sort(index.loc[mask, 'well.ois'].unique())
+
+
+class WellNameIndex:
+    """Соответствие имен скважин OIS и (ГРАД?) по основным стволам (npath == 0) из welllist.feather.
+
+    Если в welllist несколько основных стволов с одним OIS, используется первый, как и ранее.
+    Если одно имя (ГРАД?) у нескольких OIS, в normal_to_ois остается последний, как в словарях map.
+    Для скважины, которой нет среди основных стволов, как и ранее, возникает IndexError.
+    """
+
+    def __init__(self, welllist: pd.DataFrame):
+        main_bores = welllist[welllist['npath'] == 0].drop_duplicates('ois', keep='first')
+        self.ois_to_normal: Dict[int, str] = dict(zip(main_bores['ois'], main_bores['num']))
+        self.normal_to_ois: Dict[str, int] = dict(zip(main_bores['num'], main_bores['ois']))
+
+    def normal(self, name_ois: int) -> str:
+        """Имя (ГРАД?) скважины name_ois."""
+        try:
+            return self.ois_to_normal[name_ois]
+        except KeyError:
+            raise IndexError(f'Скважина {name_ois} не найдена среди основных стволов welllist.feather.')
+
+    def ois(self, well_name_norm: str) -> int:
+        """Имя OIS скважины well_name_norm."""
+        try:
+            return self.normal_to_ois[well_name_norm]
+        except KeyError:
+            raise IndexError(f'Скважина {well_name_norm} не найдена среди основных стволов welllist.feather.')
+
+    def map(self, well_names_ois: Iterable[int]) -> Tuple[Dict[str, int], Dict[int, str]]:
+        """Словари соответствия для скважин well_names_ois в их исходном порядке.
+
+        Returns
+        -------
+        wellnames_key_normal : Dict[str, int]
+            Ключ = имя скважины в формате ГРАД, значение - имя скважины OIS.
+        wellnames_key_ois : Dict[int, str]
+            Ключ = имя скважины OIS, значение - имя скважины в формате ГРАД.
+        """
+        wellnames_key_normal = {}
+        wellnames_key_ois = {}
+        for name_ois in well_names_ois:
+            well_name_norm = self.normal(name_ois)
+            wellnames_key_normal[well_name_norm] = name_ois
+            wellnames_key_ois[name_ois] = well_name_norm
+        return wellnames_key_normal, wellnames_key_ois
+
+
+_well_name_indexes: Dict[pathlib.Path, Tuple[int, WellNameIndex]] = {}
+_well_name_indexes_lock = threading.Lock()
+
+
+def get_well_name_index(field_path: pathlib.Path) -> WellNameIndex:
+    """Индекс имен скважин месторождения из field_path / 'welllist.feather'.
+
+    Индекс строится один раз на процесс и перестраивается, если файл изменился. Основные стволы берутся
+    из индекса имен скважин (UI.field_indexes), если он построен по текущей версии welllist.feather.
+    """
+    path = pathlib.Path(field_path) / 'welllist.feather'
+    mtime = path.stat().st_mtime_ns
+    with _well_name_indexes_lock:
+        cached = _well_name_indexes.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    main_bores = _read_index(field_path, 'well_names.feather')
+    if main_bores is None:
+        main_bores = CATALOG.frame(path, ['ois', 'num', 'npath'])
+    index = WellNameIndex(main_bores)
+    with _well_name_indexes_lock:
+        _well_name_indexes[path] = (mtime, index)
+    return index
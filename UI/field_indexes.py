@@ -0,0 +1,115 @@
+import json
+import os
+import pathlib
+import shutil
+from typing import Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from loguru import logger
+
+# Индексы данных месторождения, которые строятся при загрузке (UI.ingest, main_partition.py) и хранятся
+# в папке <месторождение>/indexes:
+#   well_names.feather  - основные стволы из welllist.feather (ois, num, npath; см. UI.field_data.WellNameIndex),
+#   well_states.feather - периоды состояний скважин из sh_sost_fond.feather: подряд идущие дни с одними
+#                         и теми же sost и charwork.name скважины (well.ois, sost, charwork.name, dt_start, dt_end).
+# В метаданных файла индекса записана версия исходного файла (время изменения и размер). Индекс используется,
+# пока версия исходного файла совпадает с ней; иначе данные читаются из исходного файла, как и без индексов.
+
+INDEXES_DIR = 'indexes'
+INDEX_SOURCES = {
+    'well_names.feather': 'welllist.feather',
+    'well_states.feather': 'sh_sost_fond.feather',
+}
+STATE_COLUMNS = ['well.ois', 'sost', 'charwork.name']
+
+
+def _file_version(path: pathlib.Path) -> list:
+    stat = path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def index_path(field_path: pathlib.Path, index_name: str) -> pathlib.Path:
+    return pathlib.Path(field_path) / INDEXES_DIR / index_name
+
+
+def build_well_name_index(welllist: pd.DataFrame) -> pd.DataFrame:
+    """Основные стволы (npath == 0) welllist; для повторяющегося OIS остается первый, как в WellNameIndex."""
+    main_bores = welllist[welllist['npath'] == 0].drop_duplicates('ois', keep='first')
+    return main_bores[['ois', 'num', 'npath']].reset_index(drop=True)
+
+
+def build_well_state_index(states: pd.DataFrame) -> pd.DataFrame:
+    """Периоды состояний скважин: строки states (dt, well.ois, sost, charwork.name) с одинаковым состоянием
+    скважины, даты которых идут подряд (без пропущенных дней), объединяются в одну строку [dt_start, dt_end].
+
+    У скважины есть строка с состоянием в периоде (date_after, date_end], если и только если есть период
+    этого состояния с dt_end > date_after и dt_start <= date_end.
+    """
+    states = states[['dt'] + STATE_COLUMNS].assign(dt=pd.to_datetime(states['dt']))
+    states = states.sort_values(STATE_COLUMNS + ['dt'], kind='stable').reset_index(drop=True)
+    keys = states[STATE_COLUMNS]
+    new_state = keys.ne(keys.shift()).any(axis=1)
+    gap = states['dt'].diff() > pd.Timedelta(days=1)
+    period = (new_state | gap).cumsum()
+    grouped = states.groupby(period, sort=False)
+    index = grouped[STATE_COLUMNS].first()
+    index['dt_start'] = grouped['dt'].min()
+    index['dt_end'] = grouped['dt'].max()
+    return index.reset_index(drop=True)
+
+
+def _write_index(path: pathlib.Path, index: pd.DataFrame, source: pathlib.Path) -> None:
+    table = pa.Table.from_pandas(index, preserve_index=False)
+    metadata = {**(table.schema.metadata or {}),
+                b'source': source.name.encode('UTF-8'),
+                b'source_version': json.dumps(_file_version(source)).encode('UTF-8')}
+    path_tmp = path.with_name(f'{path.name}.tmp')
+    feather.write_feather(table.replace_schema_metadata(metadata), str(path_tmp))
+    os.replace(path_tmp, path)
+
+
+def write_field_indexes(field_path: pathlib.Path) -> Dict[str, pathlib.Path]:
+    """Построение индексов по исходным файлам папки field_path (для отсутствующих файлов индексы не строятся).
+
+    Returns
+    -------
+    Пути к записанным индексам (ключ - имя индекса).
+    """
+    field_path = pathlib.Path(field_path)
+    (field_path / INDEXES_DIR).mkdir(exist_ok=True)
+    written = {}
+    for index_name, source_name in INDEX_SOURCES.items():
+        source = field_path / source_name
+        if not source.exists():
+            continue
+        if index_name == 'well_names.feather':
+            index = build_well_name_index(feather.read_feather(str(source), columns=['ois', 'num', 'npath']))
+        else:
+            index = build_well_state_index(feather.read_feather(str(source), columns=['dt'] + STATE_COLUMNS))
+        path = index_path(field_path, index_name)
+        _write_index(path, index, source)
+        written[index_name] = path
+        logger.info(f'Field data: index {path} built ({len(index)} rows)')
+    return written
+
+
+def install_indexes(upload_dir: pathlib.Path, field_path: pathlib.Path) -> None:
+    """Перенос индексов, построенных в папке upload_dir, в папку месторождения field_path."""
+    upload_indexes = pathlib.Path(upload_dir) / INDEXES_DIR
+    if not upload_indexes.exists():
+        return
+    (pathlib.Path(field_path) / INDEXES_DIR).mkdir(parents=True, exist_ok=True)
+    for path in upload_indexes.iterdir():
+        shutil.move(str(path), str(index_path(field_path, path.name)))
+
+
+def is_index_fresh(field_path: pathlib.Path, index_name: str, metadata: Optional[Dict[bytes, bytes]]) -> bool:
+    """Построен ли индекс index_name (metadata - метаданные схемы файла индекса) по текущей версии исходного файла."""
+    if not metadata or b'source_version' not in metadata:
+        return False
+    source = pathlib.Path(field_path) / INDEX_SOURCES[index_name]
+    if not source.exists():
+        return False
+    return json.loads(metadata[b'source_version']) == _file_version(source)
@@ -0,0 +1,163 @@
+import datetime
+import json
+import os
+import pathlib
+import shutil
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+from loguru import logger
+
+from UI.config import PARTITION_WELL_BUCKETS
+
+# Необязательное секционированное хранение больших файлов месторождения.
+# Файл <месторождение>/<имя>.feather раскладывается конвертером (partition_field_file, main_partition.py) в
+#   <месторождение>/partitions/<имя>/year=<год>/month=<месяц>/bucket=<корзина>/*.parquet
+#   <месторождение>/partitions/<имя>/_layout.json - параметры разбиения и версия исходного файла,
+# где корзина - хэш имени скважины по модулю числа корзин.
+# Исходный файл остается на месте (его читает препроцессор). Секции используются, пока версия
+# исходного файла (время изменения и размер) совпадает с версией в _layout.json.
+# Секции читает только read_well_states (UI.field_data): отбор по периоду расчета для страниц настроек моделей
+# и ГТМ, если нет индекса состояний скважин (UI.field_indexes). Корзины скважин задают лишь раскладку файлов;
+# чтение по скважинам и данные для препроцессора и моделей по-прежнему берутся из исходных feather-файлов.
+
+PARTITIONS_DIR = 'partitions'
+LAYOUT_FILE = '_layout.json'
+DATE_COLUMN = 'dt'
+WELL_COLUMN = 'well.ois'
+
+
+def _file_version(path: pathlib.Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def partitions_path(field_path: pathlib.Path, file_name: str) -> pathlib.Path:
+    return pathlib.Path(field_path) / PARTITIONS_DIR / pathlib.Path(file_name).stem
+
+
+def well_buckets(wells: Any, n_buckets: int) -> np.ndarray:
+    """Номера корзин скважин wells (хэш имени скважины по модулю n_buckets)."""
+    wells = np.asarray(wells)
+    if wells.dtype.kind in 'iu':
+        wells = wells.astype('int64')
+    return (pd.util.hash_array(wells) % n_buckets).astype('int16')
+
+
+def partition_field_file(field_path: pathlib.Path,
+                         file_name: str = 'sh_sost_fond.feather',
+                         n_buckets: int = PARTITION_WELL_BUCKETS) -> pathlib.Path:
+    """Раскладка файла file_name месторождения по секциям год/месяц/корзина скважин в формате Parquet.
+
+    Секции записываются во временную папку, которая затем заменяет прежние секции файла.
+
+    Parameters
+    ----------
+    field_path : pathlib.Path
+        папка месторождения.
+    file_name : str
+        feather-файл со столбцами dt (дата) и well.ois (скважина).
+    n_buckets : int
+        число корзин скважин.
+
+    Returns
+    -------
+    Путь к папке секций.
+    """
+    source = pathlib.Path(field_path) / file_name
+    version = _file_version(source)
+    table = feather.read_table(str(source), memory_map=True)
+    dates = table[DATE_COLUMN]
+    table = table.append_column('year', pc.cast(pc.year(dates), pa.int16()))
+    table = table.append_column('month', pc.cast(pc.month(dates), pa.int8()))
+    buckets = well_buckets(table[WELL_COLUMN].to_numpy(), n_buckets)
+    table = table.append_column('bucket', pa.array(buckets, type=pa.int16()))
+
+    path = partitions_path(field_path, file_name)
+    path_tmp = path.with_name(f'{path.name}.tmp')
+    if path_tmp.exists():
+        shutil.rmtree(path_tmp)
+    ds.write_dataset(
+        table,
+        path_tmp,
+        format='parquet',
+        partitioning=ds.partitioning(table.select(['year', 'month', 'bucket']).schema, flavor='hive'),
+        file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+    )
+    layout = {'source': file_name,
+              'source_version': list(version),
+              'n_buckets': n_buckets,
+              'date_span': [str(pc.min(dates).as_py()), str(pc.max(dates).as_py())]}
+    with open(path_tmp / LAYOUT_FILE, 'w', encoding='UTF-8') as file:
+        json.dump(layout, file, ensure_ascii=False, indent=1)
+    if path.exists():
+        shutil.rmtree(path)
+    os.replace(path_tmp, path)
+    logger.info(f'Field data: {source} partitioned into {path} ({table.num_rows} rows, {n_buckets} buckets)')
+    return path
+
+
+_datasets: Dict[pathlib.Path, Tuple[int, Dict[str, Any], ds.Dataset]] = {}
+_datasets_lock = threading.Lock()
+
+
+def partitioned_dataset(field_path: pathlib.Path,
+                        file_name: str) -> Optional[Tuple[Dict[str, Any], ds.Dataset]]:
+    """Параметры разбиения и набор данных секций файла file_name, если секции есть и не устарели."""
+    path = partitions_path(field_path, file_name)
+    layout_path = path / LAYOUT_FILE
+    if not layout_path.exists():
+        return None
+    mtime = layout_path.stat().st_mtime_ns
+    with _datasets_lock:
+        cached = _datasets.get(path)
+    if cached is not None and cached[0] == mtime:
+        layout, dataset = cached[1], cached[2]
+    else:
+        with open(layout_path, encoding='UTF-8') as file:
+            layout = json.load(file)
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        with _datasets_lock:
+            _datasets[path] = (mtime, layout, dataset)
+    source = pathlib.Path(field_path) / file_name
+    if source.exists() and list(_file_version(source)) != layout['source_version']:
+        logger.warning(f'Field data: partitions {path} are older than {source} and are not used')
+        return None
+    return layout, dataset
+
+
+def _month_bound(date: datetime.date, lower: bool) -> ds.Expression:
+    year, month = ds.field('year'), ds.field('month')
+    if lower:
+        return (year > date.year) | ((year == date.year) & (month >= date.month))
+    return (year < date.year) | ((year == date.year) & (month <= date.month))
+
+
+def read_partitioned(dataset: ds.Dataset,
+                     columns: Sequence[str],
+                     date_after: Optional[datetime.date] = None,
+                     date_end: Optional[datetime.date] = None,
+                     conditions: Sequence[ds.Expression] = ()) -> pa.Table:
+    """Столбцы columns строк секций за период (date_after, date_end].
+
+    Читаются только секции месяцев периода, затем строки отбираются по дате и дополнительным
+    условиям conditions.
+    """
+    date_type = dataset.schema.field(DATE_COLUMN).type
+    expressions = list(conditions)
+    if date_after is not None:
+        expressions.append(_month_bound(date_after, lower=True))
+        expressions.append(ds.field(DATE_COLUMN) > pa.scalar(pd.Timestamp(date_after), type=date_type))
+    if date_end is not None:
+        expressions.append(_month_bound(date_end, lower=False))
+        expressions.append(ds.field(DATE_COLUMN) <= pa.scalar(pd.Timestamp(date_end), type=date_type))
+    expression = None
+    for item in expressions:
+        expression = item if expression is None else expression & item
+    return dataset.to_table(columns=list(columns), filter=expression)
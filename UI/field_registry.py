@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import pathlib
+import threading
+from typing import Any, Dict, Optional
+
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+from loguru import logger
+
+from UI.field_data import read_field_frame
+from tools_preprocessor.preprocessor import Preprocessor
+
+# Реестр месторождений папки данных препроцессора: cache/fields.json.
+# Для каждого месторождения (папки с welllist.feather) хранятся цеха, число скважин, период sh_sost_fond
+# и хэши файлов. Реестр обновляется при загрузке данных (resume_app.add_oilfield) и перепроверяется
+# по времени изменения папок: файлы месторождения перечитываются, только если изменилась его папка
+# или welllist.feather. Хэш файла пересчитывается, только если изменились его размер или время изменения.
+# Пока в папке месторождения лежит метка INSTALL_MARKER (файлы переносятся загрузкой UI.ingest), месторождение
+# хранится в реестре с признаком installing и не выдается field_registry().
+
+REGISTRY_PATH = pathlib.Path.cwd() / 'cache' / 'fields.json'
+HASH_CHUNK_SIZE = 2 ** 20
+INSTALL_MARKER = '.installing'
+
+_registry: Dict[str, Any] = {}
+_registry_lock = threading.Lock()
+
+
+def _mtime(path: pathlib.Path) -> int:
+    return path.stat().st_mtime_ns
+
+
+def _file_hash(path: pathlib.Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _field_stamp(field_path: pathlib.Path) -> list:
+    welllist = field_path / 'welllist.feather'
+    stat = welllist.stat()
+    return [_mtime(field_path), stat.st_mtime_ns, stat.st_size]
+
+
+def _date_string(value: Any) -> str:
+    # dt хранится как timestamp или date32: as_py() дает datetime или date
+    return str(pd.Timestamp(value.as_py()).date())
+
+
+def field_stamp(field_name: str) -> Optional[tuple]:
+    """Штамп записи реестра месторождения field_name (время изменения папки и welllist.feather, размер
+    welllist.feather): дешевая версия данных месторождения без обхода его файлов. None, если папки нет."""
+    field_path = Preprocessor._path_general / field_name
+    if not (field_path / 'welllist.feather').exists():
+        return None
+    return tuple(_field_stamp(field_path))
+
+
+def describe_field(field_path: pathlib.Path, previous: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Запись реестра для месторождения из папки field_path (папка должна содержать welllist.feather).
+
+    Хэши файлов, размер и время изменения которых совпадают с предыдущей записью previous, не пересчитываются.
+    """
+    field_path = pathlib.Path(field_path)
+    welllist = read_field_frame(field_path, 'welllist.feather', ['ceh', 'ois'])
+    date_span = None
+    if (field_path / 'sh_sost_fond.feather').exists():
+        dates = feather.read_table(str(field_path / 'sh_sost_fond.feather'), columns=['dt'], memory_map=True)
+        dates = pc.min_max(dates['dt'])
+        if dates['min'].is_valid:
+            date_span = [_date_string(dates['min']), _date_string(dates['max'])]
+    previous_files = previous.get('files', {}) if previous is not None else {}
+    files = {}
+    for file in sorted(field_path.iterdir()):
+        if file.is_file():
+            stat = file.stat()
+            entry = previous_files.get(file.name)
+            if entry is None or entry['size'] != stat.st_size or entry.get('mtime_ns') != stat.st_mtime_ns:
+                entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _file_hash(file)}
+            files[file.name] = entry
+    return {
+        'shops': list(welllist['ceh'].unique()),
+        'n_wells': int(welllist['ois'].nunique()),
+        'date_span': date_span,
+        'files': files,
+        'stamp': _field_stamp(field_path),
+    }
+
+
+def _read_registry() -> Dict[str, Any]:
+    root = str(Preprocessor._path_general)
+    if REGISTRY_PATH.exists():
+        try:
+            with open(REGISTRY_PATH, encoding='UTF-8') as file:
+                registry = json.load(file)
+            if registry['root'] == root:
+                return registry
+        except (OSError, ValueError, KeyError):
+            logger.warning(f'Field registry: {REGISTRY_PATH} is damaged and will be rebuilt')
+    return {'root': root, 'root_mtime': None, 'fields': {}}
+
+
+def _write_registry(registry: Dict[str, Any]) -> None:
+    path = REGISTRY_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+    with open(path_tmp, 'w', encoding='UTF-8') as file:
+        json.dump(registry, file, ensure_ascii=False, indent=1)
+    os.replace(path_tmp, path)
+
+
+def _is_field_dir(path: pathlib.Path) -> bool:
+    # Папки, которые начинаются с точки, - временные папки загрузки (UI.ingest)
+    if path.name.startswith('.') or not path.is_dir():
+        return False
+    return (path / 'welllist.feather').exists() or (path / INSTALL_MARKER).exists()
+
+
+def field_registry() -> Dict[str, Dict[str, Any]]:
+    """Записи реестра всех месторождений (ключ - название месторождения).
+
+    Список папок месторождений перечитывается, только если изменилась папка данных,
+    запись месторождения - только если изменились его папка или welllist.feather.
+    Месторождения, файлы которых переносятся (метка INSTALL_MARKER), не выдаются.
+    """
+    global _registry
+    root = Preprocessor._path_general
+    with _registry_lock:
+        registry = _registry if _registry.get('root') == str(root) else _read_registry()
+        fields = dict(registry['fields'])
+        changed = False
+        root_mtime = _mtime(root)
+        if registry['root_mtime'] != root_mtime:
+            names = {path.name for path in root.iterdir() if _is_field_dir(path)}
+            for name in set(fields) - names:
+                del fields[name]
+            for name in names - set(fields):
+                fields[name] = None
+            changed = True
+        for name, entry in fields.items():
+            field_path = root / name
+            if (field_path / INSTALL_MARKER).exists():
+                if entry is None or not entry.get('installing'):
+                    # Запись перечитывается после снятия метки: штамп сбрасывается
+                    fields[name] = {**(entry or {}), 'installing': True, 'stamp': None}
+                    changed = True
+                continue
+            try:
+                if entry is not None and entry['stamp'] == _field_stamp(field_path):
+                    continue
+                fields[name] = describe_field(field_path, entry)
+            except FileNotFoundError:
+                fields[name] = None
+                continue
+            logger.info(f'Field registry: {name} registered')
+            changed = True
+        fields = {name: entry for name, entry in fields.items() if entry is not None}
+        registry = {'root': str(root), 'root_mtime': root_mtime, 'fields': fields}
+        if changed:
+            _write_registry(registry)
+        _registry = registry
+        return {name: entry for name, entry in fields.items() if not entry.get('installing')}
+
+
+def register_field(field_name: str) -> Optional[Dict[str, Any]]:
+    """Обновление записи месторождения field_name после изменения его файлов.
+    Возвращает запись реестра (None, если в папке нет welllist.feather или файлы еще переносятся)."""
+    global _registry
+    field_path = Preprocessor._path_general / field_name
+    if not (field_path / 'welllist.feather').exists() or (field_path / INSTALL_MARKER).exists():
+        return None
+    with _registry_lock:
+        registry = _registry if _registry.get('root') == str(Preprocessor._path_general) else _read_registry()
+        entry = describe_field(field_path, registry['fields'].get(field_name))
+        registry = {**registry, 'fields': {**registry['fields'], field_name: entry}}
+        _write_registry(registry)
+        _registry = registry
+    logger.info(f'Field registry: {field_name} registered')
+    return entry
@@ -0,0 +1,183 @@
+import os
+import pathlib
+import shutil
+import uuid
+from typing import Callable, Dict, IO, Iterable, List, Optional
+
+import pandas as pd
+import pyarrow.feather as feather
+from loguru import logger
+
+from UI.field_data import CATALOG
+from UI.field_indexes import install_indexes, write_field_indexes
+from UI.field_layout import PARTITIONS_DIR, partition_field_file, partitions_path
+from UI.field_registry import INSTALL_MARKER, register_field
+from UI.jobs import JOBS_DIR, JobQueue
+from tools_preprocessor.preprocessor import Preprocessor
+
+# Загрузка данных месторождения в фоновом воркере (задачи вида 'ingest' очереди UI.jobs).
+# Интерфейс записывает загруженные файлы в папку jobs/uploads/<номер> (submit_ingest), воркер
+# преобразует xlsm в feather, проверяет столбцы таблиц, раскладывает sh_sost_fond по секциям
+# (UI.field_layout), строит индексы имен и состояний скважин (UI.field_indexes) и переносит файлы
+# в папку месторождения. На время переноса в папке месторождения лежит метка INSTALL_MARKER: реестр
+# (UI.field_registry) не выдает месторождение, пока не перенесены все файлы и индексы. Если перенос
+# не удался, метка остается и месторождение скрыто до следующей загрузки.
+
+UPLOADS_DIR = JOBS_DIR / 'uploads'
+UPLOAD_CHUNK_SIZE = 2 ** 20
+REQUIRED_COLUMNS = {
+    'welllist.feather': ['ois', 'num', 'npath', 'ceh'],
+    'sh_sost_fond.feather': ['dt', 'well.ois', 'sost', 'charwork.name'],
+}
+INGEST_STAGES = {
+    'convert': 'Преобразование xlsm',
+    'validate': 'Проверка данных',
+    'partition': 'Секционирование sh_sost_fond',
+    'index': 'Построение индексов скважин',
+    'install': 'Перенос файлов',
+    'register': 'Регистрация месторождения',
+}
+
+
+def save_uploads(files: Iterable[IO]) -> pathlib.Path:
+    """Запись загруженных файлов на диск частями по UPLOAD_CHUNK_SIZE. Возвращает папку с файлами."""
+    upload_dir = UPLOADS_DIR / uuid.uuid4().hex
+    upload_dir.mkdir(parents=True)
+    for file in files:
+        file.seek(0)
+        with open(upload_dir / pathlib.Path(file.name).name, 'wb') as target:
+            shutil.copyfileobj(file, target, UPLOAD_CHUNK_SIZE)
+    return upload_dir
+
+
+def submit_ingest(field_name: str, files: Iterable[IO]) -> int:
+    """Постановка загрузки данных месторождения в очередь. Возвращает номер задачи."""
+    upload_dir = save_uploads(files)
+    queue = JobQueue()
+    job_id = queue.submit({'field_name': field_name, 'upload_dir': str(upload_dir)}, kind='ingest')
+    queue.ensure_worker()
+    logger.info(f'Ingest job {job_id} submitted: {field_name}, {upload_dir}')
+    return job_id
+
+
+def convert_xlsm(upload_dir: pathlib.Path) -> List[pathlib.Path]:
+    """Преобразование листов xlsm-файлов в feather: <файл>.feather для единственного листа,
+    иначе <файл>_<лист>.feather. Исходные xlsm-файлы сохраняются."""
+    converted = []
+    for path in sorted(upload_dir.glob('*.xlsm')):
+        sheets = pd.read_excel(path, sheet_name=None)
+        for sheet_name, df in sheets.items():
+            stem = path.stem if len(sheets) == 1 else f'{path.stem}_{sheet_name}'
+            target = upload_dir / f'{stem}.feather'
+            if target.exists():
+                continue
+            df.columns = df.columns.astype(str)
+            df.reset_index(drop=True).to_feather(target)
+            converted.append(target)
+    return converted
+
+
+def validate_upload(upload_dir: pathlib.Path, field_path: pathlib.Path) -> None:
+    """Проверка наличия обязательных столбцов в таблицах REQUIRED_COLUMNS.
+
+    welllist.feather обязателен, если месторождения еще нет.
+    """
+    if not (upload_dir / 'welllist.feather').exists() and not (field_path / 'welllist.feather').exists():
+        raise ValueError('Не загружен файл welllist.feather.')
+    for file_name, columns in REQUIRED_COLUMNS.items():
+        path = upload_dir / file_name
+        if not path.exists():
+            continue
+        schema = feather.read_table(str(path), memory_map=True).schema
+        missing = [column for column in columns if column not in schema.names]
+        if missing:
+            raise ValueError(f'В файле {file_name} нет столбцов: {", ".join(missing)}.')
+
+
+def partition_upload(upload_dir: pathlib.Path) -> None:
+    """Раскладка загруженного sh_sost_fond.feather по секциям (индекс по датам и скважинам)."""
+    if (upload_dir / 'sh_sost_fond.feather').exists():
+        partition_field_file(upload_dir, 'sh_sost_fond.feather')
+
+
+def _mark_installing(field_path: pathlib.Path) -> pathlib.Path:
+    marker = field_path / INSTALL_MARKER
+    if field_path.exists():
+        marker.touch()
+        return marker
+    # Папка нового месторождения создается рядом под временным именем и появляется уже с меткой
+    staging = field_path.with_name(f'.{field_path.name}.{uuid.uuid4().hex}')
+    staging.mkdir(parents=True)
+    (staging / INSTALL_MARKER).touch()
+    os.replace(staging, field_path)
+    return marker
+
+
+def install_files(upload_dir: pathlib.Path, field_path: pathlib.Path) -> None:
+    """Перенос подготовленных файлов, секций и индексов в папку месторождения (welllist.feather - последним).
+
+    Пока файлы переносятся, месторождение снято с регистрации (метка INSTALL_MARKER).
+    """
+    marker = _mark_installing(field_path)
+    # Отображенные в память файлы нельзя перезаписать в Windows
+    CATALOG.release(field_path)
+    upload_partitions = upload_dir / PARTITIONS_DIR
+    if upload_partitions.exists():
+        for path in upload_partitions.iterdir():
+            target = partitions_path(field_path, path.name)
+            if target.exists():
+                shutil.rmtree(target)
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.move(str(path), str(target))
+    files = sorted((path for path in upload_dir.iterdir() if path.is_file()),
+                   key=lambda path: path.name == 'welllist.feather')
+    for path in files:
+        shutil.move(str(path), str(field_path / path.name))
+    install_indexes(upload_dir, field_path)
+    marker.unlink()
+
+
+def ingest_field(field_name: str,
+                 upload_dir: pathlib.Path,
+                 progress: Optional[Callable[[str, str], None]] = None) -> Optional[Dict]:
+    """Подготовка загруженных данных месторождения field_name из папки upload_dir.
+
+    Parameters
+    ----------
+    field_name : str
+        название месторождения (папка tools_preprocessor/data/<field_name>).
+    upload_dir : pathlib.Path
+        папка с загруженными файлами (см. save_uploads), удаляется после загрузки.
+    progress : Callable[[str, str], None]
+        функция (этап, статус) для отображения хода загрузки (см. UI.jobs.JobQueue.update_progress).
+
+    Returns
+    -------
+    Запись реестра месторождений (UI.field_registry).
+    """
+    upload_dir = pathlib.Path(upload_dir)
+    field_path = Preprocessor._path_general / field_name
+    stages = {
+        'convert': lambda: convert_xlsm(upload_dir),
+        'validate': lambda: validate_upload(upload_dir, field_path),
+        'partition': lambda: partition_upload(upload_dir),
+        'index': lambda: write_field_indexes(upload_dir),
+        'install': lambda: install_files(upload_dir, field_path),
+        'register': lambda: register_field(field_name),
+    }
+    if progress is None:
+        progress = lambda stage, status: None
+    result = None
+    try:
+        for stage, func in stages.items():
+            progress(INGEST_STAGES[stage], 'running')
+            try:
+                result = func()
+            except Exception:
+                progress(INGEST_STAGES[stage], 'failed')
+                raise
+            progress(INGEST_STAGES[stage], 'done')
+    finally:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+    logger.success(f'Ingest: {field_name} is ready')
+    return result
@@ -0,0 +1,267 @@
+import json
+import os
+import pathlib
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+
+from loguru import logger
+
+from UI.app_state import RunState
+from UI.run_archive import read_run_archive, write_run_archive
+
+# Локальная очередь расчетов на SQLite.
+# Интерфейс ставит задачу в очередь (submit), процесс main_worker.py забирает задачи по одной (claim),
+# записывает статусы этапов расчета (update_progress) и сохраняет готовое состояние программы на диск.
+# Задачи бывают двух видов (столбец kind): 'run' - расчет моделей, 'ingest' - загрузка данных месторождения
+# (UI.ingest).
+# Воркер обрабатывает их независимо, поэтому загрузка данных не ждет окончания расчетов.
+
+JOBS_DIR = pathlib.Path.cwd() / 'jobs'
+JOB_STATUSES = {
+    'queued': 'В очереди',
+    'running': 'Выполняется',
+    'done': 'Готово',
+    'failed': 'Ошибка',
+}
+# Через сколько секунд без сигнала от воркера он считается остановленным
+WORKER_TIMEOUT = 30
+WORKER_HEARTBEAT_PERIOD = 10
+STALE_JOB_ERROR = 'Воркер остановился во время выполнения задачи'
+
+# Файлы очереди, схема которых уже создана в этом процессе
+_schema_ready: Set[pathlib.Path] = set()
+_schema_lock = threading.Lock()
+
+
+def _to_builtin(value: Any) -> Any:
+    # Имена скважин из feather-файлов могут быть скалярами numpy
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+class JobQueue:
+    """Очередь расчетов, хранящаяся в файле SQLite.
+
+    Файл доступен нескольким процессам: сессиям Streamlit и воркерам.
+    Схема файла создается и обновляется один раз за процесс, при первом создании очереди.
+    """
+
+    def __init__(self, path: pathlib.Path = JOBS_DIR / 'jobs.sqlite'):
+        self.path = path
+        with _schema_lock:
+            if self.path not in _schema_ready:
+                self._create_schema()
+                _schema_ready.add(self.path)
+
+    def _create_schema(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    status TEXT NOT NULL,
+                    config TEXT NOT NULL,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    result_path TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    kind TEXT NOT NULL DEFAULT 'run'
+                )""")
+            columns = [row['name'] for row in connection.execute('PRAGMA table_info(jobs)')]
+            if 'kind' not in columns:
+                connection.execute("ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT 'run'")
+            if 'worker' not in columns:
+                # pid воркера, выполняющего задачу
+                connection.execute('ALTER TABLE jobs ADD COLUMN worker INTEGER')
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS workers (
+                    pid INTEGER PRIMARY KEY,
+                    heartbeat REAL NOT NULL,
+                    cache_stats TEXT
+                )""")
+            columns = [row['name'] for row in connection.execute('PRAGMA table_info(workers)')]
+            if 'cache_stats' not in columns:
+                connection.execute('ALTER TABLE workers ADD COLUMN cache_stats TEXT')
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def submit(self, config: Dict[str, Any], kind: str = 'run') -> int:
+        """Ставит задачу в очередь и возвращает ее номер.
+
+        config - для расчета: конфигурация пакетного запуска (см. main_batch.py), даты в формате ISO;
+        для загрузки данных: см. UI.ingest.submit_ingest.
+        """
+        with self._connect() as connection:
+            cursor = connection.execute(
+                'INSERT INTO jobs (status, config, created, kind) VALUES (?, ?, ?, ?)',
+                ('queued', json.dumps(config, ensure_ascii=False, default=_to_builtin), time.time(), kind)
+            )
+            return cursor.lastrowid
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as connection:
+            row = connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def position(self, job_id: int) -> int:
+        """Число задач того же вида в очереди перед данной."""
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ? "
+                "AND kind = (SELECT kind FROM jobs WHERE id = ?)", (job_id, job_id)
+            ).fetchone()
+        return row[0]
+
+    def claim(self, kind: str = 'run') -> Optional[Dict[str, Any]]:
+        """Забирает самую раннюю задачу вида kind из очереди. Возвращает None, если очередь пуста."""
+        with self._connect() as connection:
+            # BEGIN IMMEDIATE блокирует запись, поэтому задачу не заберут два воркера сразу
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' AND kind = ? ORDER BY id LIMIT 1", (kind,)
+                ).fetchone()
+                if row is not None:
+                    connection.execute("UPDATE jobs SET status = 'running', started = ?, worker = ? WHERE id = ?",
+                                       (time.time(), os.getpid(), row['id']))
+                    row = connection.execute('SELECT * FROM jobs WHERE id = ?', (row['id'],)).fetchone()
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+        return self._to_dict(row)
+
+    def update_progress(self, job_id: int, stage: str, status: str) -> None:
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                row = connection.execute('SELECT progress FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                progress = json.loads(row['progress'])
+                progress[stage] = status
+                connection.execute('UPDATE jobs SET progress = ? WHERE id = ?', (json.dumps(progress), job_id))
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+
+    def finish_ingest(self, job_id: int) -> bool:
+        """Отмечает задачу загрузки данных выполненной (см. finish)."""
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'done', finished = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)
+            )
+        if cursor.rowcount == 0:
+            logger.warning(f'Job {job_id}: already marked {self._status(job_id)}, result is not saved')
+            return False
+        return True
+
+    def finish(self, job_id: int, state: RunState) -> bool:
+        """Сохраняет готовое состояние программы и отмечает задачу выполненной.
+
+        Задача отмечается, только если она еще выполняется: задачу, которую recover_stale уже отметил
+        ошибкой (воркер долго не отвечал), интерфейс мог показать пользователю как неудачную.
+        Возвращает False, если задача уже не выполнялась (архив результата тогда удаляется).
+        """
+        result_path = JOBS_DIR / 'results' / f'{job_id}.zip'
+        result_path.parent.mkdir(parents=True, exist_ok=True)
+        write_run_archive(state, result_path)
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'done', result_path = ?, finished = ? WHERE id = ? AND status = 'running'",
+                (str(result_path), time.time(), job_id)
+            )
+        if cursor.rowcount == 0:
+            logger.warning(f'Job {job_id}: already marked {self._status(job_id)}, result is not saved')
+            result_path.unlink(missing_ok=True)
+            return False
+        return True
+
+    def _status(self, job_id: int) -> Optional[str]:
+        job = self.get(job_id)
+        return job['status'] if job is not None else None
+
+    def fail(self, job_id: int, error: str) -> None:
+        with self._connect() as connection:
+            connection.execute("UPDATE jobs SET status = 'failed', error = ?, finished = ? WHERE id = ?",
+                               (error, time.time(), job_id))
+
+    def recover_stale(self) -> int:
+        """Отмечает ошибкой задачи, которые выполнялись воркером, переставшим отвечать (например, после сбоя).
+
+        Возвращает число таких задач.
+        """
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished = ? WHERE status = 'running' "
+                "AND (worker IS NULL OR worker NOT IN (SELECT pid FROM workers WHERE heartbeat > ?))",
+                (STALE_JOB_ERROR, time.time(), time.time() - WORKER_TIMEOUT)
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def load_result(job: Dict[str, Any]) -> RunState:
+        """Загружает состояние программы, рассчитанное воркером."""
+        state = read_run_archive(job['result_path'], lazy=True)
+        state['job_id'] = job['id']
+        return state
+
+    def heartbeat(self, pid: int, cache_stats: Optional[Dict[str, int]] = None) -> None:
+        """Отметка о работе воркера pid и счетчики его кэша результатов (UI.memory_cache.MemoryCache.stats)."""
+        with self._connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO workers (pid, heartbeat, cache_stats) VALUES (?, ?, ?)',
+                               (pid, time.time(), json.dumps(cache_stats) if cache_stats is not None else None))
+
+    def worker_cache_stats(self) -> Optional[Dict[str, int]]:
+        """Счетчики кэша результатов работающего воркера, если он их сообщил."""
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT cache_stats FROM workers WHERE cache_stats IS NOT NULL AND heartbeat > ? '
+                'ORDER BY heartbeat DESC LIMIT 1', (time.time() - WORKER_TIMEOUT,)
+            ).fetchone()
+        return json.loads(row['cache_stats']) if row is not None else None
+
+    def has_alive_worker(self) -> bool:
+        with self._connect() as connection:
+            row = connection.execute('SELECT MAX(heartbeat) FROM workers').fetchone()
+        return row[0] is not None and time.time() - row[0] < WORKER_TIMEOUT
+
+    def ensure_worker(self) -> None:
+        """Запускает фоновый процесс main_worker.py, если ни один воркер не отвечает."""
+        if self.has_alive_worker():
+            return
+        # Задачи остановившегося воркера новый воркер не продолжит
+        self.recover_stale()
+        script = pathlib.Path(__file__).resolve().parent.parent / 'main_worker.py'
+        kwargs = {}
+        if os.name == 'nt':
+            kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS
+        else:
+            kwargs['start_new_session'] = True
+        subprocess.Popen([sys.executable, str(script)], cwd=script.parent,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, **kwargs)
+        # Воркер отмечается в очереди при запуске, повторный запуск до этого момента не нужен
+        self.heartbeat(-1)
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job['config'] = json.loads(job['config'])
+        job['progress'] = json.loads(job['progress'])
+        return job
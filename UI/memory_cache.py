@@ -0,0 +1,116 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from UI.config import MEMORY_CACHE_BUDGET_MB
+from UI.statistics_store import StatisticsStore
+
+
+def estimate_size(value: Any) -> int:
+    """Оценка объема памяти, занимаемой объектом, в байтах.
+
+    Для таблиц учитываются данные столбцов и индекса (включая строки),
+    для словарей, списков и кортежей - размер всех элементов.
+    """
+    if isinstance(value, StatisticsStore):
+        return value.nbytes
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(key) + estimate_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class MemoryCache:
+    """Кэш в памяти процесса с вытеснением давно не использованных записей (LRU).
+
+    Суммарный объем записей не превышает max_bytes: при добавлении новой записи
+    вытесняются самые старые. Запись, которая больше max_bytes, не кэшируется.
+
+    Parameters
+    ----------
+    max_bytes : int
+        бюджет памяти кэша в байтах.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key][0]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self.size -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                logger.warning(f'Memory cache: entry of {size} bytes exceeds the budget and is not cached')
+                return
+            while self._entries and self.size + size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (value, size)
+            self.size += size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики кэша: число записей, занятый объем и бюджет в байтах, попадания, промахи, вытеснения."""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'size': self.size,
+                'max_size': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Результаты этапов расчета моделей (см. UI.pipeline._cached_task)
+STAGE_RESULTS = MemoryCache(MEMORY_CACHE_BUDGET_MB * 2 ** 20)
+
+
+def stats_to_frame(stats: Dict[str, int], name: Optional[str] = None) -> pd.DataFrame:
+    """Счетчики кэша в виде таблицы для отображения в интерфейсе."""
+    frame = pd.DataFrame({
+        'Записей': [stats['entries']],
+        'Занято, МБ': [round(stats['size'] / 2 ** 20, 1)],
+        'Бюджет, МБ': [round(stats['max_size'] / 2 ** 20, 1)],
+        'Попадания': [stats['hits']],
+        'Промахи': [stats['misses']],
+        'Вытеснения': [stats['evictions']],
+    }, index=[name] if name is not None else None)
+    return frame
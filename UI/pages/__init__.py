@@ -1,4 +1,5 @@
 import UI.pages.analytics
+import UI.pages.diagnostics
 import UI.pages.models_settings
 import UI.pages.resume_app
 import UI.pages.specific_well
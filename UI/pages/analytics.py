@@ -2,8 +2,9 @@ from typing import Tuple
 import pandas as pd
 import streamlit as st
 
-from UI.app_state import AppState
+from UI.app_state import RunState
 from UI.cached_funcs import calculate_statistics_plots
+from UI.statistics_store import model_columns
 
 
 def show(session: st.session_state) -> None:
@@ -21,10 +22,10 @@ def show(session: st.session_state) -> None:
         draw_form_exclude_wells(state, selected_wells_set)
 
 
-def select_wells_set(state: AppState) -> Tuple[str, ...]:
+def select_wells_set(state: RunState) -> Tuple[str, ...]:
     wells_in_model = []
-    for df in state.statistics_test_only.values():
-        wells_in_model.append(set([col.split('_')[0] for col in df.columns]))
+    for model in state.statistics_test_only:
+        wells_in_model.append(set([col.split('_')[0] for col in model_columns(state.statistics_test_only, model)]))
     # Можно строить статистику либо для общего набора скважин (скважина рассчитана всеми моделями),
     # либо для всех скважин (скважина рассчитана хотя бы одной моделью).
     # Выберите, что подать в конфиг ниже: well_names_common или well_names_all.
@@ -34,15 +35,22 @@ def select_wells_set(state: AppState) -> Tuple[str, ...]:
     return well_names_for_statistics
 
 
-def draw_statistics_plots(state: AppState, selected_wells_set: Tuple[str, ...], add_models: str) -> None:
+def make_statistics_key(state: RunState) -> tuple:
+    """Ключ результатов моделей для кэша графиков: расчет (run_id и отпечатки этапов) и набор моделей,
+    включая загруженные пользователем."""
+    return state.run_id, tuple(sorted((state.fingerprints or {}).items())), tuple(state.statistics_test_only)
+
+
+def draw_statistics_plots(state: RunState, selected_wells_set: Tuple[str, ...], add_models: str) -> None:
     analytics_plots, config_stat = calculate_statistics_plots(
-        statistics=state.statistics_test_only,
+        statistics_key=make_statistics_key(state),
+        _statistics=state.statistics_test_only,
         field_name=state.was_config.field_name,
         date_start=state.statistics_test_index[0],
         date_end=state.statistics_test_index[-1],
         well_names=selected_wells_set,
         use_abs=True,
-        exclude_wells=state.exclude_wells,
+        exclude_wells=tuple(state.exclude_wells or ()),
         bin_size=10,
         add_models=add_models
     )
@@ -63,7 +71,7 @@ def select_plots_subset() -> str:
     return MODES[mode]
 
 
-def draw_form_exclude_wells(state: AppState, selected_wells_set: Tuple[str, ...]) -> None:
+def draw_form_exclude_wells(state: RunState, selected_wells_set: Tuple[str, ...]) -> None:
     # Форма "Исключить скважины из статистики"
     form = st.form("form_exclude_wells")
     form.multiselect("Исключить скважины из статистики:",
@@ -73,5 +81,5 @@ def draw_form_exclude_wells(state: AppState, selected_wells_set: Tuple[str, ...]
     form.form_submit_button("Применить", on_click=update_exclude_wells, args=(state,))
 
 
-def update_exclude_wells(state: AppState) -> None:
+def update_exclude_wells(state: RunState) -> None:
     state.exclude_wells = st.session_state.mselect_exclude_wells
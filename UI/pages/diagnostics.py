@@ -0,0 +1,57 @@
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from UI.timing import read_timeline
+
+TIMELINE_COLUMNS = {
+    'name': 'Интервал',
+    'parent': 'Внутри',
+    'pid': 'Процесс',
+    'n_wells': 'Скважин',
+    'well': 'Скважина',
+    'start': 'Начало',
+    'wall_time': 'Время, с',
+    'cpu_time': 'Процессорное время, с',
+    'peak_rss': 'Пиковый RSS процесса, МБ',
+    'peak_memory': 'Пиковая память Python, МБ',
+}
+
+
+def show(session: st.session_state) -> None:
+    state = session.state
+    if not state.run_id:
+        st.info('Здесь будет отображаться время выполнения этапов последнего расчета.')
+        return
+    timeline = read_timeline(state.run_id)
+    if timeline.empty:
+        st.info('Замеры времени для последнего расчета не найдены.')
+        return
+    draw_timeline_chart(timeline)
+    draw_timeline_table(timeline, state.run_id)
+
+
+def draw_timeline_chart(timeline: pd.DataFrame) -> None:
+    st.subheader('Ход расчета')
+    timeline = timeline.assign(process=timeline['pid'].astype(str))
+    fig = px.timeline(timeline, x_start='start', x_end='finish', y='name', color='process',
+                      hover_data=['parent', 'wall_time', 'cpu_time'])
+    fig.update_yaxes(autorange='reversed', title=None)
+    st.plotly_chart(fig, use_container_width=True)
+
+
+def draw_timeline_table(timeline: pd.DataFrame, run_id: str) -> None:
+    st.subheader('Этапы расчета')
+    table = timeline[[column for column in TIMELINE_COLUMNS if column in timeline]].copy()
+    table['wall_time'] = table['wall_time'].round(3)
+    table['cpu_time'] = table['cpu_time'].round(3)
+    for column in ('peak_rss', 'peak_memory'):
+        if column in table:
+            # peak_rss нет в записях, сделанных до его появления
+            table[column] = (table[column].astype(float) / 2 ** 20).round(1)
+    table = table.rename(columns=TIMELINE_COLUMNS)
+    st.dataframe(table, use_container_width=True)
+    st.download_button(label='Экспорт замеров .csv',
+                       data=table.to_csv(index=False).encode('UTF-8'),
+                       file_name=f'timings_{run_id}.csv',
+                       mime='text/csv')
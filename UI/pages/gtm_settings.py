@@ -5,29 +5,17 @@ from frameworks_shelf_algo.class_Shelf.constants import GTMS, GTM_DATA_FORMAT, N
     DEBIT_INCREASE, DEBIT_INCREASE_LIQ, N_DAYS_DEBIT_RECOVERY, DATE_START_MLSP
 import datetime as dt
 from frameworks_shelf_algo.class_Shelf.support_functions import get_date_range, _get_path
+from UI.field_data import get_well_name_index, read_wells_in_state
 
 
 def show(session: st.session_state):
     # print("GTM show")
     if session['change_gtm'] == 0:
         _path = _get_path(session.field_name)
-        welllist = pd.read_feather(_path / 'welllist.feather')
+        all_wells_ois_ = read_wells_in_state(_path, date_after=session.date_test, sost='В работе',
+                                             charwork='Нефтяные', date_end=session.date_end)
         #
-        wells_work = pd.read_feather(_path / 'sh_sost_fond.feather')
-        wells_work.set_index('dt', inplace=True)
-        wells_work = wells_work[wells_work.index > session.date_test]
-        wells_work = wells_work[wells_work["sost"] == 'В работе']
-        wells_work = wells_work[wells_work["charwork.name"] == 'Нефтяные']
-        all_wells_ois_ = wells_work["well.ois"]
-        #
-        wellnames_key_normal_ = {}
-        wellnames_key_ois_ = {}
-        for name_well in all_wells_ois_.unique():
-            well_name_norm = welllist[welllist["ois"] == name_well]
-            well_name_norm = well_name_norm[well_name_norm.npath == 0]
-            well_name_norm = well_name_norm.at[well_name_norm.index[0], 'num']
-            wellnames_key_normal_[well_name_norm] = name_well
-            wellnames_key_ois_[name_well] = well_name_norm
+        wellnames_key_normal_, wellnames_key_ois_ = get_well_name_index(_path).map(all_wells_ois_)
     else:
         wellnames_key_normal_ = session.state.wellnames_key_normal
         wellnames_key_ois_ = session.state.wellnames_key_ois
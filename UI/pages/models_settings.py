@@ -4,7 +4,7 @@ import datetime
 import json
 import numpy
 from copy import deepcopy
-from UI.config import ML_FULL_ABBR, YES_NO, DEFAULT_FTOR_BOUNDS
+from UI.config import ML_FULL_ABBR, YES_NO, DEFAULT_FTOR_BOUNDS, DEFAULT_FTOR_PROCESSES
 from frameworks_shelf_algo.class_Shelf.config import ConfigShelf
 from frameworks_shelf_algo.class_Shelf.support_functions import _get_path, \
     transform_str_dates_to_datetime_or_vice_versa, get_s_decline_rates, get_s_decline_rates_liq
@@ -12,6 +12,7 @@ from frameworks_shelf_algo.class_Shelf.data_processor_shelf import DataProcessor
 from tools_preprocessor.config import Config as ConfigPreprocessor
 from tools_preprocessor.preprocessor import Preprocessor
 from UI.cached_funcs import run_preprocessor #, parse_well_names
+from UI.field_data import get_well_name_index, read_wells_in_state
 # from UI.pages.tp_settings import draw_last_measurement_settings, draw_decline_rates_settings
 from frameworks_shelf_algo.class_Shelf.constants import LAST_MEASUREMENT, DATE, \
     VALUE, VALUE_LIQ, DEC_RATES, DEC_RATES_LIQ
@@ -61,6 +62,16 @@ def draw_ftor_settings(session: st.session_state) -> None:
                     key=f'{param_name}_upper_',
                     help='включительно'
                 )
+            st.number_input(
+                label='Число процессов адаптации',
+                min_value=1,
+                value=session.ftor_processes,
+                max_value=DEFAULT_FTOR_PROCESSES,
+                step=1,
+                help="""Скважины адаптируются независимо, поэтому их адаптацию можно 
+                        распределить между несколькими ядрами процессора""",
+                key='ftor_processes_'
+            )
             submit_bounds = st.form_submit_button('Применить',
                                                   on_click=update_ftor_constraints,
                                                   kwargs={'write_from': session,
@@ -183,21 +194,9 @@ def draw_shelf_settings(session: st.session_state) -> None:
         _path = _get_path(session.field_name)
         # if session['change_gtm_info'] == 0:
         if session['change_gtm'] == 0:
-            welllist = pd.read_feather(_path / 'welllist.feather')
-            wells_work = pd.read_feather(_path / 'sh_sost_fond.feather')
-            wells_work.set_index('dt', inplace=True)
-            wells_work = wells_work[wells_work.index > session.date_test]
-            wells_work = wells_work[wells_work["sost"] == 'В работе']
-            wells_work = wells_work[wells_work["charwork.name"] == 'Нефтяные']
-            all_wells_ois_ = wells_work["well.ois"]
-            wellnames_key_normal_ = {}
-            wellnames_key_ois_ = {}
-            for ois_well in all_wells_ois_.unique():
-                well_name_norm = welllist[welllist["ois"] == ois_well]
-                well_name_norm = well_name_norm[well_name_norm.npath == 0]
-                well_name_norm = well_name_norm.at[well_name_norm.index[0], 'num']
-                wellnames_key_normal_[well_name_norm] = ois_well
-                wellnames_key_ois_[ois_well] = well_name_norm
+            all_wells_ois_ = read_wells_in_state(_path, date_after=session.date_test, sost='В работе',
+                                                 charwork='Нефтяные', date_end=session.date_end)
+            wellnames_key_normal_, wellnames_key_ois_ = get_well_name_index(_path).map(all_wells_ois_)
         else:
             wellnames_key_normal_ = session.state.wellnames_key_normal
             wellnames_key_ois_ = session.state.wellnames_key_ois
@@ -396,6 +395,7 @@ def update_ftor_constraints(write_from: st.session_state,
         write_to[f'{param_name}_lower'] = write_from[f'{param_name}_lower_']
         write_to[f'{param_name}_default'] = write_from[f'{param_name}_default_']
         write_to[f'{param_name}_upper'] = write_from[f'{param_name}_upper_']
+    write_to['ftor_processes'] = int(write_from['ftor_processes_'])
 
     constraints = {}
     for param_name, param_dict in DEFAULT_FTOR_BOUNDS.items():
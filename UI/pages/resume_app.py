@@ -1,26 +1,31 @@
 import io
-import pickle
+import zipfile
 from pathlib import Path
-from typing import IO
+from typing import IO, List
 
 import pandas as pd
 import streamlit as st
 from loguru import logger
 
-from UI.app_state import AppState
-from UI.config import FIELDS_SHOPS
-from statistics_explorer.config import ConfigStatistics
+from UI.app_state import RunState
+from UI.config import BACKGROUND_JOBS, FIELDS_SHOPS
+from UI.data_processor import export_results_to_excel
+from UI.field_data import CATALOG
+from UI.ingest import ingest_field, save_uploads, submit_ingest
+from UI.jobs import JOB_STATUSES, JobQueue
+from UI.run_archive import page_in, read_run_archive, run_archive_bytes, start_page_in
 
 
 def show(session: st.session_state) -> None:
     state = session.state
-    draw_upload_state(state)
-    draw_export_state(state)
+    draw_upload_state(session)
+    draw_export_state(session)
     draw_export_excel(state)
-    draw_upload_oilfield_data()
+    draw_memory_report(state)
+    draw_upload_oilfield_data(session)
     external_stats(state)
 
-def draw_upload_state(state: AppState) -> None:
+def draw_upload_state(session: st.session_state) -> None:
     st.subheader("Импорт готового состояния программы")
     st.write(
         "При импорте приложение попытается восстановить данные для всех вкладок приложения."
@@ -29,62 +34,53 @@ def draw_upload_state(state: AppState) -> None:
     )
     uploaded_state = st.file_uploader(
         'Загрузить готовое состояние программы:',
-        type='pickle',
-        help="""Входной файл должен иметь расширение **.pickle**"""
+        type='zip',
+        help="""Входной файл - архив расчета с расширением **.zip**, сохраненный кнопкой экспорта ниже"""
     )
-    if uploaded_state is not None:
+    # Архив читается один раз: результаты моделей загружаются по скважинам при обращении
+    # и целиком в фоновом потоке
+    if uploaded_state is not None and session.get('imported_archive') != (uploaded_state.name, uploaded_state.size):
+        state = session.state
         try:
-            saved_state = pickle.load(uploaded_state)
-            for key in saved_state:
-                state[key] = saved_state[key]
+            state.update(read_run_archive(uploaded_state, lazy=True).to_dict())
+            start_page_in(state)
+            session['imported_archive'] = (uploaded_state.name, uploaded_state.size)
             st.success("Расчеты обработаны успешно! "
                        "Обновлены вкладки **Карта скважин**, **Аналитика** и **Скважина**.")
-        except pickle.UnpicklingError as err:
-            st.error('Не удалось восстановить расчеты.', err)
-            logger.exception('Не удалось восстановить расчеты.', err)
+        except (ValueError, zipfile.BadZipFile) as err:
+            st.error(f'Не удалось восстановить расчеты: {err}')
+            logger.exception('Не удалось восстановить расчеты.')
 
 
-def draw_export_state(state: AppState) -> None:
+def draw_export_state(session: st.session_state) -> None:
     st.subheader("Экспорт текущего состояния программы")
-    try:
-        state_to_save = {key: state[key] for key in state}
-        state_to_save = pickle.dumps(state_to_save)
+    state = session.state
+    if not state.statistics:
+        st.info('Кнопка станет доступна, как только будет рассчитана хотя бы одна скважина.')
+        return
+    # Архив создается только по запросу пользователя и хранится до следующего расчета
+    if st.button('Подготовить архив расчета'):
+        session['run_archive'] = (state.run_id, run_archive_bytes(state))
+    archive = session.get('run_archive')
+    if archive is not None and archive[0] == state.run_id:
         st.download_button(
             label="Экспорт текущего состояния программы",
-            data=state_to_save,
-            file_name=f"{state.was_config.field_name}_{state.was_date_test}_{state.was_date_end}.pickle",
-            mime='application/octet-stream',
+            data=archive[1],
+            file_name=f"{state.was_config.field_name}_{state.was_date_test}_{state.was_date_end}.zip",
+            mime='application/zip',
         )
-    except pickle.PicklingError as err:
-        text_error = 'Не удалось создать файл для экспорта. Результаты расчетов в формате .xlsx можно '
-        'экспортировать по кнопке ниже.'
-        st.error(text_error)
-        logger.exception(text_error, err)
-    except AttributeError as err:
-        logger.exception(err)
-    finally:
-        st.info('Кнопка станет доступна, как только будет рассчитана хотя бы одна скважина.')
 
 
-def draw_export_excel(state: AppState) -> None:
+def draw_export_excel(state: RunState) -> None:
     st.subheader("Экспорт результатов по всем скважинам в Excel-формате (.xlsx)")
     st.write("""**Внимание!** Результаты, экспортированные в формате .xlsx, будет 
         невозможно импортировать как состояние программы.""")
     # Подготовка данных к выгрузке
     if state.statistics:
         if state.buffer is None:
+            page_in(state)
             state.buffer = io.BytesIO()
-            with pd.ExcelWriter(state.buffer) as writer:
-                for key in state.statistics:
-                    state.statistics[key].to_excel(writer, sheet_name=ConfigStatistics.MODEL_NAMES[key])
-                if not state.ensemble_interval.empty:
-                    state.ensemble_interval.to_excel(writer, sheet_name='Доверит. интервал ансамбль')
-                if state.adapt_params:
-                    df_adapt_params = pd.DataFrame(state.adapt_params)
-                    df_adapt_params.to_excel(writer, sheet_name='Параметры адаптации пьезо')
-                if state.models_weights:
-                    for mode in state.models_weights.keys():
-                        pd.DataFrame.from_dict(state.models_weights[mode]).to_excel(writer, sheet_name=f'Веса моделей {mode}')
+            export_results_to_excel(state, state.buffer)
 
         st.download_button(label="Экспорт .xlsx",
                            data=state.buffer,
@@ -94,7 +90,23 @@ def draw_export_excel(state: AppState) -> None:
         st.info("Кнопка станет доступна, как только будет рассчитана хотя бы одна скважина.")
 
 
-def draw_upload_oilfield_data() -> None:
+def draw_memory_report(state: RunState) -> None:
+    st.subheader("Память, занимаемая результатами моделей")
+    if not state.statistics:
+        st.info("Отчет станет доступен, как только будет рассчитана хотя бы одна скважина.")
+        return
+    report = state.statistics.memory_report()
+    st.dataframe(report)
+    st.write(f"Всего: {report['Память, МБ'].sum():.2f} МБ")
+    with st.expander('Память по полям состояния программы'):
+        st.dataframe((state.memory_usage() / 2 ** 20).round(2).rename('Память, МБ'))
+    st.button('Хранить компактно (float32)',
+              on_click=state.statistics.compact,
+              help='Значения переводятся во float32, дни без значений в начале и в конце '
+                   'периода не хранятся. Точность значений снижается до 6-7 значащих цифр.')
+
+
+def draw_upload_oilfield_data(session: st.session_state) -> None:
     st.subheader("Загрузка входных данных по месторождению")
     oilfield_name = st.text_input('Введите название месторождения', max_chars=30)
     oilfield_shops = st.text_input('Введите название цехов',
@@ -106,22 +118,61 @@ def draw_upload_oilfield_data() -> None:
                                       type=['feather', 'xlsm'])
     button_add_oilfield = st.button('OK')
     if button_add_oilfield:
-        add_oilfield(oilfield_name, oilfield_files)
-
-
-def add_oilfield(oilfield_name: str,
-                 oilfield_files: IO) -> None:
-    path_to_save = Path.cwd() / 'tools_preprocessor' / 'data' / oilfield_name
-    if not path_to_save.exists():
-        path_to_save.mkdir()
-    for file in oilfield_files:
-        with open(path_to_save / file.name, 'wb') as f:
-            f.write(file.getbuffer())
-    if Path(path_to_save / 'welllist.feather').exists():
-        oilfield_shops = pd.read_feather(Path(path_to_save / 'welllist.feather'))
-        FIELDS_SHOPS[oilfield_name] = list(oilfield_shops.ceh.unique())
-
-def external_stats(state: AppState):
+        add_oilfield(session, oilfield_name, oilfield_files)
+    draw_ingest_status(session)
+
+
+def add_oilfield(session: st.session_state,
+                 oilfield_name: str,
+                 oilfield_files: List[IO]) -> None:
+    """Загрузка данных месторождения (UI.ingest): в фоновом воркере либо, если фоновые расчеты
+    отключены (UI.config.BACKGROUND_JOBS), в процессе интерфейса."""
+    if not oilfield_name or not oilfield_files:
+        st.error('Введите название месторождения и выберите файлы.')
+        return
+    # Воркер не сможет заменить файлы, отображенные в память процессом интерфейса (Windows)
+    CATALOG.release(Path.cwd() / 'tools_preprocessor' / 'data' / oilfield_name)
+    if BACKGROUND_JOBS:
+        session['ingest_job_id'] = submit_ingest(oilfield_name, oilfield_files)
+        return
+    with st.spinner('Загрузка данных месторождения...'):
+        try:
+            entry = ingest_field(oilfield_name, save_uploads(oilfield_files))
+        except ValueError as err:
+            st.error(str(err))
+            return
+    if entry is not None:
+        FIELDS_SHOPS[oilfield_name] = list(entry['shops'])
+        st.success(f'Месторождение {oilfield_name} загружено.')
+
+
+def draw_ingest_status(session: st.session_state) -> None:
+    """Ход фоновой загрузки данных месторождения."""
+    if session.get('ingest_job_id') is None:
+        return
+    queue = JobQueue()
+    job = queue.get(session.ingest_job_id)
+    if job is None:
+        session.ingest_job_id = None
+        return
+    field_name = job['config']['field_name']
+    if job['status'] == 'done':
+        session.ingest_job_id = None
+        st.success(f'Месторождение {field_name} загружено и доступно для выбора.')
+        return
+    if job['status'] == 'failed':
+        session.ingest_job_id = None
+        st.error(f'Не удалось загрузить месторождение {field_name}: {job["error"]}')
+        return
+    if job['status'] == 'queued':
+        st.info(f'Загрузка месторождения {field_name} в очереди.')
+    else:
+        st.info(f'Загрузка месторождения {field_name} выполняется.')
+        for stage, status in job['progress'].items():
+            st.write(f'{stage}: {JOB_STATUSES[status]}')
+    st.button('Обновить статус загрузки')
+
+def external_stats(state: RunState):
     st.subheader("Загрузка готовых данных для статистики и Ансамбля")
     uploaded_file = st.file_uploader('Принимаются данные в формате .xlsx',
                                     accept_multiple_files=False,
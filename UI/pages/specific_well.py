@@ -7,8 +7,9 @@ import plotly.graph_objects as go
 import streamlit as st
 from plotly.subplots import make_subplots
 
-from UI.app_state import AppState
+from UI.app_state import RunState
 from UI.cached_funcs import run_preprocessor
+from UI.data_processor import trim_ensemble_interval
 from statistics_explorer.config import ConfigStatistics
 from statistics_explorer.plots import calc_relative_error
 # from UI.pages.resume_app import external_stats
@@ -32,21 +33,27 @@ def show(session: st.session_state) -> None:
             'которая показывает дату начала прогноза ансамбля моделей.')
 
 
-def draw_well_plot(state: AppState) -> str:
+def draw_well_plot(state: RunState) -> str:
     well_to_draw = st.selectbox(label='Скважина',
                                 options=sorted(state.selected_wells_norm),
                                 key='well_to_calc')
     well_name_ois = state.wellnames_key_normal[well_to_draw]
-    preprocessor = run_preprocessor(state.was_config)
+    preprocessor = run_preprocessor(state.was_config, state.preprocessor_key)
     well_ftor = preprocessor.create_wells_ftor([well_name_ois])[0]
     df_chess = well_ftor.df_chess
-    fig = create_well_plot_UI(statistics=state.statistics,
+    # Читаются только столбцы выбранной скважины (модели сохраненного расчета могут быть еще не загружены)
+    ensemble_interval = state.ensemble_interval
+    if 'ensemble' in state.statistics:
+        well_interval = state.statistics.well_frame('ensemble', well_to_draw, kinds=('lower', 'upper'))
+        if not well_interval.columns.empty:
+            ensemble_interval = trim_ensemble_interval(well_interval)
+    fig = create_well_plot_UI(statistics=state.statistics.well_frames(well_to_draw),
                               date_test=state.was_date_test,
                               date_test_if_ensemble=state.was_date_test_if_ensemble,
                               df_chess=df_chess,
                               wellname=well_to_draw,
                               MODEL_NAMES=ConfigStatistics.MODEL_NAMES,
-                              ensemble_interval=state.ensemble_interval)
+                              ensemble_interval=ensemble_interval)
     # Построение графика
     st.plotly_chart(fig, use_container_width=True)
     return well_to_draw
@@ -8,7 +8,7 @@ from typing import Tuple, List
 from UI.pages.analytics import select_wells_set, draw_form_exclude_wells
 from statistics_explorer.plots import calc_relative_error
 from statistics_explorer.config import ConfigStatistics
-from UI.app_state import AppState
+from UI.app_state import RunState
 
 
 def show(session: st.session_state) -> None:
@@ -32,7 +32,7 @@ def show(session: st.session_state) -> None:
                 '  \n- имя скважины,  \n- накопленная добыча,  \n- посуточная ошибка на прогнозе.  \n')
 
 
-def select_plot(state: AppState, selected_wells_set: Tuple[str, ...]) -> [go.Figure, str]:
+def select_plot(state: RunState, selected_wells_set: Tuple[str, ...]) -> [go.Figure, str]:
     selected_plot = st.selectbox(label='', options=['Карта скважин', 'TreeMap'])
     if selected_plot == 'Карта скважин':
         mode_well = select_well(state.coeff_f.columns)
@@ -48,7 +48,7 @@ def select_plot(state: AppState, selected_wells_set: Tuple[str, ...]) -> [go.Fig
     return create_tree_plot(df, mode=mode), selected_plot, None
 
 
-def select_model(state: AppState, mode: str) -> str:
+def select_model(state: RunState, mode: str) -> str:
     MODEL_NAMES = ConfigStatistics.MODEL_NAMES
     MODEL_NAMES_REVERSED = {v: k for k, v in MODEL_NAMES.items()}
     if mode == "Нефть":
@@ -62,7 +62,7 @@ def select_model(state: AppState, mode: str) -> str:
     return MODEL_NAMES_REVERSED[model]
 
 
-def prepare_data_for_treemap(state: AppState, model: str, selected_wells_set: Tuple[str, ...]) -> pd.DataFrame:
+def prepare_data_for_treemap(state: RunState, model: str, selected_wells_set: Tuple[str, ...]) -> pd.DataFrame:
     columns = ['wellname', 'cum_q_liq', 'cum_q_oil', 'err_liq', 'err_oil']
     df = pd.DataFrame(columns=columns)
     well_names = [
@@ -0,0 +1,622 @@
+import hashlib
+import json
+import uuid
+from copy import deepcopy
+from datetime import date, timedelta
+from functools import partial
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Union
+
+import pandas as pd
+from loguru import logger
+
+from UI import result_cache
+from UI import timing
+from UI.app_state import RunState
+from UI.calculators import calculate_ftor, calculate_ftor_sharded, calculate_wolfram, calculate_CRM, \
+    calculate_fedot, calculate_shelf, calculate_ensemble, ftor_processes_limit
+from UI.config import STATISTICS_COMPACT
+from UI.data_processor import extract_data_ftor, extract_data_wolfram, extract_data_CRM, \
+    extract_influence_coeff_CRM, extract_data_fedot, extract_data_shelf, extract_data_ensemble, \
+    convert_tones_to_m3_for_wolfram, make_models_stop_well, prepare_data_for_ensemble, trim_ensemble_interval
+from UI.field_registry import field_stamp
+from UI.memory_cache import STAGE_RESULTS
+from UI.scheduler import DAGExecutor, Task
+from UI.statistics_store import StatisticsStore, as_statistics_store
+from frameworks_ftor.ftor.well import Well
+from tools_preprocessor.config import Config as ConfigPreprocessor
+from tools_preprocessor.preprocessor import Preprocessor
+
+# Граф расчета моделей без привязки к Streamlit (используется main_UI.py и main_batch.py).
+# Этапы расчета моделей выполняются в процессах-воркерах UI.scheduler.DAGExecutor.
+# Каждый этап получает context - минимальный набор полей состояния программы, нужный функциям
+# extract_data_*, и возвращает словарь {поле RunState: значение}, который объединяется
+# с основным состоянием в основном процессе функцией merge_stage_result.
+
+# Модели, результаты которых дает каждый этап расчета (кроме ансамбля)
+STAGE_MODELS = {
+    'ftor': ('ftor',),
+    'wolfram': ('wolfram',),
+    'CRM': ('CRM', 'fedot'),
+    'shelf': ('shelf',),
+}
+# Параметры моделей, от которых зависит результат этапа
+STAGE_PARAMS = {
+    'ftor': ('constraints',),
+    'wolfram': ('estimator_name_group', 'estimator_name_well', 'is_deep_grid_search', 'window_sizes', 'quantiles'),
+    'CRM': ('CRM_influence_R', 'CRM_maxiter', 'CRM_p_res'),
+    'shelf': ('n_days_past', 'n_days_calc_avg'),
+    'ensemble': ('ensemble_adapt_period', 'interval_probability', 'draws', 'tune', 'chains', 'target_accept'),
+}
+CONTEXT_KEYS = ('was_date_start', 'was_date_test', 'was_date_end', 'wellnames_key_ois', 'wells_ftor')
+
+
+def make_stage_context(state: RunState) -> Dict[str, Any]:
+    """Выделяет из состояния программы поля, необходимые этапам расчета."""
+    return {key: state[key] for key in CONTEXT_KEYS}
+
+
+def make_preprocessor_key(field_name: str,
+                          shops: List[str],
+                          date_start: date,
+                          date_test: date,
+                          date_end: date) -> tuple:
+    """Ключ препроцессора: конфигурация, выбранная пользователем, и штамп месторождения в реестре
+    (UI.field_registry.field_stamp), который проверяется без обхода файлов месторождения.
+
+    Используется вместо хэширования объектов ConfigPreprocessor/Preprocessor при кэшировании.
+    """
+    return field_name, tuple(shops), date_start, date_test, date_end, field_stamp(field_name)
+
+
+def _make_stage_state(context: Dict[str, Any]) -> RunState:
+    return RunState(statistics=StatisticsStore(),
+                    adapt_params={},
+                    coeff_f=pd.DataFrame(),
+                    wells_coords_CRM=pd.DataFrame(),
+                    **context)
+
+
+def merge_stage_result(state: RunState, stage_result: Dict[str, Any]) -> None:
+    """Объединяет результат этапа расчета с состоянием программы."""
+    for key, value in stage_result.items():
+        if key in ('statistics', 'adapt_params'):
+            state[key].update(value)
+        else:
+            state[key] = value
+
+
+def ftor_stage(context: Dict[str, Any],
+               preprocessor: Preprocessor,
+               wells_ois: List[int],
+               constraints: Optional[Dict[
+                   str, Union[float, Dict[str, Union[bool, List[float]]]]
+               ]],
+               n_processes: int = 1) -> Dict[str, Any]:
+    """Расчет модели пьезопроводности и последующее извлечение результатов.
+
+    При n_processes > 1 адаптация скважин распределяется между n_processes процессами.
+    """
+    state = _make_stage_state(context)
+    with timing.span('calculate_ftor', n_wells=len(wells_ois)):
+        if n_processes > 1 and len(wells_ois) > 1:
+            calculator_ftor = calculate_ftor_sharded(preprocessor, wells_ois, constraints, n_processes)
+        else:
+            calculator_ftor = calculate_ftor(preprocessor, wells_ois, constraints)
+    extract_data_ftor(calculator_ftor, state)
+    return {'statistics': state.statistics, 'adapt_params': state.adapt_params}
+
+
+def wolfram_stage(context: Dict[str, Any],
+                  preprocessor: Preprocessor,
+                  wells_ois: List[int],
+                  date_start_forecast: date,
+                  date_end_forecast: date,
+                  estimator_name_group: str,
+                  estimator_name_well: str,
+                  is_deep_grid_search: bool,
+                  window_sizes: List[int],
+                  quantiles: List[float]) -> Dict[str, Any]:
+    """Расчет модели ML и последующее извлечение результатов."""
+    state = _make_stage_state(context)
+    forecast_days_number = (date_end_forecast - date_start_forecast).days + 1
+    with timing.span('calculate_wolfram', n_wells=len(wells_ois)):
+        calculator_wolfram = calculate_wolfram(preprocessor,
+                                               wells_ois,
+                                               forecast_days_number,
+                                               estimator_name_group,
+                                               estimator_name_well,
+                                               is_deep_grid_search,
+                                               window_sizes,
+                                               quantiles)
+    extract_data_wolfram(calculator_wolfram, state)
+    convert_tones_to_m3_for_wolfram(state, state.wells_ftor)
+    return {'statistics': state.statistics}
+
+
+def crm_fedot_stage(context: Dict[str, Any],
+                    oilfield: str,
+                    wells_norm: List[str],
+                    date_start_adapt: date,
+                    date_start_forecast: date,
+                    date_end_forecast: date,
+                    influence_R: int,
+                    maxiter: int,
+                    p_res: int) -> Dict[str, Any]:
+    """Расчет модели CRM и модели Fedot поверх нее с последующим извлечением результатов.
+
+    Fedot использует коэффициенты взаимовлияния CRM, поэтому обе модели считаются одним этапом.
+    Если CRM не рассчитана, Fedot считается с пустой матрицей коэффициентов.
+    """
+    state = _make_stage_state(context)
+    with timing.span('calculate_CRM', n_wells=len(wells_norm)):
+        calculator_CRM = calculate_CRM(date_start_adapt=date_start_adapt,
+                                       date_end_adapt=date_start_forecast - timedelta(days=1),
+                                       date_end_forecast=date_end_forecast,
+                                       oilfield=oilfield,
+                                       influence_R=influence_R,
+                                       maxiter=maxiter,
+                                       p_res=p_res)
+    if calculator_CRM is not None:
+        extract_data_CRM(calculator_CRM.pred_CRM, state, state.wells_ftor, mode='CRM')
+        extract_influence_coeff_CRM(calculator_CRM.f, state)
+        state['wells_coords_CRM'] = calculator_CRM._coordinates
+        coeff = calculator_CRM.f
+    else:
+        coeff = pd.DataFrame(columns=wells_norm)
+    with timing.span('calculate_fedot', n_wells=len(wells_norm)):
+        calculator_fedot = calculate_fedot(oilfield=oilfield,
+                                           train_start=date_start_adapt,
+                                           train_end=date_start_forecast - timedelta(days=1),
+                                           predict_start=date_start_forecast,
+                                           predict_end=date_end_forecast,
+                                           wells_norm=wells_norm,
+                                           coeff=coeff,
+                                           lags=None)
+    extract_data_fedot(calculator_fedot, state)
+    return {'statistics': state.statistics,
+            'coeff_f': state.coeff_f,
+            'wells_coords_CRM': state.wells_coords_CRM}
+
+
+def shelf_stage(context: Dict[str, Any],
+                oilfield: str,
+                shops: List[str],
+                wells_ois: List[int],
+                train_start: date,
+                train_end: date,
+                predict_start: date,
+                predict_end: date,
+                n_days_past: int,
+                n_days_calc_avg: int) -> Dict[str, Any]:
+    """Расчет модели прогноза по темпам падений и последующее извлечение результатов."""
+    state = _make_stage_state(context)
+    with timing.span('calculate_shelf', n_wells=len(wells_ois)):
+        calculator_shelf = calculate_shelf(oilfield,
+                                           shops,
+                                           wells_ois,
+                                           train_start,
+                                           train_end,
+                                           predict_start,
+                                           predict_end,
+                                           n_days_past,
+                                           n_days_calc_avg)
+    extract_data_shelf(calculator_shelf, state)
+    return {'statistics': state.statistics}
+
+
+def ensemble_stage(input_data: list[dict],
+                   adaptation_days_number: int,
+                   interval_probability: float,
+                   draws: int,
+                   tune: int,
+                   chains: int,
+                   target_accept: float,
+                   name_of_y_true: str) -> tuple[dict[str, pd.DataFrame], dict]:
+    """Расчет ансамбля моделей и доверительного интервала."""
+    return calculate_ensemble(input_data,
+                              adaptation_days_number=adaptation_days_number,
+                              interval_probability=interval_probability,
+                              draws=draws,
+                              tune=tune,
+                              chains=chains,
+                              target_accept=target_accept,
+                              name_of_y_true=name_of_y_true)
+
+
+def merge_ensemble_result(state: RunState,
+                          ensemble_output: tuple[dict[str, pd.DataFrame], dict],
+                          mode: str = 'liq') -> None:
+    """Извлечение результатов ансамбля в состояние программы."""
+    ensemble_result, ensemble_weights = ensemble_output
+    state.models_weights[mode] = ensemble_weights
+    with timing.span('extract_data_ensemble', mode=mode, n_wells=len(ensemble_result)):
+        extract_data_ensemble(ensemble_result, state, mode)
+        if 'ensemble' in state.statistics:
+            state['ensemble_interval'] = trim_ensemble_interval(state.statistics.frame('ensemble',
+                                                                                       kinds=('lower', 'upper')))
+
+
+# TODO: добавить переменные в функцию
+def save_current_state(
+        state: RunState,
+        params: Mapping[str, Any],
+        config: ConfigPreprocessor,
+        models_to_run: dict[str, bool],
+        date_start: date,
+        date_test: date,
+        date_end: date,
+        selected_wells_norm: list[str],
+        selected_wells_ois: list[int],
+        wellnames_key_normal: dict[str, int],
+        wellnames_key_ois: dict[int, str],
+        wells_ftor: list[Well],
+        preprocessor_key: Optional[tuple] = None
+) -> RunState:
+    """
+    Функция сохраняет состояние программы в объект state класса RunState.
+
+    Parameters
+    ----------
+    state : RunState
+        Переменная, в которую будет записано состояние программы.
+    params : Mapping[str, Any]
+        Параметры моделей (сессия streamlit или словарь пакетного запуска).
+    config : ConfigPreprocessor
+        Конфигурация месторождения, дат адаптации и прогноза, выбранная пользователем.
+    models_to_run : dict[str, bool]
+        Словарь ключ - имя модели, значение - выбрана ли модель для расчета.
+    date_start : date
+        Дата начала адаптации.
+    date_test : date
+        Дата начала прогноза.
+    date_end : date
+        Дата конца прогноза.
+    selected_wells_norm : list[str]
+        Список выбранных скважин для расчета в формате ГРАД.
+    selected_wells_ois : list[int]
+        Список выбранных скважин для расчета в формате OIS.
+    wellnames_key_normal : Dict[str, int]
+        Ключ = имя скважины в формате ГРАД, значение - имя скважины OIS.
+    wellnames_key_ois : Dict[int, str]
+        Ключ = имя скважины OIS, значение - имя скважины в формате ГРАД.
+    wells_ftor : list[Well]
+        Список объектов скважин Well.
+    preprocessor_key : tuple, optional
+        Ключ препроцессора (см. make_preprocessor_key), по которому страницы берут его из кэша.
+    Returns
+    -------
+    """
+    state['adapt_params'] = {}
+    state['buffer'] = None
+    state['ensemble_interval'] = pd.DataFrame()
+    state['exclude_wells'] = []
+    state['statistics'] = StatisticsStore()
+    state['statistics_test_only'] = {}
+    state['selected_wells_norm'] = selected_wells_norm.copy()
+    state['selected_wells_ois'] = selected_wells_ois.copy()
+    state['was_config'] = config
+    state['preprocessor_key'] = preprocessor_key
+    state['was_calc_ftor'] = models_to_run['ftor']
+    state['was_calc_wolfram'] = models_to_run['wolfram']
+    state['was_calc_CRM'] = models_to_run['CRM']
+    state['was_calc_shelf'] = models_to_run['shelf']
+    state['was_calc_ensemble'] = models_to_run['ensemble']
+    state['was_date_start'] = date_start
+    state['was_date_test'] = date_test
+    state['was_date_test_if_ensemble'] = date_test + timedelta(days=params['ensemble_adapt_period'])
+    state['was_date_end'] = date_end
+    state['wellnames_key_normal'] = wellnames_key_normal.copy()
+    state['wellnames_key_ois'] = wellnames_key_ois.copy()
+    state['wells_ftor'] = wells_ftor
+    state['coeff_f'] = pd.DataFrame()
+    state['CRM_influence_R'] = params['CRM_influence_R']
+    state['wells_coords_CRM'] = pd.DataFrame()
+    state['models_weights'] = {}
+    state['fingerprints'] = {}
+    state['run_id'] = uuid.uuid4().hex
+    return state
+
+
+def prepare_ensemble(state: RunState,
+                     params: Mapping[str, Any],
+                     wells_norm: list[str],
+                     mode: str = 'liq') -> Tuple[tuple, dict]:
+    """Подготовка входных данных и параметров для расчета ансамбля моделей.
+
+    Parameters
+    ----------
+    state : RunState
+        состояние программы с результатами рассчитанных моделей.
+    params : Mapping[str, Any]
+        параметры моделей (сессия streamlit или словарь пакетного запуска).
+    wells_norm: list[str]
+        список имен скважины в формате (ГРАД?).
+    mode: str
+        режим расчета жидкости/нефти.
+    """
+    name_of_y_true = 'true'
+    input_data = prepare_data_for_ensemble(state, wells_norm, name_of_y_true, mode)
+    return (input_data,), dict(adaptation_days_number=params['ensemble_adapt_period'],
+                               interval_probability=params['interval_probability'],
+                               draws=params['draws'],
+                               tune=params['tune'],
+                               chains=params['chains'],
+                               target_accept=params['target_accept'],
+                               name_of_y_true=name_of_y_true)
+
+
+def _to_builtin(value: Any) -> Any:
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _canonical(value: Any) -> Any:
+    # Ключи словарей данных ГТМ - имена скважин (int64), даты и строки: приводятся к строкам и сортируются
+    if isinstance(value, Mapping):
+        return sorted([str(key), _canonical(item)] for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def make_shelf_data_fingerprint(shelf_json: Optional[Mapping[Any, Any]]) -> Optional[str]:
+    """Отпечаток данных ГТМ и темпов падения сессии (session.shelf_json), от которых зависит модель shelf.
+
+    Зависит только от содержимого данных, поэтому совпадает у сессий с одинаковыми данными.
+    """
+    if shelf_json is None:
+        return None
+    return make_fingerprint(_canonical(shelf_json))
+
+
+def make_fingerprint(*parts: Any) -> str:
+    """Отпечаток входных данных этапа расчета: одинаковые входные данные дают одинаковый отпечаток."""
+    dump = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=_to_builtin)
+    return hashlib.sha256(dump.encode('UTF-8')).hexdigest()
+
+
+def make_stage_fingerprints(params: Mapping[str, Any],
+                            models_to_run: Dict[str, bool],
+                            wells_ois: List[int],
+                            date_start_adapt: date,
+                            date_start_forecast: date,
+                            date_end_forecast: date,
+                            oilfield: str,
+                            shops: List[str]) -> Dict[str, str]:
+    """Отпечатки этапов расчета выбранных моделей.
+
+    Отпечаток этапа учитывает конфигурацию препроцессора, версию файлов данных месторождения,
+    выбранные скважины, собственные параметры модели (STAGE_PARAMS, для shelf - также данные ГТМ) и отпечатки этапов,
+    от которых зависит этап. Отпечаток также служит ключом дискового кэша результатов.
+    """
+    base = (oilfield, shops, date_start_adapt, date_start_forecast, date_end_forecast, wells_ois,
+            result_cache.field_data_version(oilfield))
+    fingerprints = {}
+    for stage in STAGE_MODELS:
+        if models_to_run[stage]:
+            own_params = {name: params.get(name) for name in STAGE_PARAMS[stage]}
+            if stage == 'shelf':
+                own_params['shelf_json'] = make_shelf_data_fingerprint(params.get('shelf_json'))
+            fingerprints[stage] = make_fingerprint(stage, base, own_params)
+    if models_to_run['ensemble'] and fingerprints:
+        own_params = {name: params.get(name) for name in STAGE_PARAMS['ensemble']}
+        fingerprints['ensemble'] = make_fingerprint('ensemble', base, own_params, fingerprints)
+    return fingerprints
+
+
+def restore_stage_result(previous_state: RunState, stage: str) -> Dict[str, Any]:
+    """Результат этапа расчета, сохраненный в предыдущем состоянии программы (см. merge_stage_result)."""
+    stage_result = {'statistics': as_statistics_store(previous_state.statistics).subset(STAGE_MODELS[stage])}
+    if stage == 'ftor':
+        stage_result['adapt_params'] = previous_state.adapt_params
+    if stage == 'CRM':
+        stage_result['coeff_f'] = previous_state.coeff_f
+        stage_result['wells_coords_CRM'] = previous_state.wells_coords_CRM
+    return stage_result
+
+
+def restore_ensemble_result(state: RunState, previous_state: RunState) -> None:
+    """Перенос результатов ансамбля из предыдущего состояния программы."""
+    if 'ensemble' in previous_state.statistics:
+        state.statistics.update(as_statistics_store(previous_state.statistics).subset(['ensemble']))
+    state['ensemble_interval'] = previous_state.ensemble_interval
+    state['models_weights'] = previous_state.models_weights
+
+
+def run_stage(run_id: str, name: str, key: str, func: Callable, *args, **kwargs) -> Any:
+    """Выполнение этапа расчета с замером времени и дисковым кэшем результатов."""
+    with timing.run_scope(run_id), timing.span(f'stage_{name}'):
+        return result_cache.run_cached(key, func, *args, **kwargs)
+
+
+def _prepare_cached(stage_args: tuple, prepare: Callable[[], Tuple[tuple, dict]]) -> Tuple[tuple, dict]:
+    args, kwargs = prepare()
+    return stage_args + tuple(args), kwargs
+
+
+def _memory_result(result: Any, *args, **kwargs) -> Any:
+    # Копия записи кэша в памяти, аргументы этапа не нужны
+    return deepcopy(result)
+
+
+def _remember_result(key: str, on_done: Optional[Callable[[Any], None]], result: Any) -> None:
+    """Запись результата этапа в кэш в памяти основного процесса.
+
+    В on_done передается копия: состояние программы изменяет таблицы на месте (make_models_stop_well),
+    а запись в памяти должна оставаться неизменной.
+    """
+    STAGE_RESULTS.put(key, result)
+    if on_done is not None:
+        on_done(deepcopy(result))
+
+
+def _cached_task(run_id: str, name: str, key: str, func: Callable, local: bool = False, **kwargs) -> Task:
+    """Задача, результат которой берется из кэша или вычисляется и сохраняется в кэш.
+
+    Кэш в памяти (UI.memory_cache.STAGE_RESULTS) проверяется и пополняется в основном процессе.
+    Если результат есть в дисковом кэше или local=True, задача выполняется в основном процессе без запуска пула,
+    иначе в пуле выполняются только чтение дискового кэша и расчет (UI.result_cache.run_cached).
+    """
+    result = STAGE_RESULTS.get(key)
+    if result is not None:
+        # prepare выполняется и при попадании: подготовка входных данных дополняет состояние программы
+        logger.info(f'Pipeline: {name} is found in memory cache')
+        stage_func, stage_args, local = _memory_result, (result,), True
+    else:
+        kwargs['on_done'] = partial(_remember_result, key, kwargs.get('on_done'))
+        cached = result_cache.contains(key)
+        if cached:
+            logger.info(f'Pipeline: {name} is found in result cache')
+        local = local or cached
+        stage_func, stage_args = run_stage, (run_id, name, key, func)
+    if 'prepare' in kwargs:
+        kwargs['prepare'] = partial(_prepare_cached, stage_args, kwargs['prepare'])
+    else:
+        kwargs['args'] = stage_args + tuple(kwargs.get('args', ()))
+    return Task(name, stage_func, local=local, **kwargs)
+
+
+def build_model_tasks(state: RunState,
+                      params: Mapping[str, Any],
+                      models_to_run: Dict[str, bool],
+                      preprocessor: Preprocessor,
+                      wells_ois: List[int],
+                      wells_norm: List[str],
+                      date_start_adapt: date,
+                      date_start_forecast: date,
+                      date_end_forecast: date,
+                      oilfield: str,
+                      shops: List[str],
+                      previous_state: Optional[RunState] = None) -> List[Task]:
+    """Построение графа расчета моделей, которые выбрал пользователь.
+
+    Модели ftor, wolfram, shelf и цепочка CRM -> fedot независимы и считаются одновременно
+    в пуле процессов. Результаты каждой модели извлекаются (extract_data_*) в воркере
+    и объединяются с состоянием программы по мере завершения расчета.
+    Ансамбль (liq и oil) запускается только после завершения всех выбранных моделей.
+
+    Если отпечаток этапа совпадает с отпечатком в previous_state, этап не пересчитывается:
+    его результаты переносятся из previous_state. Остальные этапы сначала ищутся
+    в дисковом кэше результатов (UI.result_cache) по отпечатку.
+    """
+    state['fingerprints'] = make_stage_fingerprints(params, models_to_run, wells_ois, date_start_adapt,
+                                                    date_start_forecast, date_end_forecast, oilfield, shops)
+    previous_fingerprints = {}
+    if previous_state is not None and previous_state.fingerprints:
+        previous_fingerprints = previous_state.fingerprints
+    fresh = {stage for stage, fingerprint in state.fingerprints.items()
+             if previous_fingerprints.get(stage) != fingerprint}
+    context = make_stage_context(state)
+    on_done = partial(merge_stage_result, state)
+    tasks = []
+    for stage in STAGE_MODELS:
+        if stage in state.fingerprints and stage not in fresh:
+            logger.info(f'Pipeline: {stage} is up to date, reuse previous results')
+            tasks.append(Task(stage, restore_stage_result,
+                              args=(previous_state, stage),
+                              on_done=on_done,
+                              local=True))
+    if 'ftor' in fresh:
+        # Пул адаптации вложен в процесс этапа и делит ядра с одновременно выполняемыми этапами
+        ftor_processes = ftor_processes_limit(params['ftor_processes'],
+                                              len([stage for stage in fresh if stage in STAGE_MODELS]) - 1)
+        tasks.append(_cached_task(state.run_id, 'ftor', state.fingerprints['ftor'], ftor_stage,
+                                  args=(context, preprocessor, wells_ois, params['constraints'], ftor_processes),
+                                  on_done=on_done))
+    if 'wolfram' in fresh:
+        tasks.append(_cached_task(state.run_id, 'wolfram', state.fingerprints['wolfram'], wolfram_stage,
+                                  args=(context, preprocessor, wells_ois, date_start_forecast, date_end_forecast,
+                                        params['estimator_name_group'], params['estimator_name_well'],
+                                        params['is_deep_grid_search'], params['window_sizes'], params['quantiles']),
+                                  on_done=on_done))
+    if 'CRM' in fresh:
+        tasks.append(_cached_task(state.run_id, 'CRM', state.fingerprints['CRM'], crm_fedot_stage,
+                                  args=(context, oilfield, wells_norm, date_start_adapt, date_start_forecast,
+                                        date_end_forecast, params['CRM_influence_R'], params['CRM_maxiter'],
+                                        params['CRM_p_res']),
+                                  on_done=on_done))
+    if 'shelf' in fresh:
+        # Модель читает правки ГТМ и темпов падения из st.session_state.shelf_json, поэтому выполняется
+        # в основном процессе интерфейса (в пакетном запуске и в воркере не рассчитывается, см. main_batch.py)
+        tasks.append(_cached_task(state.run_id, 'shelf', state.fingerprints['shelf'], shelf_stage, local=True,
+                                  args=(context, oilfield, shops, wells_ois, date_start_adapt, date_start_forecast,
+                                        date_start_adapt, date_end_forecast, params['n_days_past'],
+                                        params['n_days_calc_avg']),
+                                  on_done=on_done))
+    models = [task.name for task in tasks]
+    if not models:
+        return tasks
+    tasks.append(Task('stop_well', make_models_stop_well,
+                      args=(state['statistics'], state['selected_wells_norm']),
+                      depends_on=models,
+                      local=True))
+    if 'ensemble' in state.fingerprints and 'ensemble' not in fresh:
+        logger.info('Pipeline: ensemble is up to date, reuse previous results')
+        tasks.append(Task('ensemble', restore_ensemble_result,
+                          args=(state, previous_state),
+                          depends_on=('stop_well',),
+                          local=True))
+    elif 'ensemble' in fresh:
+        for mode in ('liq', 'oil'):
+            key = make_fingerprint(state.fingerprints['ensemble'], mode)
+            tasks.append(_cached_task(state.run_id, f'ensemble_{mode}', key, ensemble_stage,
+                                      depends_on=('stop_well',),
+                                      prepare=partial(prepare_ensemble, state, params, wells_norm, mode),
+                                      on_done=partial(merge_ensemble_result, state, mode=mode)))
+    return tasks
+
+
+def run_pipeline(state: RunState,
+                 params: Mapping[str, Any],
+                 models_to_run: Dict[str, bool],
+                 preprocessor: Preprocessor,
+                 wells_ois: List[int],
+                 wells_norm: List[str],
+                 date_start_adapt: date,
+                 date_start_forecast: date,
+                 date_end_forecast: date,
+                 oilfield: str,
+                 shops: List[str],
+                 progress: Optional[Callable[[str, str], None]] = None,
+                 previous_state: Optional[RunState] = None) -> None:
+    """Расчет выбранных моделей с записью результатов в state.
+
+    Parameters
+    ----------
+    state : RunState
+        состояние программы, подготовленное save_current_state.
+    params : Mapping[str, Any]
+        параметры моделей (сессия streamlit или словарь пакетного запуска).
+    models_to_run : Dict[str, bool]
+        модели для расчета, которые выбрал пользователь.
+    preprocessor : Preprocessor
+        препроцессор с конфигурацией, заданной пользователем.
+    wells_ois : List[int]
+        список имен скважин в формате OIS.
+    wells_norm : List[str]
+        список имен скважин в "читаемом" формате (ГРАД?).
+    date_start_adapt : date
+        дата начала адаптации для модели пьезопроводности.
+    date_start_forecast : date
+        дата начала прогноза для всех моделей, кроме ансамбля.
+    date_end_forecast : date
+        дата конца прогноза для всех моделей.
+    oilfield : str
+        название месторождения, которое выбрал пользователь.
+    shops : List[str]
+        список цехов месторождения.
+    progress : Callable[[str, str], None], optional
+        вызывается при смене статуса этапа расчета с именем этапа и статусом ('running', 'done').
+    previous_state : RunState, optional
+        предыдущее состояние программы. Этапы, входные данные которых не изменились,
+        не пересчитываются, а берутся из него.
+    """
+    tasks = build_model_tasks(state, params, models_to_run, preprocessor, wells_ois, wells_norm,
+                              date_start_adapt, date_start_forecast, date_end_forecast, oilfield, shops,
+                              previous_state)
+    if tasks:
+        with timing.run_scope(state.run_id), timing.span('pipeline', n_wells=len(wells_ois)):
+            DAGExecutor(tasks, listener=progress).run()
+    if STATISTICS_COMPACT:
+        state.statistics.compact()
@@ -0,0 +1,106 @@
+import cProfile
+import pathlib
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from types import FrameType
+from typing import Iterator, Optional
+
+from loguru import logger
+
+from UI.config import PROFILE_SAMPLING_INTERVAL
+
+# Профилирование расчета по запросу пользователя.
+# Для блока кода сохраняются в папку logs/ (рядом с log.log):
+#   profile_<метка>.prof   - профиль cProfile (просмотр: python -m pstats, snakeviz);
+#   profile_<метка>.txt    - отчет pstats, отсортированный по накопленному времени;
+#   profile_<метка>.folded - стеки вызовов основного потока, собранные сэмплированием,
+#                            в формате flamegraph.pl / speedscope ("f1;f2;f3 число_сэмплов").
+# Профилируется только процесс, вызвавший profile_run: расчеты в процессах пула
+# видны в профиле как ожидание результатов.
+
+PROFILES_DIR = pathlib.Path.cwd() / 'logs'
+
+
+def make_profile_tag(*parts) -> str:
+    """Метка файлов профиля из частей (месторождение, даты) и времени запуска."""
+    tag = '_'.join(str(part) for part in parts + (datetime.now().strftime('%Y%m%d-%H%M%S'),))
+    return re.sub(r'[^\w.-]+', '-', tag)
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f'{pathlib.Path(code.co_filename).stem}:{code.co_name}'
+
+
+class StackSampler:
+    """Сэмплирующий профилировщик: с периодом interval запоминает стек вызовов потока thread_id."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def dump(self, path: pathlib.Path) -> None:
+        with open(path, 'w', encoding='UTF-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+@contextmanager
+def profile_run(tag: str, enabled: bool = True) -> Iterator[Optional[pathlib.Path]]:
+    """Профилирование блока кода с сохранением профиля в PROFILES_DIR.
+
+    Parameters
+    ----------
+    tag : str
+        метка файлов профиля (см. make_profile_tag).
+    enabled : bool
+        при False блок выполняется без профилирования.
+
+    Возвращает путь к файлу .prof (файлы записываются после выхода из блока), либо None.
+    """
+    if not enabled:
+        yield None
+        return
+    path = PROFILES_DIR / f'profile_{tag}.prof'
+    sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLING_INTERVAL)
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield path
+    finally:
+        profiler.disable()
+        sampler.stop()
+        PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        with open(path.with_suffix('.txt'), 'w', encoding='UTF-8') as file:
+            pstats.Stats(profiler, stream=file).sort_stats('cumulative').print_stats()
+        sampler.dump(path.with_suffix('.folded'))
+        logger.info(f'Profile: {tag} saved to {path} ({time.perf_counter() - start:.1f} s)')
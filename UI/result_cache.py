@@ -0,0 +1,156 @@
+import datetime
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+from loguru import logger
+
+from UI.field_indexes import INDEXES_DIR
+from UI.field_layout import PARTITIONS_DIR
+from UI.statistics_store import KINDS, StatisticsStore
+from tools_preprocessor.preprocessor import Preprocessor
+
+# Дисковый кэш результатов этапов расчета моделей.
+# Результат этапа (вложенные словари/кортежи с таблицами) хранится в папке <ключ>:
+# каждая таблица - отдельный feather-файл, остальная структура - manifest.json.
+# Кэш переживает перезапуск сервера и доступен всем процессам (Streamlit, воркеры очереди, пакетный запуск).
+# Кэш в памяти (UI.memory_cache.STAGE_RESULTS) ведет основной процесс (UI.pipeline._cached_task):
+# функции модуля выполняются и в процессах пула, которые завершаются вместе с расчетом.
+
+RESULT_CACHE_DIR = pathlib.Path.cwd() / 'cache' / 'results'
+MANIFEST = 'manifest.json'
+INDEX_COLUMN = '__index__'
+
+
+def field_data_version(field_name: str) -> str:
+    """Версия входных данных месторождения: хэш имен, размеров и времени изменения файлов
+    в tools_preprocessor/data/<field_name> (кроме секций UI.field_layout и индексов UI.field_indexes,
+    производных от этих файлов)."""
+    path = Preprocessor._path_general / field_name
+    files = []
+    if path.exists():
+        for file in sorted(path.rglob('*')):
+            if file.is_file() and file.relative_to(path).parts[0] not in (PARTITIONS_DIR, INDEXES_DIR):
+                stat = file.stat()
+                files.append((str(file.relative_to(path)), stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha256(json.dumps(files, ensure_ascii=False).encode('UTF-8')).hexdigest()
+
+
+def _encode(value: Any, frames: Dict[str, pd.DataFrame]) -> Any:
+    if isinstance(value, StatisticsStore):
+        # Все виды значений моделей, включая доверительный интервал ансамбля
+        return {'__statistics__': [[model, _encode(value.frame(model, kinds=KINDS), frames)] for model in value]}
+    if isinstance(value, pd.Series):
+        return {'__series__': _encode(value.to_frame(), frames)}
+    if isinstance(value, pd.DataFrame):
+        name = f'{len(frames)}.feather'
+        frames[name] = value
+        return {'__frame__': name,
+                'columns': [_encode(column, frames) for column in value.columns],
+                'index_name': _encode(value.index.name, frames)}
+    if isinstance(value, dict):
+        return {'__dict__': [[_encode(key, frames), _encode(item, frames)] for key, item in value.items()]}
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode(item, frames) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item, frames) for item in value]
+    if isinstance(value, datetime.date):
+        return {'__date__': value.isoformat(), 'datetime': isinstance(value, datetime.datetime)}
+    if hasattr(value, 'tolist'):
+        # Скаляры и массивы numpy
+        return _encode(value.tolist(), frames)
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    raise TypeError(f'Тип {type(value).__name__} не поддерживается кэшем результатов.')
+
+
+def _decode(value: Any, path: pathlib.Path) -> Any:
+    if isinstance(value, list):
+        return [_decode(item, path) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if '__statistics__' in value:
+        return StatisticsStore({model: _decode(frame, path) for model, frame in value['__statistics__']})
+    if '__series__' in value:
+        frame = _decode(value['__series__'], path)
+        return frame[frame.columns[0]]
+    if '__frame__' in value:
+        frame = pd.read_feather(path / value['__frame__'])
+        frame = frame.set_index(INDEX_COLUMN)
+        frame.index.name = _decode(value['index_name'], path)
+        frame.columns = [_decode(column, path) for column in value['columns']]
+        return frame
+    if '__dict__' in value:
+        return {_decode(key, path): _decode(item, path) for key, item in value['__dict__']}
+    if '__tuple__' in value:
+        return tuple(_decode(item, path) for item in value['__tuple__'])
+    if '__date__' in value:
+        if value['datetime']:
+            return datetime.datetime.fromisoformat(value['__date__'])
+        return datetime.date.fromisoformat(value['__date__'])
+    raise ValueError(f'Неизвестная запись кэша результатов: {value}')
+
+
+def _write_frame(frame: pd.DataFrame, file: pathlib.Path) -> None:
+    # feather хранит только строковые имена столбцов и индекс по умолчанию,
+    # исходные имена столбцов и индекса восстанавливаются из manifest.json
+    # Новая таблица: индекс и столбцы таблицы результата (в том числе общие с StatisticsStore) не меняются
+    frame = frame.rename_axis(INDEX_COLUMN).reset_index()
+    frame.columns = [INDEX_COLUMN] + [str(i) for i in range(frame.shape[1] - 1)]
+    frame.to_feather(file, compression='zstd')
+
+
+def contains(key: str) -> bool:
+    return (RESULT_CACHE_DIR / key / MANIFEST).exists()
+
+
+def load(key: str) -> Optional[Any]:
+    """Результат из кэша или None, если ключ отсутствует либо запись повреждена."""
+    path = RESULT_CACHE_DIR / key
+    try:
+        with open(path / MANIFEST, encoding='UTF-8') as file:
+            manifest = json.load(file)
+        return _decode(manifest, path)
+    except FileNotFoundError:
+        return None
+    except Exception as exc:
+        logger.warning(f'Result cache: entry {key} is broken and will be recomputed: {exc!r}')
+        return None
+
+
+def save(key: str, result: Any) -> None:
+    """Сохраняет результат в кэш. Запись сначала собирается во временной папке и затем
+    переименовывается, поэтому другие процессы не увидят ее частично записанной."""
+    frames = {}
+    manifest = _encode(result, frames)
+    RESULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = RESULT_CACHE_DIR / f'.{key}.{uuid.uuid4().hex}'
+    tmp_path.mkdir()
+    try:
+        for name, frame in frames.items():
+            _write_frame(frame, tmp_path / name)
+        with open(tmp_path / MANIFEST, 'w', encoding='UTF-8') as file:
+            json.dump(manifest, file, ensure_ascii=False)
+        os.replace(tmp_path, RESULT_CACHE_DIR / key)
+    except OSError:
+        # Запись с тем же ключом уже сохранена другим процессом
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def run_cached(key: str, func: Callable, *args, **kwargs) -> Any:
+    """Возвращает результат func(*args, **kwargs) из дискового кэша, либо вычисляет и сохраняет его."""
+    result = load(key)
+    if result is not None:
+        logger.info(f'Result cache: hit {key}')
+    else:
+        result = func(*args, **kwargs)
+        try:
+            save(key, result)
+        except TypeError as exc:
+            logger.warning(f'Result cache: {key} is not cached: {exc}')
+    return result
@@ -0,0 +1,220 @@
+import io
+import json
+import pathlib
+import threading
+import zipfile
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, IO, List, Optional, Union
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from loguru import logger
+
+from UI.app_state import RunState
+from UI.data_processor import trim_ensemble_interval
+from UI.pipeline import make_preprocessor_key
+from UI.statistics_store import KINDS, LazyModel, PeriodView, StatisticsStore
+from tools_preprocessor.config import Config as ConfigPreprocessor
+
+# Архив расчета: zip-файл с таблицами Parquet (сжатие zstd) и описанием manifest.json.
+#   statistics/<модель>.parquet - результаты моделей (столбцы '{скважина}_{величина}_{вид}', индекс - дни),
+#   tables/<поле>.parquet - таблицы состояния (доверительный интервал ансамбля, коэффициенты CRM),
+#   weights/<величина>.parquet - веса моделей ансамбля,
+#   manifest.json - версия формата, список таблиц и остальные поля состояния в JSON.
+# При чтении архива код не выполняется (в отличие от pickle). Объекты скважин (wells_ftor) не сохраняются,
+# конфигурация месторождения восстанавливается по названию, цехам и датам расчета.
+# При чтении с lazy=True результаты моделей не загружаются: страницы отдельных скважин читают
+# только столбцы нужной скважины, остальное загружается в фоновом потоке (start_page_in).
+# Поля состояния фоновый поток не изменяет: доверительный интервал ансамбля заполняет page_in в потоке скрипта.
+
+ARCHIVE_FORMAT = 'run_archive'
+ARCHIVE_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+PARQUET_COMPRESSION = 'zstd'
+# Поля состояния, которые хранятся в manifest.json как есть
+JSON_FIELDS = ('adapt_params', 'CRM_influence_R', 'exclude_wells', 'fingerprints', 'job_id', 'run_id',
+               'selected_wells_norm', 'selected_wells_ois', 'statistics_another_models', 'wellnames_key_normal',
+               'was_calc_CRM', 'was_calc_ensemble', 'was_calc_ftor', 'was_calc_shelf', 'was_calc_wolfram')
+DATE_FIELDS = ('was_date_start', 'was_date_test', 'was_date_test_if_ensemble', 'was_date_end')
+TABLE_FIELDS = ('coeff_f', 'ensemble_interval', 'wells_coords_CRM')
+
+
+def _to_builtin(value: Any) -> Any:
+    # Скаляры и массивы numpy в параметрах адаптации и именах скважин
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _write_frame(archive: zipfile.ZipFile, name: str, frame: pd.DataFrame) -> Dict[str, Any]:
+    # Parquet хранит только строковые имена столбцов
+    frame = frame.rename(columns=str)
+    buffer = pa.BufferOutputStream()
+    pq.write_table(pa.Table.from_pandas(frame), buffer, compression=PARQUET_COMPRESSION)
+    # Parquet уже сжат, zip только упаковывает файлы
+    archive.writestr(name, buffer.getvalue().to_pybytes(), compress_type=zipfile.ZIP_STORED)
+    return {'rows': len(frame), 'columns': len(frame.columns)}
+
+
+def _read_frame(archive: zipfile.ZipFile, name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    with archive.open(name) as file:
+        return pq.read_table(file, columns=columns, use_pandas_metadata=True).to_pandas(split_blocks=True)
+
+
+def _open_archive(source: Union[str, bytes]) -> zipfile.ZipFile:
+    return zipfile.ZipFile(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def read_archive_table(source: Union[str, bytes], name: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Таблица name архива source (путь либо содержимое архива), только столбцы columns, если заданы."""
+    with _open_archive(source) as archive:
+        return _read_frame(archive, name, columns)
+
+
+def _table_columns(archive: zipfile.ZipFile, name: str) -> List[str]:
+    # Схема Parquet читается из конца файла, данные не читаются
+    with archive.open(name) as file:
+        schema = pq.read_schema(file)
+    index_columns = [column for column in (schema.pandas_metadata or {}).get('index_columns', [])
+                     if isinstance(column, str)]
+    return [column for column in schema.names if column not in index_columns]
+
+
+def write_run_archive(state: RunState, target: Union[str, pathlib.Path, IO]) -> None:
+    """Запись результатов расчета state в архив target (путь или файловый объект)."""
+    statistics = state.statistics if state.statistics is not None else StatisticsStore()
+    manifest = {
+        'format': ARCHIVE_FORMAT,
+        'version': ARCHIVE_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'fields': {name: state[name] for name in JSON_FIELDS},
+        'dates': {name: state[name] for name in DATE_FIELDS},
+        'statistics': {},
+        'tables': {},
+        'weights': {},
+    }
+    if state.wellnames_key_ois is not None:
+        # Ключи JSON - строки, имена скважин OIS - числа
+        manifest['fields']['wellnames_key_ois'] = list(state.wellnames_key_ois.items())
+    if state.was_config is not None:
+        manifest['config'] = {'field_name': state.was_config.field_name}
+    if state.preprocessor_key is not None:
+        manifest.setdefault('config', {})['shops'] = list(state.preprocessor_key[1])
+    if state.statistics_test_index is not None and len(state.statistics_test_index):
+        manifest['dates']['statistics_test_index'] = [state.statistics_test_index[0],
+                                                      state.statistics_test_index[-1]]
+    with zipfile.ZipFile(target, 'w') as archive:
+        for i, model in enumerate(statistics):
+            block = statistics.block(model)
+            frame = block.frame(KINDS) if block is not None else statistics[model]
+            name = f'statistics/{i}.parquet'
+            manifest['statistics'][model] = dict(_write_frame(archive, name, frame), path=name)
+        for field in TABLE_FIELDS:
+            frame = state[field]
+            if isinstance(frame, pd.DataFrame) and not frame.empty:
+                name = f'tables/{field}.parquet'
+                manifest['tables'][field] = dict(_write_frame(archive, name, frame), path=name)
+        for mode, weights in (state.models_weights or {}).items():
+            name = f'weights/{mode}.parquet'
+            manifest['weights'][mode] = dict(_write_frame(archive, name, pd.DataFrame.from_dict(weights)), path=name)
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, default=_to_builtin),
+                         compress_type=zipfile.ZIP_DEFLATED)
+
+
+def read_manifest(archive: zipfile.ZipFile) -> Dict[str, Any]:
+    """Описание архива. ValueError, если файл не является архивом расчета или создан более новой версией."""
+    try:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+    except KeyError:
+        raise ValueError('Файл не является архивом расчета: нет manifest.json.')
+    if manifest.get('format') != ARCHIVE_FORMAT:
+        raise ValueError('Файл не является архивом расчета.')
+    if manifest.get('version', 0) > ARCHIVE_VERSION:
+        raise ValueError(f'Архив создан более новой версией программы (формат {manifest["version"]}).')
+    return manifest
+
+
+def read_run_archive(source: Union[str, pathlib.Path, IO], lazy: bool = False) -> RunState:
+    """Состояние программы из архива расчета source (путь или файловый объект).
+
+    При lazy=True результаты моделей читаются при обращении (UI.statistics_store.LazyModel),
+    доверительный интервал ансамбля заполняет page_in.
+    """
+    if isinstance(source, pathlib.Path):
+        source = str(source)
+    elif not isinstance(source, str):
+        source.seek(0)
+        source = source.read()
+    with _open_archive(source) as archive:
+        manifest = read_manifest(archive)
+        state = RunState(adapt_params={}, models_weights={}, fingerprints={}, exclude_wells=[],
+                         coeff_f=pd.DataFrame(), wells_coords_CRM=pd.DataFrame(),
+                         ensemble_interval=pd.DataFrame())
+        fields = dict(manifest['fields'])
+        if 'wellnames_key_ois' in fields:
+            fields['wellnames_key_ois'] = {well_ois: well_name for well_ois, well_name in fields['wellnames_key_ois']}
+        state.update({name: value for name, value in fields.items() if value is not None})
+        dates = manifest['dates']
+        for name in DATE_FIELDS:
+            if dates.get(name) is not None:
+                state[name] = pd.Timestamp(dates[name]).date()
+        statistics = StatisticsStore()
+        for model, entry in manifest['statistics'].items():
+            if lazy:
+                statistics.add_lazy(model, LazyModel(_table_columns(archive, entry['path']),
+                                                     partial(read_archive_table, source, entry['path'])))
+            else:
+                statistics[model] = _read_frame(archive, entry['path'])
+        state['statistics'] = statistics
+        for field, entry in manifest['tables'].items():
+            if lazy and field == 'ensemble_interval' and 'ensemble' in statistics:
+                # Совпадает с видами lower/upper модели 'ensemble'
+                continue
+            state[field] = _read_frame(archive, entry['path'])
+        for mode, entry in manifest['weights'].items():
+            state.models_weights[mode] = _read_frame(archive, entry['path']).to_dict()
+    config = manifest.get('config')
+    if config is not None and state.was_date_start is not None:
+        shops = config.get('shops', [])
+        state['was_config'] = ConfigPreprocessor(config['field_name'], shops, state.was_date_start,
+                                                 state.was_date_test, state.was_date_end)
+        state['preprocessor_key'] = make_preprocessor_key(config['field_name'], shops, state.was_date_start,
+                                                          state.was_date_test, state.was_date_end)
+    test_index = dates.get('statistics_test_index')
+    if test_index is not None:
+        state['statistics_test_index'] = pd.date_range(test_index[0], test_index[1], freq='D')
+        state['statistics_test_only'] = PeriodView(state.statistics, state.statistics_test_index)
+    logger.info(f'Run archive: {len(statistics)} models {"opened" if lazy else "loaded"}, '
+                f'format {manifest["version"]}')
+    return state
+
+
+def page_in(state: RunState) -> None:
+    """Загрузка всех моделей состояния, прочитанного из архива с lazy=True, и доверительного интервала ансамбля.
+
+    Изменяет поля состояния, поэтому вызывается из потока скрипта streamlit, а не из фонового потока.
+    """
+    state.statistics.page_in()
+    if 'ensemble' in state.statistics and state.ensemble_interval.empty:
+        state['ensemble_interval'] = trim_ensemble_interval(state.statistics.frame('ensemble',
+                                                                                   kinds=('lower', 'upper')))
+
+
+def start_page_in(state: RunState) -> None:
+    """Загрузка моделей в фоновом потоке (для страницы аналитики), пока открыты страницы отдельных скважин.
+
+    Поток только заполняет хранилище моделей (UI.statistics_store.StatisticsStore.page_in),
+    доверительный интервал ансамбля заполняет page_in в потоке скрипта.
+    """
+    threading.Thread(target=state.statistics.page_in, daemon=True).start()
+
+
+def run_archive_bytes(state: RunState) -> bytes:
+    """Архив расчета в памяти (для кнопки скачивания)."""
+    buffer = io.BytesIO()
+    write_run_archive(state, buffer)
+    return buffer.getvalue()
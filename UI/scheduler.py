@@ -0,0 +1,164 @@
+from concurrent.futures import Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from loguru import logger
+
+
+class Task:
+    """Узел графа расчета.
+
+    Parameters
+    ----------
+    name : str
+        уникальное имя задачи в графе.
+    func : Callable
+        функция расчета. Для задач, выполняемых в пуле процессов, должна быть
+        объявлена на уровне модуля (передается в процесс через pickle).
+    args : tuple
+        позиционные аргументы функции.
+    kwargs : dict
+        именованные аргументы функции.
+    depends_on : Iterable[str]
+        имена задач, которые должны завершиться до запуска данной.
+    prepare : Callable[[], Tuple[tuple, dict]], optional
+        вызывается в основном процессе непосредственно перед запуском задачи,
+        когда все зависимости уже завершены. Возвращает (args, kwargs) для func.
+    on_done : Callable[[Any], None], optional
+        вызывается в основном процессе с результатом func.
+    local : bool
+        выполнять задачу в основном процессе, а не в пуле.
+    """
+
+    def __init__(self,
+                 name: str,
+                 func: Callable,
+                 args: tuple = (),
+                 kwargs: Optional[dict] = None,
+                 depends_on: Iterable[str] = (),
+                 prepare: Optional[Callable[[], Tuple[tuple, dict]]] = None,
+                 on_done: Optional[Callable[[Any], None]] = None,
+                 local: bool = False):
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.depends_on = tuple(depends_on)
+        self.prepare = prepare
+        self.on_done = on_done
+        self.local = local
+
+
+class DAGExecutor:
+    """Исполнитель графа задач на пуле процессов.
+
+    Задача запускается, как только завершены все ее зависимости.
+    Независимые задачи выполняются одновременно.
+    Обработчики on_done выполняются в основном процессе по мере завершения задач,
+    поэтому могут без блокировок изменять общее состояние программы.
+
+    Parameters
+    ----------
+    tasks : List[Task]
+        задачи графа.
+    max_workers : int, optional
+        число процессов пула. По умолчанию - число задач, выполняемых в пуле.
+    listener : Callable[[str, str], None], optional
+        вызывается в основном процессе при смене статуса задачи ('running', 'done')
+        с именем задачи и новым статусом.
+    """
+
+    def __init__(self,
+                 tasks: List[Task],
+                 max_workers: Optional[int] = None,
+                 listener: Optional[Callable[[str, str], None]] = None):
+        self.tasks = {}
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f'Задача {task.name} добавлена в граф повторно.')
+            self.tasks[task.name] = task
+        for task in tasks:
+            unknown = set(task.depends_on) - set(self.tasks)
+            if unknown:
+                raise ValueError(f'Задача {task.name} зависит от неизвестных задач: {sorted(unknown)}.')
+        self.max_workers = max_workers
+        self.listener = listener
+
+    def run(self) -> Dict[str, Any]:
+        """Выполняет граф и возвращает результаты задач по их именам."""
+        results = {}
+        pending = dict(self.tasks)
+        running: Dict[Future, str] = {}
+        n_remote = len([task for task in self.tasks.values() if not task.local])
+        if n_remote == 0:
+            self._run_local_only(pending, results)
+            return results
+        max_workers = self.max_workers or n_remote
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            try:
+                while pending or running:
+                    self._submit_ready(pool, pending, running, results)
+                    if not running:
+                        if pending:
+                            raise ValueError(f'Граф задач содержит цикл: {sorted(pending)}.')
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        self._finish(self.tasks[name], future.result(), results)
+            except BaseException:
+                for future in running:
+                    future.cancel()
+                raise
+        return results
+
+    def _run_local_only(self, pending: Dict[str, Task], results: Dict[str, Any]) -> None:
+        while pending:
+            ready = self._pop_ready(pending, results)
+            if not ready:
+                raise ValueError(f'Граф задач содержит цикл: {sorted(pending)}.')
+            for task in ready:
+                args, kwargs = self._arguments(task)
+                self._notify(task, 'running')
+                self._finish(task, task.func(*args, **kwargs), results)
+
+    def _submit_ready(self,
+                      pool: ProcessPoolExecutor,
+                      pending: Dict[str, Task],
+                      running: Dict[Future, str],
+                      results: Dict[str, Any]) -> None:
+        # Локальные задачи могут сразу открыть путь следующим, поэтому проверка повторяется
+        ready = self._pop_ready(pending, results)
+        while ready:
+            for task in ready:
+                args, kwargs = self._arguments(task)
+                self._notify(task, 'running')
+                if task.local:
+                    self._finish(task, task.func(*args, **kwargs), results)
+                else:
+                    logger.info(f'Scheduler: submit {task.name}')
+                    running[pool.submit(task.func, *args, **kwargs)] = task.name
+            ready = self._pop_ready(pending, results)
+
+    @staticmethod
+    def _pop_ready(pending: Dict[str, Task], results: Dict[str, Any]) -> List[Task]:
+        ready = [task for task in pending.values() if all(dep in results for dep in task.depends_on)]
+        for task in ready:
+            del pending[task.name]
+        return ready
+
+    @staticmethod
+    def _arguments(task: Task) -> Tuple[tuple, dict]:
+        if task.prepare is not None:
+            return task.prepare()
+        return task.args, task.kwargs
+
+    def _notify(self, task: Task, status: str) -> None:
+        if self.listener is not None:
+            self.listener(task.name, status)
+
+    def _finish(self, task: Task, result: Any, results: Dict[str, Any]) -> None:
+        logger.info(f'Scheduler: finish {task.name}')
+        if task.on_done is not None:
+            task.on_done(result)
+        results[task.name] = result
+        self._notify(task, 'done')
@@ -0,0 +1,548 @@
+import threading
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, List, Iterable, Iterator, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Хранилище результатов моделей (state.statistics).
+# Результаты модели - плотный массив values[скважина, величина, вид, день], где
+#   величина: QUANTITIES = ('liq', 'oil'),
+#   вид: 'true' (факт), 'pred' (прогноз), 'lower'/'upper' (доверительный интервал ансамбля).
+# Для совместимости со statistics_explorer и страницами хранилище ведет себя как словарь
+# {модель: таблица} со столбцами '{скважина}_{величина}_{вид}' (только виды true и pred).
+# Таблица строится без копирования данных, если у модели есть все столбцы: изменения таблицы
+# на месте меняют массив. Таблицы, которые не удается разобрать на столбцы этого формата
+# (например, загруженные пользователем), хранятся как есть.
+# Результаты за тестовый период (state.statistics_test_only) - PeriodView: строки тех же таблиц
+# без копирования; пропуски заполняются нулями при чтении (filled_frames).
+# Компактный режим (StatisticsStore.compact, UI.config.STATISTICS_COMPACT): значения во float32,
+# дни в начале и в конце периода, в которые у модели нет значений, не хранятся.
+# Модели сохраненного расчета (UI.run_archive) могут быть не загружены (LazyModel): таблица модели
+# читается при первом обращении, а для страниц отдельных скважин (well_frames) читаются только столбцы скважины.
+
+QUANTITIES = ('liq', 'oil')
+KINDS = ('true', 'pred', 'lower', 'upper')
+BASE_KINDS = ('true', 'pred')
+
+
+def column_name(well_name: str, quantity: str, kind: str) -> str:
+    return f'{well_name}_{quantity}_{kind}'
+
+
+def parse_column(column: Any) -> Optional[Tuple[str, str, str]]:
+    """Скважина, величина и вид из имени столбца '{скважина}_{величина}_{вид}' или None."""
+    if not isinstance(column, str):
+        return None
+    parts = column.rsplit('_', 2)
+    if len(parts) != 3 or parts[1] not in QUANTITIES or parts[2] not in KINDS:
+        return None
+    return parts[0], parts[1], parts[2]
+
+
+def align_to_dates(series: pd.Series,
+                   dates: pd.Index,
+                   indexers: Optional[Dict[int, Tuple[pd.Index, np.ndarray]]] = None) -> np.ndarray:
+    """Значения ряда series в днях dates (NaN для отсутствующих дней), как series.reindex(dates).
+
+    indexers - кэш сопоставлений индексов с dates: индекс, общий для нескольких рядов
+    (например, таблицы фактических данных скважины), сопоставляется с dates один раз.
+    """
+    index = series.index
+    values = series.to_numpy(dtype=float)
+    if index is dates:
+        return values
+    cached = indexers.get(id(index)) if indexers is not None else None
+    if cached is None or cached[0] is not index:
+        # Как и reindex, get_indexer требует уникальных значений индекса
+        cached = (index, index.get_indexer(dates))
+        if indexers is not None:
+            indexers[id(index)] = cached
+    indexer = cached[1]
+    found = indexer >= 0
+    result = np.full(len(dates), np.nan)
+    result[found] = values[indexer[found]]
+    return result
+
+
+class ModelBlock:
+    """Результаты одной модели.
+
+    Parameters
+    ----------
+    dates : Sequence
+        дни (индекс таблиц модели).
+    wells : Sequence[str]
+        скважины в формате ГРАД.
+    kinds : Sequence[str]
+        виды значений модели (подмножество KINDS).
+    """
+
+    __slots__ = ('dates', 'wells', 'positions', 'kinds', 'values', 'present')
+
+    def __init__(self, dates: Sequence, wells: Sequence[str], kinds: Sequence[str] = BASE_KINDS):
+        self.dates = pd.Index(dates)
+        self.wells = list(dict.fromkeys(wells))
+        self.positions = {well_name: i for i, well_name in enumerate(self.wells)}
+        self.kinds = tuple(kinds)
+        shape = (len(self.wells), len(QUANTITIES), len(self.kinds), len(self.dates))
+        self.values = np.full(shape, np.nan)
+        # Какие столбцы '{скважина}_{величина}_{вид}' есть у модели
+        self.present = np.zeros(shape[:3], dtype=bool)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.values.nbytes + self.present.nbytes)
+
+    @property
+    def is_compact(self) -> bool:
+        return self.values.dtype == np.float32
+
+    def compact(self) -> None:
+        """Перевод значений во float32 и отбрасывание дней без значений в начале и в конце периода."""
+        has_values = ~np.isnan(self.values).all(axis=(0, 1, 2))
+        start, stop = 0, len(self.dates)
+        if has_values.any():
+            start = int(has_values.argmax())
+            stop = len(self.dates) - int(has_values[::-1].argmax())
+        self.dates = self.dates[start:stop]
+        self.values = self.values[..., start:stop].astype(np.float32)
+
+    def expand(self, dates: Sequence) -> None:
+        """Возврат к float64 и полному периоду dates (перед записью новых значений в компактный массив)."""
+        dates = pd.Index(dates)
+        values = np.full(self.values.shape[:3] + (len(dates),), np.nan)
+        indexer = dates.get_indexer(self.dates)
+        found = indexer >= 0
+        values[..., indexer[found]] = self.values[..., found]
+        self.dates = dates
+        self.values = values
+
+    def add_wells(self, wells: Iterable[str]) -> None:
+        """Добавляет скважины, которых еще нет у модели (одним выделением памяти)."""
+        new_wells = [well_name for well_name in dict.fromkeys(wells) if well_name not in self.positions]
+        if not new_wells:
+            return
+        shape = (len(new_wells),) + self.values.shape[1:]
+        self.values = np.concatenate([self.values, np.full(shape, np.nan)])
+        self.present = np.concatenate([self.present, np.zeros(shape[:3], dtype=bool)])
+        for well_name in new_wells:
+            self.positions[well_name] = len(self.wells)
+            self.wells.append(well_name)
+
+    def index(self, well_name: str, quantity: str, kind: str) -> Tuple[int, int, int]:
+        return self.positions[well_name], QUANTITIES.index(quantity), self.kinds.index(kind)
+
+    def frame(self, kinds: Sequence[str] = BASE_KINDS) -> pd.DataFrame:
+        """Таблица модели со столбцами '{скважина}_{величина}_{вид}' видов kinds."""
+        kind_positions = [self.kinds.index(kind) for kind in kinds if kind in self.kinds]
+        if kind_positions == list(range(len(self.kinds))) and self.present.all():
+            # Все столбцы на месте: таблица - представление массива без копирования
+            data = self.values.reshape(-1, len(self.dates))
+            selected = np.ones(data.shape[0], dtype=bool)
+        else:
+            mask = np.zeros(self.present.shape, dtype=bool)
+            mask[:, :, kind_positions] = True
+            selected = (mask & self.present).ravel()
+            data = self.values.reshape(-1, len(self.dates))[selected]
+        columns = [column_name(well_name, quantity, kind)
+                   for well_name in self.wells for quantity in QUANTITIES for kind in self.kinds]
+        columns = [column for column, is_selected in zip(columns, selected) if is_selected]
+        return pd.DataFrame(data.T, index=self.dates, columns=columns, copy=False)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> Optional['ModelBlock']:
+        """Разбор таблицы со столбцами '{скважина}_{величина}_{вид}'. None, если формат другой."""
+        parsed = [parse_column(column) for column in frame.columns]
+        if not parsed or any(item is None for item in parsed):
+            return None
+        try:
+            data = frame.to_numpy(dtype=float)
+        except (TypeError, ValueError):
+            return None
+        wells = list(dict.fromkeys(item[0] for item in parsed))
+        kinds = [kind for kind in KINDS if any(item[2] == kind for item in parsed)]
+        if set(kinds) <= set(BASE_KINDS):
+            kinds = BASE_KINDS
+        block = cls(frame.index, wells, kinds)
+        positions = np.array([block.index(*item) for item in parsed])
+        block.values[positions[:, 0], positions[:, 1], positions[:, 2]] = data.T
+        block.present[positions[:, 0], positions[:, 1], positions[:, 2]] = True
+        return block
+
+
+class LazyModel:
+    """Модель, таблица которой читается при первом обращении.
+
+    Parameters
+    ----------
+    columns : Sequence[str]
+        столбцы таблицы модели.
+    reader : Callable[[Optional[List[str]]], pd.DataFrame]
+        чтение таблицы (всех столбцов при None либо перечисленных), должно сохраняться pickle.
+    """
+
+    __slots__ = ('columns', 'reader')
+
+    def __init__(self, columns: Sequence[str], reader: Callable[[Optional[List[str]]], pd.DataFrame]):
+        self.columns = list(columns)
+        self.reader = reader
+
+    def read(self, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        return self.reader(columns)
+
+
+class StatisticsStore(MutableMapping):
+    """Результаты всех моделей (см. описание модуля).
+
+    Parameters
+    ----------
+    frames : Mapping[str, pd.DataFrame]
+        таблицы моделей в формате statistics_explorer (например, из состояния программы,
+        сохраненного прежними версиями).
+    """
+
+    def __init__(self, frames: Optional[Mapping[str, pd.DataFrame]] = None):
+        self._models: Dict[str, Union[ModelBlock, pd.DataFrame, LazyModel]] = {}
+        self._views: Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame] = {}
+        # Модели загружаются и из фонового потока (page_in): _models и _views изменяются под блокировкой
+        self._lock = threading.RLock()
+        if frames is not None:
+            self.update(frames)
+
+    # Совместимость со словарем {модель: таблица}
+    def __getitem__(self, model: str) -> pd.DataFrame:
+        return self.frame(model)
+
+    def __setitem__(self, model: str, frame: pd.DataFrame) -> None:
+        block = ModelBlock.from_frame(frame)
+        with self._lock:
+            self._models[model] = block if block is not None else frame
+            self.touch(model)
+
+    def __delitem__(self, model: str) -> None:
+        with self._lock:
+            del self._models[model]
+            self.touch(model)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._models)
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    def __contains__(self, model: object) -> bool:
+        return model in self._models
+
+    def __repr__(self) -> str:
+        return f'StatisticsStore({", ".join(self._models)})'
+
+    def __getstate__(self) -> dict:
+        return {'_models': self._models}
+
+    def __setstate__(self, state: dict) -> None:
+        self._models = state['_models']
+        self._views = {}
+        self._lock = threading.RLock()
+
+    def update(self, other: Any = (), **kwargs) -> None:
+        """Добавление моделей. Модели другого хранилища переносятся без копирования."""
+        if isinstance(other, StatisticsStore):
+            with self._lock:
+                for model, entry in list(other._models.items()):
+                    self._models[model] = entry
+                    self.touch(model)
+        else:
+            super().update(other, **kwargs)
+
+    def subset(self, models: Iterable[str]) -> 'StatisticsStore':
+        """Хранилище с моделями models (без копирования данных)."""
+        store = StatisticsStore()
+        store._models = {model: self._models[model] for model in models if model in self._models}
+        return store
+
+    def touch(self, model: str) -> None:
+        """Сброс таблиц модели после изменения ее массива."""
+        with self._lock:
+            for key in [key for key in self._views if key[0] == model]:
+                del self._views[key]
+
+    def add_lazy(self, model: str, lazy: LazyModel) -> None:
+        """Добавление модели, таблица которой будет прочитана при первом обращении."""
+        with self._lock:
+            self._models[model] = lazy
+            self.touch(model)
+
+    def is_loaded(self, model: str) -> bool:
+        return not isinstance(self._models[model], LazyModel)
+
+    def page_in(self) -> None:
+        """Загрузка всех моделей, которые еще не загружены."""
+        with self._lock:
+            models = list(self._models)
+        for model in models:
+            self._entry(model)
+
+    def _entry(self, model: str) -> Union[ModelBlock, pd.DataFrame]:
+        entry = self._models[model]
+        if not isinstance(entry, LazyModel):
+            return entry
+        with self._lock:
+            entry = self._models[model]
+            if isinstance(entry, LazyModel):
+                frame = entry.read()
+                block = ModelBlock.from_frame(frame)
+                entry = block if block is not None else frame
+                self._models[model] = entry
+                self.touch(model)
+        return entry
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry.nbytes if isinstance(entry, ModelBlock)
+                   else int(entry.memory_usage(index=True, deep=True).sum()) if isinstance(entry, pd.DataFrame)
+                   else 0
+                   for entry in self._models.values())
+
+    def compact(self, models: Optional[Iterable[str]] = None) -> None:
+        """Компактное хранение моделей models (по умолчанию всех), см. ModelBlock.compact."""
+        for model, block in self.blocks().items():
+            if models is None or model in models:
+                block.compact()
+                self.touch(model)
+
+    def memory_report(self) -> pd.DataFrame:
+        """Память, занимаемая результатами каждой модели."""
+        rows = {}
+        for model, entry in self._models.items():
+            if isinstance(entry, LazyModel):
+                rows[model] = {'Скважин': np.nan,
+                               'Дней': np.nan,
+                               'Тип': 'не загружена',
+                               'Заполнено, %': np.nan,
+                               'Память, МБ': 0.0}
+            elif isinstance(entry, ModelBlock):
+                values = entry.values[entry.present]
+                rows[model] = {'Скважин': len(entry.wells),
+                               'Дней': len(entry.dates),
+                               'Тип': str(entry.values.dtype),
+                               'Заполнено, %': 100 * np.count_nonzero(~np.isnan(values)) / max(values.size, 1),
+                               'Память, МБ': entry.nbytes / 2 ** 20}
+            else:
+                rows[model] = {'Скважин': np.nan,
+                               'Дней': len(entry),
+                               'Тип': 'таблица',
+                               'Заполнено, %': 100 * entry.notna().to_numpy().mean() if entry.size else 0,
+                               'Память, МБ': entry.memory_usage(index=True, deep=True).sum() / 2 ** 20}
+        report = pd.DataFrame.from_dict(rows, orient='index',
+                                        columns=['Скважин', 'Дней', 'Тип', 'Заполнено, %', 'Память, МБ'])
+        return report.round({'Заполнено, %': 1, 'Память, МБ': 2})
+
+    # Доступ к массивам
+    def block(self, model: str) -> Optional[ModelBlock]:
+        """Массив модели или None, если модель хранится таблицей."""
+        entry = self._entry(model)
+        return entry if isinstance(entry, ModelBlock) else None
+
+    def blocks(self) -> Dict[str, ModelBlock]:
+        """Массивы загруженных моделей."""
+        return {model: entry for model, entry in self._models.items() if isinstance(entry, ModelBlock)}
+
+    def ensure(self,
+               model: str,
+               dates: Sequence,
+               wells: Sequence[str],
+               kinds: Sequence[str] = BASE_KINDS) -> ModelBlock:
+        """Массив модели model для скважин wells: создается, если модели нет, иначе дополняется скважинами."""
+        with self._lock:
+            block = self._entry(model) if model in self._models else None
+            if not isinstance(block, ModelBlock):
+                block = ModelBlock(dates, wells, kinds)
+                self._models[model] = block
+            else:
+                if block.is_compact:
+                    block.expand(dates)
+                block.add_wells(wells)
+            self.touch(model)
+        return block
+
+    def set(self, model: str, well_name: str, quantity: str, kind: str, values: Any) -> None:
+        """Запись ряда значений (Series с индексом-днями либо скаляр) в массив модели."""
+        block = self._entry(model)
+        if well_name not in block.positions:
+            block.add_wells([well_name])
+        position = block.index(well_name, quantity, kind)
+        if isinstance(values, pd.Series):
+            values = align_to_dates(values, block.dates)
+        block.values[position] = values
+        block.present[position] = True
+        self.touch(model)
+
+    def write(self,
+              model: str,
+              dates: Sequence,
+              columns: Mapping[Tuple[str, str, str], Any],
+              kinds: Sequence[str] = BASE_KINDS) -> ModelBlock:
+        """Запись результатов модели одним блоком.
+
+        Parameters
+        ----------
+        model : str
+        dates : Sequence
+            дни модели (используются, если модели еще нет).
+        columns : Mapping[Tuple[str, str, str], Any]
+            ключ - (скважина, величина, вид), значение - Series с индексом-днями либо скаляр.
+        kinds : Sequence[str]
+            виды значений модели.
+        """
+        block = self.ensure(model, dates, [key[0] for key in columns], kinds)
+        indexers = {}
+        for (well_name, quantity, kind), values in columns.items():
+            position = block.index(well_name, quantity, kind)
+            if isinstance(values, pd.Series):
+                values = align_to_dates(values, block.dates, indexers)
+            block.values[position] = values
+            block.present[position] = True
+        self.touch(model)
+        return block
+
+    def well(self, model: str, well_name: str) -> np.ndarray:
+        """Значения скважины: массив [величина, вид, день] (представление, без копирования)."""
+        block = self._entry(model)
+        return block.values[block.positions[well_name]]
+
+    def series(self, model: str, well_name: str, quantity: str, kind: str) -> pd.Series:
+        block = self._entry(model)
+        if isinstance(block, pd.DataFrame):
+            return block[column_name(well_name, quantity, kind)]
+        return pd.Series(block.values[block.index(well_name, quantity, kind)], index=block.dates,
+                         name=column_name(well_name, quantity, kind))
+
+    def frame(self, model: str, kinds: Sequence[str] = BASE_KINDS) -> pd.DataFrame:
+        """Таблица модели в формате statistics_explorer (кэшируется до изменения модели)."""
+        entry = self._entry(model)
+        if isinstance(entry, pd.DataFrame):
+            return entry
+        key = (model, tuple(kinds))
+        with self._lock:
+            if key not in self._views:
+                self._views[key] = entry.frame(kinds)
+            return self._views[key]
+
+    def columns(self, model: str, kinds: Sequence[str] = BASE_KINDS) -> List[str]:
+        """Столбцы таблицы модели (без загрузки модели)."""
+        entry = self._models[model]
+        if isinstance(entry, LazyModel):
+            parsed = [(column, parse_column(column)) for column in entry.columns]
+            return [column for column, item in parsed if item is None or item[2] in kinds]
+        if isinstance(entry, pd.DataFrame):
+            return list(entry.columns)
+        return [column_name(well_name, quantity, kind)
+                for i, well_name in enumerate(entry.wells)
+                for j, quantity in enumerate(QUANTITIES)
+                for k, kind in enumerate(entry.kinds)
+                if kind in kinds and entry.present[i, j, k]]
+
+    def well_frame(self, model: str, well_name: str, kinds: Sequence[str] = BASE_KINDS) -> pd.DataFrame:
+        """Столбцы скважины well_name таблицы модели. У незагруженной модели читаются только они."""
+        entry = self._models[model]
+        columns = [column_name(well_name, quantity, kind) for quantity in QUANTITIES for kind in kinds]
+        if isinstance(entry, LazyModel):
+            available = set(entry.columns)
+            return entry.read([column for column in columns if column in available])
+        if isinstance(entry, pd.DataFrame):
+            return entry[[column for column in columns if column in entry.columns]]
+        if well_name not in entry.positions:
+            return pd.DataFrame(index=entry.dates)
+        data = {}
+        for quantity in QUANTITIES:
+            for kind in kinds:
+                if kind in entry.kinds:
+                    position = entry.index(well_name, quantity, kind)
+                    if entry.present[position]:
+                        data[column_name(well_name, quantity, kind)] = entry.values[position]
+        return pd.DataFrame(data, index=entry.dates)
+
+    def well_frames(self, well_name: str, kinds: Sequence[str] = BASE_KINDS) -> Dict[str, pd.DataFrame]:
+        """Таблицы всех моделей, ограниченные столбцами скважины well_name."""
+        return {model: self.well_frame(model, well_name, kinds) for model in self}
+
+
+def as_statistics_store(statistics: Union[StatisticsStore, Mapping[str, pd.DataFrame], None]) -> StatisticsStore:
+    """Хранилище из словаря таблиц (состояния программы, сохраненные прежними версиями)."""
+    if isinstance(statistics, StatisticsStore):
+        return statistics
+    return StatisticsStore(statistics or {})
+
+
+class PeriodView(MutableMapping):
+    """Результаты моделей за дни dates (state.statistics_test_only) без копирования данных.
+
+    Таблица модели - срез строк таблицы statistics с индексом dates. Если дни модели
+    не покрывают dates подряд, таблица строится через reindex при чтении.
+    Таблицы, добавленные в представление (например, загруженные пользователем), хранятся как есть.
+
+    Parameters
+    ----------
+    statistics : Mapping[str, pd.DataFrame]
+        результаты моделей (state.statistics).
+    dates : pd.DatetimeIndex
+        дни периода.
+    """
+
+    def __init__(self, statistics: Mapping[str, pd.DataFrame], dates: pd.DatetimeIndex):
+        self.statistics = statistics
+        self.dates = dates
+        self._frames: Dict[str, pd.DataFrame] = {}
+
+    def __getitem__(self, model: str) -> pd.DataFrame:
+        if model in self._frames:
+            return self._frames[model]
+        return self._cut(self.statistics[model])
+
+    def __setitem__(self, model: str, frame: pd.DataFrame) -> None:
+        self._frames[model] = frame
+
+    def __delitem__(self, model: str) -> None:
+        del self._frames[model]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._frames
+        yield from (model for model in self.statistics if model not in self._frames)
+
+    def __len__(self) -> int:
+        return len(self._frames) + sum(model not in self._frames for model in self.statistics)
+
+    def __contains__(self, model: object) -> bool:
+        return model in self._frames or model in self.statistics
+
+    def __repr__(self) -> str:
+        return f'PeriodView({", ".join(self)}; {self.dates[0]:%Y-%m-%d} - {self.dates[-1]:%Y-%m-%d})' \
+            if len(self.dates) else 'PeriodView()'
+
+    def columns(self, model: str) -> List[str]:
+        """Столбцы таблицы модели (без загрузки модели хранилища)."""
+        if model in self._frames:
+            return list(self._frames[model].columns)
+        return model_columns(self.statistics, model)
+
+    def _cut(self, frame: pd.DataFrame) -> pd.DataFrame:
+        indexer = frame.index.get_indexer(self.dates)
+        if len(indexer) and indexer[0] >= 0 and (np.diff(indexer) == 1).all():
+            # Дни идут подряд: срез строк - представление данных таблицы
+            view = frame.iloc[indexer[0]:indexer[-1] + 1]
+            view.index = self.dates
+            return view
+        return frame.reindex(self.dates)
+
+
+def filled_frames(statistics: Mapping[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """Таблицы моделей с нулями вместо пропусков (для расчета статистики по тестовому периоду)."""
+    return {model: frame.fillna(0) for model, frame in statistics.items()}
+
+
+def model_columns(statistics: Mapping[str, pd.DataFrame], model: str) -> List[str]:
+    """Столбцы таблицы модели: у хранилища и представления - без загрузки модели, у словаря - из таблицы."""
+    if isinstance(statistics, (StatisticsStore, PeriodView)):
+        return statistics.columns(model)
+    return list(statistics[model].columns)
@@ -0,0 +1,205 @@
+import contextvars
+import functools
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+from UI.config import TIMING_TRACE_MEMORY, TIMINGS_MAX_MB
+
+try:
+    import resource
+except ImportError:
+    # Windows: пиковый размер рабочего набора процесса дает psutil, если он установлен
+    resource = None
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+
+# Замер времени этапов расчета (интервалы, spans).
+# Каждый интервал записывает время выполнения, процессорное время, пиковый размер процесса в памяти (RSS)
+# и, если включен TIMING_TRACE_MEMORY, пиковый прирост памяти Python (tracemalloc) в лог и в файл TIMINGS_PATH
+# (одна JSON-запись на строку). Файл общий для всех процессов (интерфейс, воркеры пула, фоновый воркер очереди),
+# записи одного расчета объединяются по run_id.
+# Файл больше TIMINGS_MAX_MB переименовывается в архивный (TIMINGS_BACKUP_PATH, хранится один),
+# read_timeline читает оба.
+# Расчет, к которому относятся интервалы, свой у каждого потока (сессии streamlit выполняются в разных потоках).
+
+TIMINGS_PATH = pathlib.Path.cwd() / 'logs' / 'timings.jsonl'
+TIMINGS_BACKUP_PATH = TIMINGS_PATH.with_suffix('.jsonl.1')
+
+_local = threading.local()
+_run_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('run_id', default=None)
+# Число выполняющихся внешних интервалов, на время которых включен tracemalloc
+_traced_roots = 0
+_traced_own = False
+_traced_lock = threading.Lock()
+
+
+def current_run_id() -> Optional[str]:
+    return _run_id.get()
+
+
+@contextmanager
+def run_scope(run_id: Optional[str]) -> Iterator[None]:
+    """Относит интервалы, записанные внутри блока (в том же потоке), к расчету run_id."""
+    token = _run_id.set(run_id)
+    try:
+        yield
+    finally:
+        _run_id.reset(token)
+
+
+def peak_rss() -> Optional[int]:
+    """Наибольший размер процесса в оперативной памяти (RSS) с его запуска, байт; None, если недоступен."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss - в КБ (Linux) или в байтах (macOS)
+        return peak if sys.platform == 'darwin' else peak * 1024
+    if psutil is not None:
+        return psutil.Process().memory_info().peak_wset
+    return None
+
+
+def _stack() -> List[Dict[str, Any]]:
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+@contextmanager
+def span(name: str, **tags: Any) -> Iterator[Dict[str, Any]]:
+    """Замер интервала выполнения блока кода.
+
+    Parameters
+    ----------
+    name : str
+        имя интервала (этап расчета, функция).
+    tags
+        дополнительные поля записи, например число скважин.
+
+    Пиковый RSS (peak_rss) - наибольший размер процесса в памяти к концу интервала (peak_rss()); замеряется
+    всегда и ничего не стоит, но не сбрасывается между интервалами: интервал поднял пик процесса,
+    если peak_rss больше, чем у предыдущих интервалов того же процесса.
+    Пиковая память (peak_memory) - максимальный прирост памяти, выделенной Python (tracemalloc), относительно
+    начала интервала. Замеряется, если включен TIMING_TRACE_MEMORY, иначе равна None. tracemalloc включается
+    внешним интервалом и выключается, когда завершены все внешние интервалы процесса.
+    """
+    stack = _stack()
+    root_traced = TIMING_TRACE_MEMORY and not stack
+    if root_traced:
+        _start_tracing()
+    trace_memory = tracemalloc.is_tracing()
+    memory_start = 0
+    if trace_memory:
+        memory_start, peak = tracemalloc.get_traced_memory()
+        # Пик родительского интервала фиксируется до сброса счетчика
+        if stack:
+            stack[-1]['memory_peak'] = max(stack[-1]['memory_peak'], peak)
+        tracemalloc.reset_peak()
+    frame = {'name': name, 'memory_peak': memory_start}
+    stack.append(frame)
+    record = {
+        'run_id': _run_id.get(),
+        'name': name,
+        'parent': stack[-2]['name'] if len(stack) > 1 else None,
+        'pid': os.getpid(),
+        'start': time.time(),
+        **tags,
+    }
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        record['wall_time'] = time.perf_counter() - wall_start
+        record['cpu_time'] = time.process_time() - cpu_start
+        stack.pop()
+        record['peak_rss'] = peak_rss()
+        record['peak_memory'] = None
+        if trace_memory:
+            peak = max(frame['memory_peak'], tracemalloc.get_traced_memory()[1])
+            record['peak_memory'] = peak - memory_start
+            if stack:
+                stack[-1]['memory_peak'] = max(stack[-1]['memory_peak'], peak)
+        if root_traced:
+            _stop_tracing()
+        _write_record(record)
+
+
+def _start_tracing() -> None:
+    global _traced_roots, _traced_own
+    with _traced_lock:
+        if _traced_roots == 0:
+            # tracemalloc, включенный не UI.timing (например, профилировщиком), не выключается
+            _traced_own = not tracemalloc.is_tracing()
+            if _traced_own:
+                tracemalloc.start()
+        _traced_roots += 1
+
+
+def _stop_tracing() -> None:
+    global _traced_roots
+    with _traced_lock:
+        _traced_roots -= 1
+        if _traced_roots == 0 and _traced_own:
+            tracemalloc.stop()
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Декоратор: каждый вызов функции замеряется как интервал span."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _write_record(record: Dict[str, Any]) -> None:
+    logger.bind(span=record).debug(f'Timing: {record["name"]} wall {record["wall_time"]:.3f} s, '
+                                   f'cpu {record["cpu_time"]:.3f} s, peak RSS {record["peak_rss"]}, '
+                                   f'peak memory {record["peak_memory"]}')
+    try:
+        TIMINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
+        if TIMINGS_PATH.exists() and TIMINGS_PATH.stat().st_size > TIMINGS_MAX_MB * 2 ** 20:
+            os.replace(TIMINGS_PATH, TIMINGS_BACKUP_PATH)
+        # Короткая запись в режиме добавления не перемешивается с записями других процессов
+        with open(TIMINGS_PATH, 'a', encoding='UTF-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+    except OSError as exc:
+        logger.warning(f'Timing: record is not saved: {exc!r}')
+
+
+def read_timeline(run_id: str) -> pd.DataFrame:
+    """Интервалы расчета run_id в порядке начала."""
+    records = []
+    for path in (TIMINGS_BACKUP_PATH, TIMINGS_PATH):
+        if not path.exists():
+            continue
+        with open(path, encoding='UTF-8') as file:
+            for line in file:
+                # Разбираются только строки расчета run_id
+                if run_id not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get('run_id') == run_id:
+                    records.append(record)
+    timeline = pd.DataFrame(records)
+    if timeline.empty:
+        return timeline
+    timeline['start'] = pd.to_datetime(timeline['start'], unit='s')
+    timeline['finish'] = timeline['start'] + pd.to_timedelta(timeline['wall_time'], unit='s')
+    return timeline.sort_values('start').reset_index(drop=True)
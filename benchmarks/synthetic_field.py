@@ -0,0 +1,219 @@
+"""Синтетические месторождения для замеров производительности (см. main_benchmark.py).
+
+Месторождение - папка с файлами welllist.feather и sh_sost_fond.feather в формате выгрузки,
+а также результаты "моделей": подставные калькуляторы с атрибутами, которые читают
+функции UI.data_processor.extract_data_*, и готовые таблицы статистики state.statistics.
+"""
+import datetime
+import pathlib
+from types import SimpleNamespace
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from UI.app_state import RunState
+from UI.statistics_store import StatisticsStore
+
+SHOPS = ['ЦДНГ-1', 'ЦДНГ-2', 'ЦДНГ-3', 'ЦДНГ-4']
+# Доли состояний скважин в sh_sost_fond и длина периода с неизменным состоянием, сут
+STATUSES = {'В работе': 0.85, 'Остановлена': 0.1, 'В бездействии': 0.05}
+STATUS_PERIOD = 10
+CHARWORK = {'Нефтяные': 0.85, 'Нагнетательные': 0.15}
+# Доля скважин с боковыми стволами (строки welllist с npath > 0)
+SIDETRACK_SHARE = 0.1
+MODELS = ('ftor', 'wolfram', 'CRM', 'fedot', 'shelf')
+
+
+class SyntheticField:
+    """Синтетическое месторождение из n_wells скважин.
+
+    Parameters
+    ----------
+    n_wells : int
+        число скважин.
+    date_start : datetime.date
+        дата начала адаптации.
+    date_test : datetime.date
+        дата начала прогноза.
+    date_end : datetime.date
+        дата конца прогноза.
+    seed : int
+        зерно генератора случайных чисел: одинаковые параметры дают одинаковое месторождение.
+    """
+
+    def __init__(self,
+                 n_wells: int,
+                 date_start: datetime.date = datetime.date(2021, 1, 1),
+                 date_test: datetime.date = datetime.date(2021, 10, 1),
+                 date_end: datetime.date = datetime.date(2021, 12, 31),
+                 seed: int = 0):
+        self.n_wells = n_wells
+        self.date_start = date_start
+        self.date_test = date_test
+        self.date_end = date_end
+        self.rng = np.random.default_rng(seed)
+        self.dates = pd.date_range(date_start, date_end, freq='D').date
+        self.dates_train = pd.date_range(date_start, date_test - datetime.timedelta(days=1), freq='D').date
+        self.dates_test = pd.date_range(date_test, date_end, freq='D').date
+        self.wells_ois = [245000000 + 100 * i for i in range(n_wells)]
+        self.wells_norm = [str(1000 + i) for i in range(n_wells)]
+        self.wellnames_key_ois = dict(zip(self.wells_ois, self.wells_norm))
+        self.wellnames_key_normal = dict(zip(self.wells_norm, self.wells_ois))
+        # Фактические дебиты жидкости и нефти с остановками скважин (нулевой дебит)
+        shape = (len(self.dates), n_wells)
+        liq = self.rng.lognormal(mean=3.5, sigma=0.5, size=shape)
+        water_cut = self.rng.uniform(0.3, 0.95, size=n_wells)
+        self.statuses = self._make_statuses(shape)
+        liq[self.statuses != 'В работе'] = 0
+        self.rates_liq = pd.DataFrame(liq, index=self.dates, columns=self.wells_ois)
+        self.rates_oil = self.rates_liq * (1 - water_cut)
+
+    def _make_statuses(self, shape: tuple) -> np.ndarray:
+        n_periods = -(-shape[0] // STATUS_PERIOD)
+        statuses = self.rng.choice(list(STATUSES), size=(n_periods, shape[1]), p=list(STATUSES.values()))
+        return np.repeat(statuses, STATUS_PERIOD, axis=0)[:shape[0]]
+
+    def _prediction(self, rates: pd.DataFrame) -> pd.DataFrame:
+        return rates * self.rng.normal(1, 0.15, size=rates.shape)
+
+    def write(self, path: pathlib.Path) -> pathlib.Path:
+        """Запись welllist.feather и sh_sost_fond.feather в папку path."""
+        path.mkdir(parents=True, exist_ok=True)
+        sidetracks = self.rng.random(self.n_wells) < SIDETRACK_SHARE
+        welllist = pd.DataFrame({
+            'ois': self.wells_ois,
+            'num': self.wells_norm,
+            'npath': 0,
+            'ceh': self.rng.choice(SHOPS, size=self.n_wells),
+        })
+        welllist_sidetracks = welllist[sidetracks].assign(npath=1, num=lambda df: df['num'] + 'Б')
+        pd.concat([welllist, welllist_sidetracks], ignore_index=True).to_feather(path / 'welllist.feather')
+
+        n_dates = len(self.dates)
+        sh_sost_fond = pd.DataFrame({
+            'dt': np.tile(pd.to_datetime(self.dates), self.n_wells),
+            'well.ois': np.repeat(self.wells_ois, n_dates),
+            'sost': self.statuses.T.ravel(),
+            'charwork.name': np.repeat(self.rng.choice(list(CHARWORK), size=self.n_wells, p=list(CHARWORK.values())),
+                                       n_dates),
+            'Дебит нефти расчетный': self.rates_oil.values.T.ravel(),
+            'Дебит жидкости расчетный': self.rates_liq.values.T.ravel(),
+        })
+        sh_sost_fond.to_feather(path / 'sh_sost_fond.feather')
+        return path
+
+    def make_state(self, with_statistics: bool = False) -> RunState:
+        """Состояние программы после save_current_state (и, при with_statistics, после расчета моделей)."""
+        state = RunState(
+            adapt_params={},
+            ensemble_interval=pd.DataFrame(),
+            exclude_wells=[],
+            statistics=StatisticsStore(),
+            statistics_test_only={},
+            selected_wells_norm=list(self.wells_norm),
+            selected_wells_ois=list(self.wells_ois),
+            was_calc_ensemble=True,
+            was_date_start=self.date_start,
+            was_date_test=self.date_test,
+            was_date_test_if_ensemble=self.date_test + datetime.timedelta(days=28),
+            was_date_end=self.date_end,
+            wellnames_key_normal=dict(self.wellnames_key_normal),
+            wellnames_key_ois=dict(self.wellnames_key_ois),
+            coeff_f=pd.DataFrame(),
+            models_weights={},
+        )
+        if with_statistics:
+            state.statistics = self.make_statistics()
+        return state
+
+    def make_statistics(self) -> StatisticsStore:
+        """Результаты всех моделей в формате state.statistics."""
+        statistics = StatisticsStore()
+        for model in MODELS:
+            columns = {}
+            liq_pred = self._prediction(self.rates_liq)
+            oil_pred = self._prediction(self.rates_oil)
+            liq_pred.loc[self.dates_train] = np.nan
+            oil_pred.loc[self.dates_train] = np.nan
+            for well_name_ois, well_name_normal in self.wellnames_key_ois.items():
+                columns[f'{well_name_normal}_liq_true'] = self.rates_liq[well_name_ois]
+                columns[f'{well_name_normal}_liq_pred'] = liq_pred[well_name_ois]
+                columns[f'{well_name_normal}_oil_true'] = self.rates_oil[well_name_ois]
+                columns[f'{well_name_normal}_oil_pred'] = oil_pred[well_name_ois]
+            statistics[model] = pd.DataFrame(columns)
+        return statistics
+
+    def _df_chess(self, well_name_ois: int) -> pd.DataFrame:
+        return pd.DataFrame({'Дебит жидкости': self.rates_liq[well_name_ois],
+                             'Дебит нефти': self.rates_oil[well_name_ois]})
+
+    def make_wells_ftor(self) -> List[SimpleNamespace]:
+        """Скважины модели пьезопроводности с атрибутами, которые используют extract_data_*."""
+        return [SimpleNamespace(well_name=well_name_ois,
+                                df_chess=self._df_chess(well_name_ois),
+                                density_oil=self.rng.uniform(0.8, 0.9))
+                for well_name_ois in self.wells_ois]
+
+    def make_calculator_ftor(self) -> SimpleNamespace:
+        liq_pred = self._prediction(self.rates_liq)
+        oil_pred = self._prediction(self.rates_oil)
+        wells = self.make_wells_ftor()
+        for well in wells:
+            params = {'kind_code': int(self.rng.integers(0, 4)),
+                      'permeability': self.rng.uniform(0.1, 10),
+                      'skin': self.rng.uniform(0.1, 2),
+                      'res_radius': self.rng.uniform(200, 700),
+                      'pressure_initial': self.rng.uniform(150, 300)}
+            well.results = SimpleNamespace(
+                adap_and_fixed_params=[params],
+                rates_liq_train=liq_pred[well.well_name].loc[self.dates_train],
+                rates_liq_test=liq_pred[well.well_name].loc[self.dates_test],
+                rates_oil_test=oil_pred[well.well_name].loc[self.dates_test],
+            )
+        return SimpleNamespace(wells=wells)
+
+    def make_calculator_wolfram(self) -> SimpleNamespace:
+        liq_pred = self._prediction(self.rates_liq)
+        oil_pred = self._prediction(self.rates_oil)
+        wells = []
+        for well_name_ois in self.wells_ois:
+            wells.append(SimpleNamespace(
+                well_name=well_name_ois,
+                NAME_RATE_LIQ='Дебит жидкости',
+                NAME_RATE_OIL='Дебит нефти',
+                df=self._df_chess(well_name_ois),
+                results=SimpleNamespace(rates_liq_test=liq_pred[well_name_ois].loc[self.dates_test],
+                                        rates_oil_test=oil_pred[well_name_ois].loc[self.dates_test]),
+            ))
+        return SimpleNamespace(wells=wells)
+
+    def make_prediction_CRM(self) -> pd.DataFrame:
+        """Прогноз CRM: столбцы - скважины в формате ГРАД."""
+        prediction = self._prediction(self.rates_liq).loc[self.dates_test]
+        return prediction.rename(columns=self.wellnames_key_ois)
+
+    def make_calculator_fedot(self) -> SimpleNamespace:
+        return SimpleNamespace(statistic_all=self.make_statistics()['fedot'].copy())
+
+    def make_calculator_shelf(self) -> SimpleNamespace:
+        rates_liq_test = self.rates_liq.loc[self.dates_test]
+        rates_oil_test = self.rates_oil.loc[self.dates_test]
+        return SimpleNamespace(wells_list=list(self.wells_ois),
+                               df_result=self._prediction(rates_oil_test),
+                               df_result_liq=self._prediction(rates_liq_test),
+                               _df_fact_test_prd=rates_oil_test,
+                               _df_fact_test_prd_liq=rates_liq_test)
+
+    def make_ensemble_result(self) -> Dict[str, pd.DataFrame]:
+        """Результат ансамбля по скважинам (см. UI.pipeline.merge_ensemble_result)."""
+        result = {}
+        dates = self.dates_test[28:]
+        for well_name_ois, well_name_normal in self.wellnames_key_ois.items():
+            true = self.rates_liq[well_name_ois].loc[dates]
+            ensemble = self._prediction(true.to_frame())[well_name_ois]
+            result[well_name_normal] = pd.DataFrame({'true': true,
+                                                     'ensemble': ensemble,
+                                                     'interval_upper': ensemble * 1.2,
+                                                     'interval_lower': ensemble * 0.8})
+        return result
@@ -3,6 +3,7 @@ from pathlib import Path
 import json
 import pandas as pd
 import numpy as np
+from UI.field_data import read_well_states
 from tools_preprocessor.config import Config as ConfigPreprocessor
 from tools_preprocessor.preprocessor import Preprocessor
 
@@ -59,9 +60,8 @@ if __name__ == '__main__':
     date_test = datetime.date(2022, 4, 1)
     date_end = datetime.date(2022, 4, 30)
 
-    path = Path.cwd() / 'tools_preprocessor' / 'data' / field_name / 'sh_sost_fond.feather'
-    df_sh_sost_fond = pd.read_feather(path)
-    df_sh_sost_fond.set_index('dt', inplace=True)
+    path = Path.cwd() / 'tools_preprocessor' / 'data' / field_name
+    df_sh_sost_fond = read_well_states(path, ['dt', 'well.ois', STATUS, DEBIT]).set_index('dt')
     date_start = df_sh_sost_fond.index[0]
     preprocessor = Preprocessor(
         ConfigPreprocessor(
@@ -1,17 +1,22 @@
+from copy import deepcopy
 from datetime import date, timedelta
-from typing import Optional, Union
+from typing import Optional
 
 import pandas as pd
 import streamlit as st
 from loguru import logger
 
 import UI.pages
-from UI.cached_funcs import calculate_ftor, calculate_wolfram, calculate_ensemble, run_preprocessor,\
-    calculate_shelf, calculate_fedot, calculate_CRM
-from UI.config import FIELDS_SHOPS, DATE_MIN, DATE_MAX, DEFAULT_FTOR_BOUNDS
+from UI import timing
+from UI.cached_funcs import run_preprocessor
+from UI.config import FIELDS_SHOPS, DATE_MIN, DATE_MAX, DEFAULT_FTOR_BOUNDS, DEFAULT_MODEL_PARAMS, \
+    BACKGROUND_JOBS, INTERFACE_ONLY_MODELS
 from UI.data_processor import *
-from frameworks_crm.class_CRM.calculator import Calculator as CalculatorCRM
-from frameworks_ftor.ftor.well import Well
+from UI.jobs import JobQueue, JOB_STATUSES
+from UI.memory_cache import STAGE_RESULTS, stats_to_frame
+from UI.pipeline import make_preprocessor_key, run_pipeline, save_current_state
+from UI.profiling import make_profile_tag, profile_run
+from UI.run_archive import start_page_in
 from tools_preprocessor.config import Config as ConfigPreprocessor
 from tools_preprocessor.preprocessor import Preprocessor
 
@@ -49,137 +54,16 @@ def initialize_session(_session: st.session_state) -> None:
         Функция используется только при первом рендеринге приложения.
     """
     start_logger()
-    _session.state = AppState()
+    _session.state = RunState()
     # Ftor model
-    _session.constraints = {}
     for param_name, param_dict in DEFAULT_FTOR_BOUNDS.items():
         _session[f'{param_name}_is_adapt'] = True
         _session[f'{param_name}_lower'] = param_dict['lower_val']
         _session[f'{param_name}_default'] = param_dict['default_val']
         _session[f'{param_name}_upper'] = param_dict['upper_val']
-    # ML model
-    _session.estimator_name_group = 'xgb'
-    _session.estimator_name_well = 'svr'
-    _session.is_deep_grid_search = False
-    _session.quantiles = [0.1, 0.3]
-    _session.window_sizes = [3, 5, 7, 15, 30]
-    # CRM model
-    _session.CRM_influence_R = 1300
-    _session.CRM_maxiter = 100
-    _session.CRM_p_res = 220
-    # Shelf model
-    _session.n_days_past = 30
-    _session.n_days_calc_avg = 5
-    # Ensemble model
-    _session.ensemble_adapt_period = 28
-    _session.interval_probability = 0.9
-    _session.draws = 300
-    _session.tune = 200
-    _session.chains = 1
-    _session.target_accept = 0.95
-
-
-def parse_well_names(well_names_ois: List[int], field_name: str) -> Tuple[Dict[str, int], Dict[int, str]]:
-    """Функция сопоставляет имена скважин OIS и (ГРАД?)
-
-    Parameters
-    ----------
-    well_names_ois: List[int]
-        список имен скважин в формате OIS (например 245023100).
-    field_name : str
-        Имя месторождения.
-    Returns
-    -------
-    wellnames_key_normal : Dict[str, int]
-        Ключ = имя скважины в формате ГРАД, значение - имя скважины OIS.
-    wellnames_key_ois : Dict[int, str]
-        Ключ = имя скважины OIS, значение - имя скважины в формате ГРАД.
-    """
-    # TODO: заменить костыльный способ
-    welllist = pd.read_feather(Preprocessor._path_general / field_name / 'welllist.feather')
-    wellnames_key_normal_ = {}
-    wellnames_key_ois_ = {}
-    for name_ois in well_names_ois:
-        well_name_norm = welllist[welllist.ois == name_ois]
-        well_name_norm = well_name_norm[well_name_norm.npath == 0]
-        well_name_norm = well_name_norm.at[well_name_norm.index[0], 'num']
-        wellnames_key_normal_[well_name_norm] = name_ois
-        wellnames_key_ois_[name_ois] = well_name_norm
-    return wellnames_key_normal_, wellnames_key_ois_
-
-# TODO: добавить переменные в функцию
-def save_current_state(
-        state: AppState,
-        _session: st.session_state,
-        config: ConfigPreprocessor,
-        models_to_run: dict[str, bool],
-        date_start: date,
-        date_test: date,
-        date_end: date,
-        selected_wells_norm: list[str],
-        selected_wells_ois: list[int],
-        wellnames_key_normal: dict[str, int],
-        wellnames_key_ois: dict[int, str],
-        wells_ftor: list[Well]
-) -> AppState:
-    """
-    Функция сохраняет состояние программы в объект state класса AppState.
-
-    Parameters
-    ----------
-    state : AppState
-        Переменная, в которую будет записано состояние программы.
-    _session: streamlit.session_state
-        Сессия приложения, из которой будет извлекаться состояние программы.
-    config : ConfigPreprocessor
-        Конфигурация месторождения, дат адаптации и прогноза, выбранная пользователем.
-    models_to_run : dict[str, bool]
-        Словарь ключ - имя модели, значение - выбрана ли модель для расчета.
-    date_start : date
-        Дата начала адаптации.
-    date_test : date
-        Дата начала прогноза.
-    date_end : date
-        Дата конца прогноза.
-    selected_wells_norm : list[str]
-        Список выбранных скважин для расчета в формате ГРАД.
-    selected_wells_ois : list[int]
-        Список выбранных скважин для расчета в формате OIS.
-    wellnames_key_normal : Dict[str, int]
-        Ключ = имя скважины в формате ГРАД, значение - имя скважины OIS.
-    wellnames_key_ois : Dict[int, str]
-        Ключ = имя скважины OIS, значение - имя скважины в формате ГРАД.
-    wells_ftor : list[Well]
-        Список объектов скважин Well.
-    Returns
-    -------
-    """
-    state['adapt_params'] = {}
-    state['buffer'] = None
-    state['ensemble_interval'] = pd.DataFrame()
-    state['exclude_wells'] = []
-    state['statistics'] = {}
-    state['statistics_test_only'] = {}
-    state['selected_wells_norm'] = selected_wells_norm.copy()
-    state['selected_wells_ois'] = selected_wells_ois.copy()
-    state['was_config'] = config
-    state['was_calc_ftor'] = models_to_run['ftor']
-    state['was_calc_wolfram'] = models_to_run['wolfram']
-    state['was_calc_CRM'] = models_to_run['CRM']
-    state['was_calc_shelf'] = models_to_run['shelf']
-    state['was_calc_ensemble'] = models_to_run['ensemble']
-    state['was_date_start'] = date_start
-    state['was_date_test'] = date_test
-    state['was_date_test_if_ensemble'] = date_test + timedelta(days=_session.ensemble_adapt_period)
-    state['was_date_end'] = date_end
-    state['wellnames_key_normal'] = wellnames_key_normal.copy()
-    state['wellnames_key_ois'] = wellnames_key_ois.copy()
-    state['wells_ftor'] = wells_ftor
-    state['coeff_f'] = pd.DataFrame()
-    state['CRM_influence_R'] = _session.CRM_influence_R
-    state['wells_coords_CRM'] = pd.DataFrame()
-    state['models_weights'] = {}
-    return state
+    # Параметры ftor, ML, CRM, Shelf и ансамбля
+    for param_name, value in DEFAULT_MODEL_PARAMS.items():
+        _session[param_name] = deepcopy(value)
 
 
 def select_page(pages: Dict[str, Any]) -> str:
@@ -223,6 +107,25 @@ def select_models() -> Dict[str, bool]:
     return selected_models
 
 
+def select_profiling() -> Tuple[bool, bool]:
+    """Виджет включения профилирования расчета и отрисовки страниц.
+
+    Профили сохраняются в папку logs/ (см. UI.profiling).
+    """
+    with st.expander('Профилирование'):
+        profile_models = st.checkbox(
+            label='Профилировать расчет моделей',
+            value=False,
+            key='profile_models',
+        )
+        profile_pages = st.checkbox(
+            label='Профилировать отрисовку страницы',
+            value=False,
+            key='profile_pages',
+        )
+    return profile_models, profile_pages
+
+
 def select_oilfield(session: st.session_state, fields_shops: Dict[str, List[str]]) -> str:
     """Виджет выбора месторождения для расчета.
 
@@ -333,7 +236,8 @@ def run_models(_session: st.session_state,
                date_start_forecast: date,
                date_end_forecast: date,
                oilfield: str,
-               shops: List[str]) -> None:
+               shops: List[str],
+               previous_state: Optional[RunState] = None) -> None:
     """Запуск расчета моделей, которые выбрал пользователь.
 
     Parameters
@@ -357,241 +261,91 @@ def run_models(_session: st.session_state,
         дата конца прогноза для всех моделей.
     oilfield : str
         название месторождения, которое выбрал пользователь.
+    previous_state : RunState, optional
+        состояние программы после предыдущего расчета. Модели, входные данные которых
+        не изменились, не пересчитываются.
 
     Notes
     -------
-    В конце расчета каждой из моделей вызывается функция извлечения результатов.
-    Таким образом все результаты приводятся к единому формату данных.
+    Граф расчета строится и выполняется функцией UI.pipeline.run_pipeline.
     """
-    at_least_one_model = _models_to_run['ftor'] or _models_to_run['wolfram'] or _models_to_run['CRM'] or _models_to_run['shelf']
-    if _models_to_run['ftor']:
-        run_ftor(_preprocessor, wells_ois, _session.constraints, _session.state)
-    if _models_to_run['wolfram']:
-        run_wolfram(date_start_forecast, date_end_forecast, _preprocessor,
-                    wells_ois, _session, _session.state)
-    if _models_to_run['CRM']:
-        calculator_CRM = run_CRM(date_start_adapt, date_start_forecast, date_end_forecast,
-                                 oilfield, _session, _session.state)
-        if calculator_CRM is not None:
-            run_fedot(oilfield, date_start_adapt, date_start_forecast, date_end_forecast, wells_norm,
-                      calculator_CRM.f, _session.state)
-        else:
-            coeff_f_fake = pd.DataFrame(columns = wells_norm)
-            run_fedot(oilfield, date_start_adapt, date_start_forecast, date_end_forecast, wells_norm,
-                      coeff_f_fake, _session.state)
-    if _models_to_run['shelf']:
-        run_shelf(oilfield, shops, wells_ois, date_start_adapt, date_start_forecast, date_start_adapt,
-                  date_end_forecast, _session.n_days_past, _session.n_days_calc_avg, _session.state)
-    if at_least_one_model:
-        make_models_stop_well(_session.state['statistics'], _session.state['selected_wells_norm'])
-    if _models_to_run['ensemble'] and at_least_one_model:
-        run_ensemble(_session, wells_norm, mode='liq')
-        run_ensemble(_session, wells_norm, mode='oil')
-
-
-def run_ftor(_preprocessor: Preprocessor,
-             wells_ois: List[int],
-             constraints: Optional[Dict[
-                 str, Union[float, Dict[str, Union[bool, List[float]]]]
-             ]],
-             state: AppState) -> None:
-    """Расчет модели пьезопроводности и последующее извлечение результатов.
-
-    Parameters
-    ----------
-    _preprocessor : Preprocessor
-        препроцессор с конфигурацией, заданной пользователем.
-    wells_ois : List[int]
-        список имен скважин в формате OIS.
-    constraints : Dict
-        словарь с границами параметров адаптации.
-    state : AppState
-        состояние программы, заданное пользователем.
+    run_pipeline(_session.state, _session, _models_to_run, _preprocessor, wells_ois, wells_norm,
+                 date_start_adapt, date_start_forecast, date_end_forecast, oilfield, shops,
+                 previous_state=previous_state)
+
+
+def submit_job(session: st.session_state,
+               models_to_run: Dict[str, bool],
+               field_name: str,
+               shops: List[str],
+               date_start: date,
+               date_test: date,
+               date_end: date,
+               selected_wells_norm: List[str]) -> None:
+    """Постановка расчета в фоновую очередь UI.jobs.JobQueue.
+
+    Расчет выполняется процессом main_worker.py, поэтому скрипт Streamlit не блокируется.
+    Номер задачи запоминается в сессии, результаты подхватываются функцией draw_job_status.
     """
-    calculator_ftor = calculate_ftor(_preprocessor, wells_ois, constraints)
-    extract_data_ftor(calculator_ftor, state)
-
-
-def run_wolfram(date_start_forecast: date,
-                date_end_forecast: date,
-                _preprocessor: Preprocessor,
-                wells_ois: List[int],
-                _session: st.session_state,
-                state: AppState) -> None:
-    """Расчет модели ML и последующее извлечение результатов.
-
-    Parameters
-    ----------
-    date_start_forecast : date
-        дата начала прогноза.
-    date_end_forecast : date
-        дата конца прогноза.
-    _preprocessor : Preprocessor
-        препроцессор с конфигурацией, заданной пользователем.
-    wells_ois : List[int]
-        список имен скважин в формате OIS.
-    _session : st.session_state
-        текущая сессия streamlit. В ней содержатся настройки моделей и
-        текущее состояние программы _session.state.
-    state: AppState
-        состояние программы, заданное пользователем.
-    """
-    forecast_days_number = (date_end_forecast - date_start_forecast).days + 1
-    calculator_wolfram = calculate_wolfram(_preprocessor,
-                                           wells_ois,
-                                           forecast_days_number,
-                                           _session.estimator_name_group,
-                                           _session.estimator_name_well,
-                                           _session.is_deep_grid_search,
-                                           _session.window_sizes,
-                                           _session.quantiles)
-    extract_data_wolfram(calculator_wolfram, state)
-    convert_tones_to_m3_for_wolfram(state, state.wells_ftor)
-
-
-def run_CRM(date_start_adapt: date,
-            date_start_forecast: date,
-            date_end_forecast: date,
-            oilfield: str,
-            _session: st.session_state,
-            state: AppState) -> CalculatorCRM:
-    """Расчет модели CRM и последующее извлечение результатов.
-
-    Parameters
-    ----------
-    date_start_adapt : date
-        дата начала адаптации.
-    date_start_forecast : date
-        дата начала прогноза.
-    date_end_forecast : date
-        дата конца прогноза.
-    oilfield : str
-        название месторождения, выбранное пользователем.
-    _session : st.session_state
-        текущая сессия streamlit. В ней содержатся настройки моделей и
-        текущее состояние программы _session.state.
-    state: AppState
-        состояние программы, заданное пользователем.
-    """
-    calculator_CRM = calculate_CRM(date_start_adapt=date_start_adapt,
-                                   date_end_adapt=date_start_forecast - timedelta(days=1),
-                                   date_end_forecast=date_end_forecast,
-                                   oilfield=oilfield,
-                                   influence_R=_session.CRM_influence_R,
-                                   maxiter=_session.CRM_maxiter,
-                                   p_res=_session.CRM_p_res)
-    if calculator_CRM is not None:
-        extract_data_CRM(calculator_CRM.pred_CRM, state, state['wells_ftor'], mode='CRM')
-        extract_influence_coeff_CRM(calculator_CRM.f, state)
-        state['wells_coords_CRM'] = calculator_CRM._coordinates
-    return calculator_CRM
-
-
-def run_fedot(oilfield: str,
-              date_start: date,
-              date_test: date,
-              date_end: date,
-              wells_norm: List,
-              coeff: pd.DataFrame,
-              state: AppState,
-              lags: pd.DataFrame = None) -> None:
-    """Расчет модели Fedot (поверх CRM) и последующее извлечение результатов.
-
-    Parameters
-    ----------
-    oilfield : str
-        название месторождения, выбранное пользователем.
-    date_start : date
-        дата начала адаптации.
-    date_test : date
-        дата начала прогноза.
-    date_end : date
-        дата конца прогноза.
-    wells_norm : List[str]
-        список имен скважин в "читаемом" формате (ГРАД?).
-    coeff : pd.DataFrame
-        коэффициенты взаимовлияния скважин
-    state : AppState
-        состояние программы, заданное пользователем.
-    """
-    calculator_fedot = calculate_fedot(oilfield=oilfield,
-                                       train_start=date_start,
-                                       train_end=date_test - timedelta(days=1),
-                                       predict_start=date_test,
-                                       predict_end=date_end,
-                                       wells_norm=wells_norm,
-                                       coeff=coeff,
-                                       lags=lags)
-    extract_data_fedot(calculator_fedot, state)
-
-def run_shelf(oilfield: str,
-              shops: List[str],
-              well_ois: List[int],
-              train_start: date,
-              train_end: date,
-              predict_start: date,
-              predict_end: date,
-              n_days_past: int,
-              n_days_calc_avg: int,
-              state: AppState) -> None:
-    """Расчет модели прогноза по темпам падений и последующее извлечение результатов.
-       Parameters
-       ----------
-       oilfield : str
-           название месторождения, выбранное пользователем.
-       date_start : date
-           дата начала адаптации.
-       date_test : date
-           дата начала прогноза.
-       date_end : date
-           дата конца прогноза.
-       state : AppState
-           состояние программы, заданное пользователем.
-       """
-    if 'change_gtm_info' not in st.session_state:
-        st.session_state['change_gtm_info'] = 0
-    calculator_shelf = calculate_shelf(oilfield,
-                                       shops,
-                                       well_ois,
-                                       train_start,
-                                       train_end,
-                                       predict_start,
-                                       predict_end,
-                                       n_days_past,
-                                       n_days_calc_avg,
-                                       st.session_state['change_gtm_info'])
-    print('run shelf done')
-    extract_data_shelf(calculator_shelf,state) #,st.session_state['change_gtm_info'])
-
-def run_ensemble(_session: st.session_state,
-                 wells_norm: list[str],
-                 mode: str = 'liq') -> None:
-    """Расчет ансамбля моделей, доверительного интервала, и последующее извлечение результатов.
-
-    Parameters
-    ----------
-    _session : st.session_state
-        текущая сессия streamlit. В ней содержатся настройки моделей и
-        текущее состояние программы _session.state.
-    wells_norm: list[str]
-        список имен скважины в формате (ГРАД?).
-    mode: str
-        режим расчета жидкости/нефти.
-    """
-    name_of_y_true = 'true'
-    input_data = prepare_data_for_ensemble(_session.state, wells_norm, name_of_y_true, mode)
-    ensemble_result, ensemble_weights = calculate_ensemble(
-        input_data,
-        adaptation_days_number=_session.ensemble_adapt_period,
-        interval_probability=_session.interval_probability,
-        draws=_session.draws,
-        tune=_session.tune,
-        chains=_session.chains,
-        target_accept=_session.target_accept,
-        name_of_y_true=name_of_y_true)
-    _session.state.models_weights[mode] = ensemble_weights
-    for well_name_normal in ensemble_result.keys():
-        extract_data_ensemble(ensemble_result[well_name_normal], _session.state, well_name_normal, mode)
+    config = {
+        'field_name': field_name,
+        'shops': shops,
+        'date_start': date_start.isoformat(),
+        'date_test': date_test.isoformat(),
+        'date_end': date_end.isoformat(),
+        'wells': selected_wells_norm,
+        'models': models_to_run,
+        'params': {param_name: session[param_name] for param_name in DEFAULT_MODEL_PARAMS},
+        # Результаты предыдущего расчета сессии: неизменившиеся модели не пересчитываются
+        'previous_job': session.state.job_id,
+        'profile': session.profile_models,
+    }
+    queue = JobQueue()
+    session.job_id = queue.submit(config)
+    queue.ensure_worker()
+    logger.info(f'Job {session.job_id} submitted.')
+
+
+def draw_job_status(session: st.session_state) -> None:
+    """Отображение хода фонового расчета и загрузка его результатов в session.state."""
+    if 'job_id' not in session or session.job_id is None:
+        return
+    queue = JobQueue()
+    job = queue.get(session.job_id)
+    if job is None:
+        session.job_id = None
+        return
+    # Воркер мог остановиться во время расчета: такая задача отмечается ошибкой
+    if job['status'] == 'running' and queue.recover_stale():
+        job = queue.get(session.job_id)
+    if job['status'] == 'done':
+        session.state = queue.load_result(job)
+        start_page_in(session.state)
+        session.job_id = None
+        logger.success(f'Job {job["id"]}: finish calculations.')
+        st.success('Расчеты завершены.')
+        return
+    if job['status'] == 'failed':
+        session.job_id = None
+        st.error(f'Расчет завершился с ошибкой: {job["error"]}')
+        return
+    if job['status'] == 'queued':
+        st.info(f'Расчет №{job["id"]} в очереди. Расчетов перед ним: {queue.position(job["id"])}')
+    else:
+        st.info(f'Расчет №{job["id"]} выполняется.')
+        for stage, status in job['progress'].items():
+            st.write(f'{stage}: {JOB_STATUSES[status]}')
+    st.button('Обновить статус расчета')
+
+
+def draw_cache_stats() -> None:
+    """Счетчики кэша результатов этапов расчета в процессе интерфейса и в фоновом воркере."""
+    with st.expander('Кэш результатов расчета'):
+        stats = [stats_to_frame(STAGE_RESULTS.stats(), 'Интерфейс')]
+        worker_stats = JobQueue().worker_cache_stats()
+        if worker_stats is not None:
+            stats.append(stats_to_frame(worker_stats, 'Фоновый воркер'))
+        st.dataframe(pd.concat(stats).T)
 
 
 @logger.catch
@@ -603,13 +357,15 @@ def main():
     with st.sidebar:
         selected_page = select_page(PAGES)
         models_to_run = select_models()
+        profile_models, profile_pages = select_profiling()
         try:
             field_name = select_oilfield(st.session_state, FIELDS_SHOPS)
             shops = select_shops(st.session_state, field_name)
             date_start, date_test, date_end = select_dates(st.session_state, date_min=DATE_MIN, date_max=DATE_MAX)
 
             config = ConfigPreprocessor(field_name, shops, date_start, date_test, date_end)
-            preprocessor = run_preprocessor(config)
+            preprocessor_key = make_preprocessor_key(field_name, shops, date_start, date_test, date_end)
+            preprocessor = run_preprocessor(config, preprocessor_key)
             wellnames_key_normal, wellnames_key_ois = parse_well_names(preprocessor.well_names, field_name)
             selected_wells_norm, selected_wells_ois = select_wells_to_calc(wellnames_key_normal)
 
@@ -625,32 +381,45 @@ def main():
     # Нажата кнопка "Запуск расчетов"
     if submit and selected_wells_norm:
         logger.info('Submit button pressed.')
-        session.state = save_current_state(
-            AppState(),
-            session,
-            config,
-            models_to_run,
-            date_start,
-            date_test,
-            date_end,
-            selected_wells_norm,
-            selected_wells_ois,
-            wellnames_key_normal,
-            wellnames_key_ois,
-            preprocessor.create_wells_ftor(selected_wells_ois)
-        )
-        # Запуск моделей
-        run_models(session, models_to_run, preprocessor,
-                   selected_wells_ois, selected_wells_norm,
-                   date_start, date_test, date_end, field_name, shops)
-        logger.success('Finish calculations.')
-        # Выделение прогнозов моделей
-        dfs, dates = cut_statistics_test_only(session.state)
-        session.state.statistics_test_only, session.state.statistics_test_index = dfs, dates
+        # Модель shelf использует данные сессии и рассчитывается в процессе интерфейса (INTERFACE_ONLY_MODELS)
+        if BACKGROUND_JOBS and not any(models_to_run.get(model) for model in INTERFACE_ONLY_MODELS):
+            submit_job(session, models_to_run, field_name, shops, date_start, date_test, date_end,
+                       selected_wells_norm)
+        else:
+            previous_state = session.state
+            session.state = save_current_state(
+                RunState(),
+                session,
+                config,
+                models_to_run,
+                date_start,
+                date_test,
+                date_end,
+                selected_wells_norm,
+                selected_wells_ois,
+                wellnames_key_normal,
+                wellnames_key_ois,
+                preprocessor.create_wells_ftor(selected_wells_ois),
+                preprocessor_key
+            )
+            # Запуск моделей
+            with profile_run(make_profile_tag(field_name, date_start, date_test, date_end), profile_models):
+                run_models(session, models_to_run, preprocessor,
+                           selected_wells_ois, selected_wells_norm,
+                           date_start, date_test, date_end, field_name, shops, previous_state)
+            logger.success('Finish calculations.')
+            # Выделение прогнозов моделей
+            with timing.run_scope(session.state.run_id):
+                dfs, dates = cut_statistics_test_only(session.state)
+            session.state.statistics_test_only, session.state.statistics_test_index = dfs, dates
+    with st.sidebar:
+        draw_job_status(session)
+        draw_cache_stats()
 
     # Отображение выбранной страницы
     page = PAGES[selected_page]
-    page.show(session)
+    with profile_run(make_profile_tag('page', selected_page), profile_pages):
+        page.show(session)
 
 
 PAGES = {
@@ -661,6 +430,7 @@ PAGES = {
     "Аналитика": UI.pages.analytics,
     "Скважина": UI.pages.specific_well,
     "Импорт/экспорт расчетов": UI.pages.resume_app,
+    "Диагностика": UI.pages.diagnostics,
 }
 
 if __name__ == '__main__':
@@ -0,0 +1,174 @@
+"""Пакетный (без Streamlit) запуск расчета моделей.
+
+Пример запуска:
+    python main_batch.py --config batch.json --output results
+
+Формат конфигурационного файла (JSON):
+    {
+        "field_name": "Крайнее",
+        "shops": ["ЦДНГ-4"],                  // необязательно, по умолчанию - все цеха месторождения
+        "date_start": "2019-01-01",
+        "date_test": "2022-01-01",
+        "date_end": "2022-02-28",
+        "wells": ["101", "102"],              // необязательно, по умолчанию - все скважины (формат ГРАД)
+        "models": {"ftor": true, "wolfram": true, "CRM": true, "ensemble": true},
+        "params": {"draws": 500},             // необязательно, переопределяет UI.config.DEFAULT_MODEL_PARAMS
+        "profile": false                      // необязательно, сохранить профиль расчета в logs/ (UI.profiling)
+    }
+
+Модель по темпам падения (shelf) рассчитывается только в интерфейсе (см. UI.config.INTERFACE_ONLY_MODELS).
+"""
+import argparse
+import json
+import pathlib
+from copy import deepcopy
+from datetime import date
+from timeit import default_timer
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+from UI import timing
+from UI.app_state import AppState, RunState
+from UI.config import DEFAULT_MODEL_PARAMS, INTERFACE_ONLY_MODELS
+from UI.field_data import read_field_frame
+from UI.data_processor import parse_well_names, cut_statistics_test_only, export_results_to_excel
+from UI.pipeline import make_preprocessor_key, run_pipeline, save_current_state
+from UI.profiling import make_profile_tag, profile_run
+from tools_preprocessor.config import Config as ConfigPreprocessor
+from tools_preprocessor.preprocessor import Preprocessor
+
+MODELS = ('ftor', 'wolfram', 'CRM', 'shelf', 'ensemble')
+
+
+def start_logger() -> None:
+    """Инициализация логгера."""
+    logger.remove()
+    logger.add('logs/log.log', format="{time:YYYY-MM-DD at HH:mm:ss} {level} {message}",
+               level="DEBUG", rotation="1 MB", compression="zip", enqueue=True)
+    logger.info('Start batch')
+
+
+def read_config(path: pathlib.Path) -> Dict[str, Any]:
+    """Чтение и проверка конфигурационного файла пакетного запуска."""
+    with open(path, encoding='UTF-8') as file:
+        return parse_config(json.load(file))
+
+
+def parse_config(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Проверка конфигурации пакетного запуска и преобразование дат из формата ISO."""
+    config = deepcopy(config)
+    for key in ('field_name', 'date_start', 'date_test', 'date_end'):
+        if key not in config:
+            raise ValueError(f'В конфигурации не задан параметр {key}.')
+    for key in ('date_start', 'date_test', 'date_end'):
+        config[key] = date.fromisoformat(config[key])
+    unknown_params = set(config.get('params', {})) - set(DEFAULT_MODEL_PARAMS)
+    if unknown_params:
+        raise ValueError(f'Неизвестные параметры моделей: {sorted(unknown_params)}.')
+    unknown_models = set(config.get('models', {})) - set(MODELS)
+    if unknown_models:
+        raise ValueError(f'Неизвестные модели: {sorted(unknown_models)}.')
+    interface_models = [model for model in INTERFACE_ONLY_MODELS if config.get('models', {}).get(model)]
+    if interface_models:
+        raise ValueError(f'Модели {interface_models} рассчитываются только в интерфейсе.')
+    return config
+
+
+def make_params(config: Dict[str, Any]) -> AppState:
+    """Параметры моделей: значения по умолчанию, переопределенные конфигурационным файлом."""
+    params = AppState(deepcopy(DEFAULT_MODEL_PARAMS))
+    for name, value in config.get('params', {}).items():
+        params[name] = value
+    return params
+
+
+def run_batch(config: Dict[str, Any],
+              progress: Optional[Callable[[str, str], None]] = None,
+              previous_state: Optional[RunState] = None) -> RunState:
+    """Расчет моделей по конфигурации пакетного запуска. Повторяет main_UI.main() без интерфейса.
+
+    Parameters
+    ----------
+    config : Dict[str, Any]
+        конфигурация, прошедшая parse_config.
+    progress : Callable[[str, str], None], optional
+        вызывается при смене статуса этапа расчета (см. UI.pipeline.run_pipeline).
+    previous_state : RunState, optional
+        состояние после предыдущего расчета: неизменившиеся этапы берутся из него.
+    """
+    field_name = config['field_name']
+    date_start, date_test, date_end = config['date_start'], config['date_test'], config['date_end']
+    shops = config.get('shops')
+    if not shops:
+        welllist = read_field_frame(Preprocessor._path_general / field_name, 'welllist.feather', ['ceh'])
+        shops = list(welllist.ceh.unique())
+    models_to_run = {model: config.get('models', {}).get(model, model not in INTERFACE_ONLY_MODELS)
+                     for model in MODELS}
+    params = make_params(config)
+
+    preprocessor_config = ConfigPreprocessor(field_name, shops, date_start, date_test, date_end)
+    preprocessor = Preprocessor(preprocessor_config)
+    wellnames_key_normal, wellnames_key_ois = parse_well_names(preprocessor.well_names, field_name)
+    wells_norm = list(config.get('wells') or wellnames_key_normal.keys())
+    unknown_wells = set(wells_norm) - set(wellnames_key_normal)
+    if unknown_wells:
+        raise ValueError(f'Скважины {sorted(unknown_wells)} не найдены на месторождении {field_name}.')
+    wells_ois = [wellnames_key_normal[well_name] for well_name in wells_norm]
+
+    state = save_current_state(
+        RunState(),
+        params,
+        preprocessor_config,
+        models_to_run,
+        date_start,
+        date_test,
+        date_end,
+        wells_norm,
+        wells_ois,
+        wellnames_key_normal,
+        wellnames_key_ois,
+        preprocessor.create_wells_ftor(wells_ois),
+        make_preprocessor_key(field_name, shops, date_start, date_test, date_end)
+    )
+    with profile_run(make_profile_tag(field_name, date_start, date_test, date_end), config.get('profile', False)):
+        run_pipeline(state, params, models_to_run, preprocessor, wells_ois, wells_norm,
+                     date_start, date_test, date_end, field_name, shops, progress, previous_state)
+    with timing.run_scope(state.run_id):
+        dfs, dates = cut_statistics_test_only(state)
+    state.statistics_test_only, state.statistics_test_index = dfs, dates
+    return state
+
+
+def save_results(state: RunState, output_dir: pathlib.Path) -> pathlib.Path:
+    """Запись прогнозов моделей и доверительных интервалов ансамбля на диск."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    file_name = f'{state.was_config.field_name}_{state.was_date_test}_{state.was_date_end}.xlsx'
+    path = output_dir / file_name
+    export_results_to_excel(state, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Пакетный расчет моделей без интерфейса Streamlit.')
+    parser.add_argument('--config', type=pathlib.Path, required=True,
+                        help='путь к конфигурационному файлу в формате JSON')
+    parser.add_argument('--output', type=pathlib.Path, default=pathlib.Path.cwd() / 'results',
+                        help='папка для сохранения результатов')
+    parser.add_argument('--profile', action='store_true',
+                        help='сохранить профиль расчета в папку logs/')
+    args = parser.parse_args()
+
+    start_logger()
+    start = default_timer()
+    config = read_config(args.config)
+    if args.profile:
+        config['profile'] = True
+    logger.info(f'Batch: {config["field_name"]} {config["date_start"]} - {config["date_end"]}')
+    state = run_batch(config)
+    path = save_results(state, args.output)
+    logger.success(f'Batch: finish calculations in {default_timer() - start:.1f} s. Results: {path}')
+
+
+if __name__ == '__main__':
+    main()
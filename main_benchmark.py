@@ -0,0 +1,220 @@
+"""Замеры производительности подготовки данных на синтетических месторождениях.
+
+Модели не рассчитываются: результаты моделей генерируются (benchmarks.synthetic_field),
+замеряются функции интерфейса, которые обрабатывают данные месторождения и результаты моделей.
+
+Пример запуска:
+    python main_benchmark.py --sizes 100 1000 10000 --repeat 3
+    python main_benchmark.py --sizes 5000 --only make_models_stop_well make_models_stop_well.frames \
+        make_models_stop_well.baseline
+
+Для 10 000 скважин требуется несколько ГБ оперативной памяти.
+Результаты (таблица времени по числу скважин и график масштабирования) сохраняются в папку --output.
+"""
+import argparse
+import pathlib
+import tempfile
+import warnings
+from datetime import datetime
+from timeit import default_timer
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from loguru import logger
+
+from UI import timing
+from UI.data_processor import parse_well_names, extract_data_ftor, extract_data_wolfram, extract_data_CRM, \
+    extract_data_fedot, extract_data_shelf, convert_tones_to_m3_for_wolfram, make_models_stop_well, \
+    cut_statistics_test_only, prepare_data_for_ensemble
+from UI.field_data import read_well_states
+from UI.pages.analytics import select_wells_set
+from UI.pages.wells_map import prepare_data_for_treemap
+from UI.pipeline import merge_ensemble_result
+from benchmarks.synthetic_field import SyntheticField
+from tools_preprocessor.preprocessor import Preprocessor
+
+warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
+
+SIZES = (100, 1000, 10000)
+# Замер: подготовка аргументов по месторождению (не замеряется) и замеряемая функция
+Benchmark = Tuple[Callable[[SyntheticField, str], tuple], Callable]
+
+
+def _state_with_statistics(field: SyntheticField) -> Any:
+    state = field.make_state(with_statistics=True)
+    state.statistics_test_only, state.statistics_test_index = cut_statistics_test_only(state)
+    return state
+
+
+def make_models_stop_well_baseline(statistics: Dict[str, pd.DataFrame], well_names: List[str]) -> None:
+    """make_models_stop_well до векторизации: маски строятся по каждой скважине и величине отдельно
+    (эталон для сравнения времени, результат совпадает)."""
+    for model in statistics:
+        for well_name in well_names:
+            if f'{well_name}_oil_pred' not in statistics[model]:
+                continue
+            for quantity in ('liq', 'oil'):
+                values_true = statistics[model][f'{well_name}_{quantity}_true']
+                stopped = values_true.eq(0) | values_true.isna()
+                statistics[model].loc[stopped, f'{well_name}_{quantity}_pred'] = np.nan
+
+
+def _statistics_frames(field: SyntheticField) -> Dict[str, pd.DataFrame]:
+    return {model: frame.copy() for model, frame in field.make_statistics().items()}
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    'parse_well_names': (
+        lambda field, field_name: (field.wells_ois, field_name),
+        parse_well_names),
+    'read_well_states': (
+        lambda field, field_name: (Preprocessor._path_general / field_name, ['well.ois'], field.date_test,
+                                   'В работе', 'Нефтяные'),
+        read_well_states),
+    'extract_data_ftor': (
+        lambda field, _: (field.make_calculator_ftor(), field.make_state()),
+        extract_data_ftor),
+    'extract_data_wolfram': (
+        lambda field, _: (field.make_calculator_wolfram(), field.make_state()),
+        extract_data_wolfram),
+    'convert_tones_to_m3_for_wolfram': (
+        lambda field, _: (field.make_state(with_statistics=True), field.make_wells_ftor()),
+        convert_tones_to_m3_for_wolfram),
+    'extract_data_CRM': (
+        lambda field, _: (field.make_prediction_CRM(), field.make_state(), field.make_wells_ftor()),
+        extract_data_CRM),
+    'extract_data_fedot': (
+        lambda field, _: (field.make_calculator_fedot(), field.make_state()),
+        extract_data_fedot),
+    'extract_data_shelf': (
+        lambda field, _: (field.make_calculator_shelf(), field.make_state()),
+        extract_data_shelf),
+    'extract_data_ensemble': (
+        lambda field, _: (field.make_state(with_statistics=True), (field.make_ensemble_result(), {})),
+        merge_ensemble_result),
+    'make_models_stop_well': (
+        lambda field, _: (field.make_statistics(), field.wells_norm),
+        make_models_stop_well),
+    # Те же результаты, хранящиеся таблицами: обработка по столбцам, для сравнения с массивами
+    'make_models_stop_well.frames': (
+        lambda field, _: (_statistics_frames(field), field.wells_norm),
+        make_models_stop_well),
+    # Обработка по скважинам, как до векторизации
+    'make_models_stop_well.baseline': (
+        lambda field, _: (_statistics_frames(field), field.wells_norm),
+        make_models_stop_well_baseline),
+    'cut_statistics_test_only': (
+        lambda field, _: (field.make_state(with_statistics=True),),
+        cut_statistics_test_only),
+    'prepare_data_for_ensemble': (
+        lambda field, _: (field.make_state(with_statistics=True), field.wells_norm, 'true', 'liq'),
+        prepare_data_for_ensemble),
+    'analytics.select_wells_set': (
+        lambda field, _: (_state_with_statistics(field),),
+        select_wells_set),
+    'wells_map.prepare_data_for_treemap': (
+        lambda field, _: (field.make_state(with_statistics=True), 'ftor', tuple(field.wells_norm)),
+        prepare_data_for_treemap),
+}
+
+
+def start_logger() -> None:
+    """Инициализация логгера."""
+    logger.remove()
+    logger.add('logs/log.log', format="{time:YYYY-MM-DD at HH:mm:ss} {level} {message}",
+               level="DEBUG", rotation="1 MB", compression="zip", enqueue=True)
+    logger.add(lambda message: print(message, end=''), level='INFO', format='{message}')
+
+
+def time_benchmark(benchmark: Benchmark, field: SyntheticField, field_name: str, repeat: int) -> float:
+    """Минимальное время выполнения функции из repeat запусков, с. Аргументы готовятся заново для каждого запуска,
+    так как функции изменяют состояние программы."""
+    setup, func = benchmark
+    times = []
+    for _ in range(repeat):
+        args = setup(field, field_name)
+        start = default_timer()
+        func(*args)
+        times.append(default_timer() - start)
+    return min(times)
+
+
+def run_benchmarks(sizes: List[int], repeat: int, names: List[str]) -> pd.DataFrame:
+    """Замеры функций names на месторождениях из sizes скважин. Возвращает таблицу: функция x число скважин."""
+    results = pd.DataFrame(index=names, columns=sizes, dtype=float)
+    with tempfile.TemporaryDirectory() as data_path:
+        # parse_well_names читает welllist.feather из папки данных препроцессора
+        Preprocessor._path_general = pathlib.Path(data_path)
+        for n_wells in sizes:
+            field_name = f'synthetic_{n_wells}'
+            field = SyntheticField(n_wells)
+            start = default_timer()
+            field.write(Preprocessor._path_general / field_name)
+            logger.info(f'Benchmark: field of {n_wells} wells generated in {default_timer() - start:.1f} s')
+            for name in names:
+                results.loc[name, n_wells] = time_benchmark(BENCHMARKS[name], field, field_name, repeat)
+                logger.info(f'Benchmark: {name}, {n_wells} wells: {results.loc[name, n_wells]:.4f} s')
+    return results
+
+
+def scaling_exponents(results: pd.DataFrame) -> pd.Series:
+    """Показатель степени k в зависимости t ~ n^k (наклон в логарифмических осях).
+
+    k ~ 1 - линейный рост времени с числом скважин, k ~ 2 - квадратичный.
+    """
+    if results.shape[1] < 2:
+        return pd.Series(np.nan, index=results.index)
+    log_sizes = np.log(results.columns.astype(float))
+    return results.apply(lambda row: np.polyfit(log_sizes, np.log(row.astype(float)), 1)[0], axis=1)
+
+
+def create_scaling_plot(results: pd.DataFrame) -> go.Figure:
+    fig = go.Figure(layout=go.Layout(
+        font=dict(size=12),
+        title=dict(text='Время выполнения в зависимости от числа скважин', x=0.05, xanchor='left'),
+        template='seaborn',
+    ))
+    for name, row in results.iterrows():
+        fig.add_trace(go.Scatter(x=results.columns, y=row.values, name=name, mode='markers+lines'))
+    fig.update_xaxes(type='log', title='Число скважин')
+    fig.update_yaxes(type='log', title='Время, с')
+    return fig
+
+
+def save_report(results: pd.DataFrame, output_dir: pathlib.Path) -> pathlib.Path:
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / f'benchmark_{datetime.now():%Y%m%d-%H%M%S}'
+    report = results.copy()
+    report['Показатель масштабирования'] = scaling_exponents(results)
+    report.to_csv(path.with_suffix('.csv'), encoding='UTF-8')
+    create_scaling_plot(results).write_html(path.with_suffix('.html'))
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замеры подготовки данных на синтетических месторождениях.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES),
+                        help='число скважин синтетических месторождений')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='число запусков каждой функции (берется минимальное время)')
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), default=list(BENCHMARKS),
+                        help='замерять только указанные функции')
+    parser.add_argument('--output', type=pathlib.Path, default=pathlib.Path.cwd() / 'logs' / 'benchmarks',
+                        help='папка для сохранения результатов')
+    args = parser.parse_args()
+
+    start_logger()
+    # tracemalloc в интервалах UI.timing замедляет замеряемые функции
+    timing.TIMING_TRACE_MEMORY = False
+    results = run_benchmarks(sorted(args.sizes), args.repeat, args.only)
+    path = save_report(results, args.output)
+    report = results.applymap(lambda t: f'{t:.4f}')
+    report['k'] = scaling_exponents(results).round(2)
+    logger.info(f'\n{report.to_string()}')
+    logger.success(f'Benchmark: results saved to {path}.csv, {path}.html')
+
+
+if __name__ == '__main__':
+    main()
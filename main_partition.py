@@ -0,0 +1,38 @@
+"""Раскладка больших файлов месторождения по секциям (год/месяц/корзина скважин), см. UI.field_layout,
+и построение индексов имен и состояний скважин (UI.field_indexes) для месторождений, загруженных не через интерфейс.
+
+Пример запуска:
+    python main_partition.py Крайнее Отдельное --buckets 16
+
+После раскладки интерфейс читает из sh_sost_fond.feather только секции нужного периода и скважин.
+При изменении исходного файла секции и индексы перестают использоваться до повторного запуска конвертера.
+"""
+import argparse
+
+from loguru import logger
+
+from UI.config import PARTITION_WELL_BUCKETS
+from UI.field_indexes import write_field_indexes
+from UI.field_layout import partition_field_file
+from tools_preprocessor.preprocessor import Preprocessor
+
+FILES = ('sh_sost_fond.feather',)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Секционированное хранение данных месторождений.')
+    parser.add_argument('fields', nargs='+', help='названия месторождений (папки tools_preprocessor/data)')
+    parser.add_argument('--buckets', type=int, default=PARTITION_WELL_BUCKETS,
+                        help='число корзин скважин')
+    args = parser.parse_args()
+
+    logger.add('logs/log.log', format="{time:YYYY-MM-DD at HH:mm:ss} {level} {message}",
+               level="DEBUG", rotation="1 MB", compression="zip", enqueue=True)
+    for field_name in args.fields:
+        for file_name in FILES:
+            partition_field_file(Preprocessor._path_general / field_name, file_name, args.buckets)
+        write_field_indexes(Preprocessor._path_general / field_name)
+
+
+if __name__ == '__main__':
+    main()
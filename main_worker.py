@@ -0,0 +1,108 @@
+"""Фоновый воркер очереди расчетов UI.jobs.JobQueue.
+
+Запускается интерфейсом автоматически при постановке расчета в очередь либо вручную:
+    python main_worker.py
+"""
+import os
+import threading
+import time
+import zipfile
+from functools import partial
+from typing import Callable, Optional
+
+from loguru import logger
+
+from UI.app_state import RunState
+from UI.ingest import ingest_field
+from UI.jobs import JobQueue, WORKER_HEARTBEAT_PERIOD
+from UI.memory_cache import STAGE_RESULTS
+from main_batch import parse_config, run_batch
+
+# Период опроса очереди, с
+POLL_PERIOD = 2
+
+
+def start_logger() -> None:
+    """Инициализация логгера."""
+    logger.remove()
+    logger.add('logs/log.log', format="{time:YYYY-MM-DD at HH:mm:ss} {level} {message}",
+               level="DEBUG", rotation="1 MB", compression="zip", enqueue=True)
+    logger.info(f'Start worker {os.getpid()}')
+
+
+def start_heartbeat(queue: JobQueue) -> None:
+    """Периодически сообщает очереди, что воркер работает (в том числе во время расчета),
+    и передает счетчики кэша результатов для отображения в интерфейсе."""
+    def beat():
+        while True:
+            queue.heartbeat(os.getpid(), STAGE_RESULTS.stats())
+            time.sleep(WORKER_HEARTBEAT_PERIOD)
+
+    threading.Thread(target=beat, daemon=True).start()
+
+
+def load_previous_state(queue: JobQueue, config: dict) -> Optional[RunState]:
+    """Состояние программы после предыдущего расчета сессии, если оно сохранено."""
+    previous_job_id = config.get('previous_job')
+    if previous_job_id is None:
+        return None
+    previous_job = queue.get(previous_job_id)
+    if previous_job is None or previous_job['status'] != 'done':
+        return None
+    try:
+        return queue.load_result(previous_job)
+    except (OSError, ValueError, zipfile.BadZipFile):
+        logger.warning(f'Worker: results of job {previous_job_id} not found')
+        return None
+
+
+def process_job(queue: JobQueue, job: dict) -> None:
+    logger.info(f'Worker: start job {job["id"]}')
+    try:
+        config = parse_config(job['config'])
+        state = run_batch(config,
+                          progress=partial(queue.update_progress, job['id']),
+                          previous_state=load_previous_state(queue, config))
+        if queue.finish(job['id'], state):
+            logger.success(f'Worker: job {job["id"]} done')
+    except Exception as exc:
+        logger.exception(f'Worker: job {job["id"]} failed')
+        queue.fail(job['id'], repr(exc))
+
+
+def process_ingest_job(queue: JobQueue, job: dict) -> None:
+    logger.info(f'Worker: start ingest job {job["id"]}')
+    try:
+        ingest_field(job['config']['field_name'], job['config']['upload_dir'],
+                     progress=partial(queue.update_progress, job['id']))
+        if queue.finish_ingest(job['id']):
+            logger.success(f'Worker: ingest job {job["id"]} done')
+    except Exception as exc:
+        logger.exception(f'Worker: ingest job {job["id"]} failed')
+        queue.fail(job['id'], repr(exc))
+
+
+def serve(queue: JobQueue, kind: str, process: Callable[[JobQueue, dict], None]) -> None:
+    """Обработка задач вида kind по одной."""
+    while True:
+        job = queue.claim(kind)
+        if job is None:
+            time.sleep(POLL_PERIOD)
+            continue
+        process(queue, job)
+
+
+def main():
+    start_logger()
+    queue = JobQueue()
+    n_stale = queue.recover_stale()
+    if n_stale:
+        logger.warning(f'Worker: {n_stale} jobs of a stopped worker are marked as failed')
+    start_heartbeat(queue)
+    # Загрузка данных месторождений не ждет окончания расчетов
+    threading.Thread(target=serve, args=(queue, 'ingest', process_ingest_job), daemon=True).start()
+    serve(queue, 'run', process_job)
+
+
+if __name__ == '__main__':
+    main()
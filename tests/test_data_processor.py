@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('frameworks_hybrid_crm_ml')
+
+from UI.data_processor import make_models_stop_well, trim_ensemble_interval
+from UI.statistics_store import StatisticsStore
+
+DATES = pd.date_range('2021-01-01', periods=8, freq='D').date
+WELLS = ('101', '102', '103')
+
+
+def make_frames() -> dict:
+    rng = np.random.default_rng(1)
+    frames = {}
+    for model in ('ftor', 'wolfram'):
+        columns = {}
+        for well in WELLS:
+            for quantity in ('liq', 'oil'):
+                values_true = rng.random(len(DATES))
+                values_true[rng.random(len(DATES)) < 0.3] = 0
+                values_true[rng.random(len(DATES)) < 0.2] = np.nan
+                columns[f'{well}_{quantity}_true'] = values_true
+                columns[f'{well}_{quantity}_pred'] = rng.random(len(DATES))
+        frames[model] = pd.DataFrame(columns, index=DATES)
+    # У скважины 103 нет прогноза модели wolfram
+    frames['wolfram'] = frames['wolfram'].drop(columns=['103_liq_pred', '103_oil_pred'])
+    return frames
+
+
+def baseline_stop_well(frames: dict, well_names: list) -> None:
+    # Обработка по скважинам, как до переноса результатов в StatisticsStore
+    for model in frames:
+        for well_name in well_names:
+            if f'{well_name}_oil_pred' not in frames[model]:
+                continue
+            for quantity in ('liq', 'oil'):
+                values_true = frames[model][f'{well_name}_{quantity}_true']
+                frames[model].loc[(values_true == 0) | values_true.isna(), f'{well_name}_{quantity}_pred'] = np.nan
+
+
+@pytest.mark.parametrize('well_names', [list(WELLS), ['102'], ['999']])
+def test_stop_well_on_blocks_matches_baseline(well_names):
+    expected = make_frames()
+    baseline_stop_well(expected, well_names)
+    store = StatisticsStore(make_frames())
+
+    make_models_stop_well(store, well_names)
+
+    for model, frame in expected.items():
+        pd.testing.assert_frame_equal(store[model][frame.columns], frame)
+
+
+@pytest.mark.parametrize('well_names', [list(WELLS), ['102'], ['999']])
+def test_stop_well_on_frames_matches_baseline(well_names):
+    expected = make_frames()
+    baseline_stop_well(expected, well_names)
+    frames = make_frames()
+
+    make_models_stop_well(frames, well_names)
+
+    for model, frame in expected.items():
+        pd.testing.assert_frame_equal(frames[model], frame)
+
+
+def test_trim_ensemble_interval():
+    interval = pd.DataFrame({'101_liq_lower': [np.nan, 1.0, np.nan, 2.0, np.nan],
+                             '101_liq_upper': [np.nan, 3.0, 4.0, np.nan, np.nan]},
+                            index=DATES[:5])
+
+    trimmed = trim_ensemble_interval(interval)
+
+    assert list(trimmed.index) == list(DATES[1:4])
+    assert trim_ensemble_interval(interval.iloc[[0, 4]]).empty
@@ -0,0 +1,63 @@
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+from UI.field_data import FieldDataCatalog, read_well_states
+from UI.field_layout import partition_field_file
+
+
+def write_well_states(field_path) -> None:
+    frame = pd.DataFrame({
+        'dt': pd.to_datetime(['2021-12-31', '2022-01-01', '2022-01-31', '2022-02-01', '2022-03-01', '2022-03-01']),
+        'well.ois': [1, 2, 3, 4, 5, 6],
+        'sost': ['В работе', 'В работе', 'В работе', 'В работе', 'В работе', 'Остановлена'],
+        'charwork.name': ['Нефтяные'] * 6,
+    })
+    feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), str(field_path / 'sh_sost_fond.feather'))
+
+
+@pytest.mark.parametrize('partitioned', [False, True])
+def test_read_well_states_for_run_period(tmp_path, partitioned):
+    write_well_states(tmp_path)
+    if partitioned:
+        partition_field_file(tmp_path, n_buckets=2)
+
+    wells = read_well_states(tmp_path, ['well.ois'], date_after=date(2021, 12, 31), sost='В работе',
+                             charwork='Нефтяные', date_end=date(2022, 2, 1))
+
+    # Граница date_after не входит в период, date_end - входит; строки после date_end не читаются
+    assert sorted(wells['well.ois']) == [2, 3, 4]
+
+
+@pytest.mark.parametrize('partitioned', [False, True])
+def test_read_well_states_without_date_end(tmp_path, partitioned):
+    write_well_states(tmp_path)
+    if partitioned:
+        partition_field_file(tmp_path, n_buckets=2)
+
+    wells = read_well_states(tmp_path, ['well.ois'], date_after=date(2021, 12, 31), sost='В работе')
+
+    # Без date_end отбор совпадает с прежним: все строки после date_after
+    assert sorted(wells['well.ois']) == [2, 3, 4, 5]
+
+
+def test_catalog_frames_are_read_only(tmp_path):
+    write_well_states(tmp_path)
+    path = tmp_path / 'sh_sost_fond.feather'
+    catalog = FieldDataCatalog()
+
+    frame = catalog.frame(path)
+    with pytest.raises(ValueError):
+        frame.loc[0, 'well.ois'] = 100
+    frame.loc[0, 'sost'] = 'Остановлена'
+    frame['extra'] = 1
+    frame = frame.copy()
+    frame.loc[0, 'well.ois'] = 100
+
+    again = catalog.frame(path)
+    assert 'extra' not in again
+    assert again.loc[0, 'well.ois'] == 1
+    assert again.loc[0, 'sost'] == 'В работе'
@@ -0,0 +1,81 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+from UI.field_data import get_well_name_index, read_well_states, read_wells_in_state
+from UI.field_indexes import build_well_state_index, index_path, write_field_indexes
+
+
+def write_field(field_path) -> None:
+    rng = np.random.default_rng(3)
+    days = pd.date_range('2021-12-20', '2022-02-10', freq='D')
+    rows = []
+    for well in range(1, 21):
+        for day in days:
+            # Пропуски дней и смена состояния скважины
+            if rng.random() < 0.2:
+                continue
+            sost, charwork = rng.choice(['В работе', 'Остановлена']), rng.choice(['Нефтяные', 'Нагнетательные'])
+            rows.append((day, well, sost, charwork))
+    states = pd.DataFrame(rows, columns=['dt', 'well.ois', 'sost', 'charwork.name'])
+    feather.write_feather(states, str(field_path / 'sh_sost_fond.feather'))
+    welllist = pd.DataFrame({'ois': [1, 1, 2, 3], 'num': ['101', '101_2', '102', '103'], 'npath': [0, 0, 0, 1],
+                             'ceh': ['ЦДНГ-1'] * 4})
+    feather.write_feather(welllist, str(field_path / 'welllist.feather'))
+
+
+@pytest.mark.parametrize('date_after, date_end', [
+    (date(2021, 12, 31), date(2022, 1, 1)),
+    (date(2022, 1, 10), date(2022, 1, 20)),
+    (date(2022, 1, 31), None),
+    (None, date(2021, 12, 21)),
+])
+def test_well_state_index_matches_rows(tmp_path, date_after, date_end):
+    write_field(tmp_path)
+    expected = np.sort(read_well_states(tmp_path, ['well.ois'], date_after, 'В работе', 'Нефтяные',
+                                        date_end)['well.ois'].unique())
+    assert np.array_equal(read_wells_in_state(tmp_path, date_after, 'В работе', 'Нефтяные', date_end), expected)
+
+    write_field_indexes(tmp_path)
+
+    assert index_path(tmp_path, 'well_states.feather').exists()
+    assert np.array_equal(read_wells_in_state(tmp_path, date_after, 'В работе', 'Нефтяные', date_end), expected)
+
+
+def test_well_state_index_merges_consecutive_days():
+    states = pd.DataFrame({
+        'dt': [date(2022, 1, 1) + timedelta(days=day) for day in (0, 1, 2, 4, 5, 6)],
+        'well.ois': [1] * 6,
+        'sost': ['В работе', 'В работе', 'В работе', 'В работе', 'Остановлена', 'В работе'],
+        'charwork.name': ['Нефтяные'] * 6,
+    })
+
+    index = build_well_state_index(states)
+
+    assert list(index['sost']) == ['В работе', 'В работе', 'В работе', 'Остановлена']
+    assert list(index['dt_start'].dt.day) == [1, 5, 7, 6]
+    assert list(index['dt_end'].dt.day) == [3, 5, 7, 6]
+
+
+def test_stale_index_is_not_used(tmp_path):
+    write_field(tmp_path)
+    write_field_indexes(tmp_path)
+    welllist = pd.DataFrame({'ois': [1, 2], 'num': ['201', '202'], 'npath': [0, 0], 'ceh': ['ЦДНГ-1'] * 2})
+    feather.write_feather(welllist, str(tmp_path / 'welllist.feather'))
+
+    index = get_well_name_index(tmp_path)
+
+    assert index.ois_to_normal == {1: '201', 2: '202'}
+
+
+def test_well_name_index_from_persisted_index(tmp_path):
+    write_field(tmp_path)
+    write_field_indexes(tmp_path)
+
+    index = get_well_name_index(tmp_path)
+
+    assert index.ois_to_normal == {1: '101', 2: '102'}
+    assert index.normal_to_ois == {'101': 1, '102': 2}
@@ -0,0 +1,42 @@
+import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+
+pytest.importorskip('tools_preprocessor')
+
+from UI import field_registry as field_registry_module
+from UI.field_registry import INSTALL_MARKER, describe_field, field_registry, register_field
+
+
+@pytest.mark.parametrize('date_type', [pa.date32(), pa.timestamp('ns')])
+def test_describe_field_date_span(tmp_path, date_type):
+    welllist = pd.DataFrame({'ceh': ['ЦДНГ-1', 'ЦДНГ-1', 'ЦДНГ-2'], 'ois': [1, 2, 3]})
+    feather.write_feather(welllist, str(tmp_path / 'welllist.feather'))
+    dates = pa.array([datetime.date(2021, 3, 1), datetime.date(2020, 1, 31)]).cast(date_type)
+    feather.write_feather(pa.table({'dt': dates, 'well.ois': [1, 2]}), str(tmp_path / 'sh_sost_fond.feather'))
+
+    entry = describe_field(tmp_path)
+
+    assert entry['date_span'] == ['2020-01-31', '2021-03-01']
+    assert entry['n_wells'] == 3
+    assert sorted(entry['files']) == ['sh_sost_fond.feather', 'welllist.feather']
+
+
+def test_field_is_hidden_while_installing(tmp_path, monkeypatch):
+    monkeypatch.setattr(field_registry_module.Preprocessor, '_path_general', tmp_path / 'data', raising=False)
+    monkeypatch.setattr(field_registry_module, 'REGISTRY_PATH', tmp_path / 'fields.json')
+    monkeypatch.setattr(field_registry_module, '_registry', {})
+    field_path = tmp_path / 'data' / 'Крайнее'
+    field_path.mkdir(parents=True)
+    feather.write_feather(pd.DataFrame({'ceh': ['ЦДНГ-1'], 'ois': [1]}), str(field_path / 'welllist.feather'))
+    assert list(field_registry()) == ['Крайнее']
+
+    (field_path / INSTALL_MARKER).touch()
+    assert field_registry() == {}
+    assert register_field('Крайнее') is None
+
+    (field_path / INSTALL_MARKER).unlink()
+    assert field_registry()['Крайнее']['n_wells'] == 1
@@ -0,0 +1,39 @@
+import pandas as pd
+import pyarrow.feather as feather
+import pytest
+
+pytest.importorskip('tools_preprocessor')
+
+from UI import field_registry as field_registry_module
+from UI import ingest
+from UI.field_data import read_wells_in_state
+from UI.field_indexes import index_path
+from UI.field_registry import INSTALL_MARKER, field_registry
+
+
+def test_ingest_builds_indexes_and_registers_field(tmp_path, monkeypatch):
+    for module in (ingest, field_registry_module):
+        monkeypatch.setattr(module.Preprocessor, '_path_general', tmp_path / 'data', raising=False)
+    monkeypatch.setattr(field_registry_module, 'REGISTRY_PATH', tmp_path / 'fields.json')
+    monkeypatch.setattr(field_registry_module, '_registry', {})
+    (tmp_path / 'data').mkdir()
+    upload_dir = tmp_path / 'upload'
+    upload_dir.mkdir()
+    welllist = pd.DataFrame({'ois': [1, 2], 'num': ['101', '102'], 'npath': [0, 0], 'ceh': ['ЦДНГ-1'] * 2})
+    feather.write_feather(welllist, str(upload_dir / 'welllist.feather'))
+    states = pd.DataFrame({'dt': pd.to_datetime(['2022-01-01', '2022-01-02']), 'well.ois': [1, 2],
+                           'sost': ['В работе', 'Остановлена'], 'charwork.name': ['Нефтяные'] * 2})
+    feather.write_feather(states, str(upload_dir / 'sh_sost_fond.feather'))
+    progress = []
+
+    entry = ingest.ingest_field('Крайнее', upload_dir, lambda stage, status: progress.append((stage, status)))
+
+    field_path = tmp_path / 'data' / 'Крайнее'
+    assert entry['n_wells'] == 2
+    assert not (field_path / INSTALL_MARKER).exists()
+    assert index_path(field_path, 'well_names.feather').exists()
+    assert index_path(field_path, 'well_states.feather').exists()
+    assert list(read_wells_in_state(field_path, sost='В работе')) == [1]
+    assert list(field_registry()) == ['Крайнее']
+    assert ('Построение индексов скважин', 'done') in progress
+    assert not upload_dir.exists()
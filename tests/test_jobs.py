@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip('frameworks_hybrid_crm_ml')
+
+from UI import jobs
+from UI.app_state import RunState
+from UI.jobs import STALE_JOB_ERROR, JobQueue
+
+
+def test_finish_keeps_job_failed_by_recover_stale(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, 'JOBS_DIR', tmp_path)
+    queue = JobQueue(tmp_path / 'jobs.sqlite')
+    job_id = queue.submit({'field_name': 'Крайнее'})
+    queue.claim()
+    # Воркер, забравший задачу, не отмечался: задача считается зависшей
+    assert queue.recover_stale() == 1
+
+    assert not queue.finish(job_id, RunState(run_id='run'))
+
+    job = queue.get(job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == STALE_JOB_ERROR
+    assert not (tmp_path / 'results' / f'{job_id}.zip').exists()
+
+
+def test_finish_ingest_marks_running_job_done(tmp_path):
+    queue = JobQueue(tmp_path / 'jobs.sqlite')
+    job_id = queue.submit({'field_name': 'Крайнее'}, kind='ingest')
+    queue.claim('ingest')
+
+    assert queue.finish_ingest(job_id)
+    assert queue.get(job_id)['status'] == 'done'
+    assert not queue.finish_ingest(job_id)
@@ -0,0 +1,21 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip('tools_preprocessor')
+
+from UI import result_cache
+
+
+def test_save_keeps_index_name(tmp_path, monkeypatch):
+    monkeypatch.setattr(result_cache, 'RESULT_CACHE_DIR', tmp_path)
+    index = pd.Index(pd.date_range('2021-01-01', periods=3, freq='D').date, name='dt')
+    frame = pd.DataFrame({'1_liq_true': [1.0, 2.0, 3.0], 2: [4.0, 5.0, 6.0]}, index=index)
+
+    result_cache.save('key', {'frame': frame})
+
+    assert frame.index.name == 'dt'
+    assert index.name == 'dt'
+    assert list(frame.columns) == ['1_liq_true', 2]
+    loaded = result_cache.load('key')['frame']
+    assert loaded.index.name == 'dt'
+    assert list(loaded.columns) == ['1_liq_true', 2]
@@ -0,0 +1,91 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('frameworks_hybrid_crm_ml')
+
+from UI.app_state import RunState
+from UI.run_archive import page_in, read_run_archive, write_run_archive
+from UI.statistics_store import KINDS, StatisticsStore
+
+DATES = pd.date_range('2021-01-01', periods=10, freq='D').date
+
+
+def make_state() -> RunState:
+    rng = np.random.default_rng(2)
+    frames = {}
+    for model in ('ftor', 'ensemble'):
+        kinds = KINDS if model == 'ensemble' else ('true', 'pred')
+        columns = [f'{well}_{quantity}_{kind}' for well in ('101', '102') for quantity in ('liq', 'oil')
+                   for kind in kinds]
+        frames[model] = pd.DataFrame(rng.random((len(DATES), len(columns))), index=DATES, columns=columns)
+    # Интервал ансамбля известен только за дни ансамбля
+    interval_columns = [column for column in frames['ensemble'].columns if column.endswith(('_lower', '_upper'))]
+    frames['ensemble'].loc[DATES[:4], interval_columns] = np.nan
+    statistics = StatisticsStore(frames)
+    return RunState(
+        run_id='run',
+        statistics=statistics,
+        adapt_params={'101': [{'name': 'k', 'value': 1.5}]},
+        models_weights={'liq': {'101': {'ftor': 0.25, 'wolfram': 0.75}, '102': {'ftor': 1.0, 'wolfram': 0.0}}},
+        fingerprints={'ftor': 'abc'},
+        exclude_wells=['102'],
+        selected_wells_norm=['101', '102'],
+        selected_wells_ois=[2001, 2002],
+        wellnames_key_normal={'101': 2001, '102': 2002},
+        wellnames_key_ois={2001: '101', 2002: '102'},
+        was_calc_ftor=True,
+        was_calc_ensemble=True,
+        was_date_start=date(2021, 1, 1),
+        was_date_test=date(2021, 1, 5),
+        was_date_test_if_ensemble=date(2021, 1, 5),
+        was_date_end=date(2021, 1, 10),
+        coeff_f=pd.DataFrame({'101': [0.1, 0.2]}, index=['102', '103']),
+        wells_coords_CRM=pd.DataFrame(),
+        ensemble_interval=statistics.frame('ensemble', kinds=('lower', 'upper')).iloc[4:],
+    )
+
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_run_archive_round_trip(tmp_path, lazy):
+    state = make_state()
+    path = tmp_path / 'run.zip'
+    write_run_archive(state, path)
+
+    restored = read_run_archive(path, lazy=lazy)
+    if lazy:
+        assert not restored.statistics.is_loaded('ftor')
+        page_in(restored)
+        assert restored.statistics.is_loaded('ftor')
+
+    assert list(restored.statistics) == list(state.statistics)
+    for model in state.statistics:
+        expected = state.statistics.frame(model, kinds=KINDS)
+        result = restored.statistics.frame(model, kinds=KINDS)
+        np.testing.assert_array_equal(result[expected.columns].to_numpy(), expected.to_numpy())
+        assert list(result.index) == list(expected.index)
+    assert restored.wellnames_key_ois == {2001: '101', 2002: '102'}
+    assert restored.wellnames_key_normal == {'101': 2001, '102': 2002}
+    assert restored.models_weights == state.models_weights
+    assert restored.adapt_params == state.adapt_params
+    assert restored.exclude_wells == ['102']
+    assert restored.was_date_test == date(2021, 1, 5)
+    pd.testing.assert_frame_equal(restored.coeff_f, state.coeff_f)
+    np.testing.assert_array_equal(restored.ensemble_interval.to_numpy(), state.ensemble_interval.to_numpy())
+    assert list(restored.ensemble_interval.index) == list(DATES[4:])
+
+
+def test_lazy_archive_reads_one_well(tmp_path):
+    state = make_state()
+    path = tmp_path / 'run.zip'
+    write_run_archive(state, path)
+
+    restored = read_run_archive(path, lazy=True)
+    well_frame = restored.statistics.well_frame('ftor', '102')
+
+    assert not restored.statistics.is_loaded('ftor')
+    assert sorted(well_frame.columns) == ['102_liq_pred', '102_liq_true', '102_oil_pred', '102_oil_true']
+    np.testing.assert_array_equal(well_frame['102_oil_pred'].to_numpy(),
+                                  state.statistics['ftor']['102_oil_pred'].to_numpy())
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from UI.statistics_store import KINDS, ModelBlock, PeriodView, StatisticsStore, filled_frames
+
+DATES = pd.date_range('2021-01-01', periods=6, freq='D').date
+
+
+def make_frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    columns = [f'{well}_{quantity}_{kind}' for well in ('101', '2_bis') for quantity in ('liq', 'oil')
+               for kind in ('true', 'pred')]
+    frame = pd.DataFrame(rng.random((len(DATES), len(columns))), index=DATES, columns=columns)
+    frame.iloc[0, 1] = np.nan
+    return frame
+
+
+def test_frame_round_trip():
+    frame = make_frame()
+    store = StatisticsStore({'ftor': frame})
+
+    assert store.block('ftor') is not None
+    pd.testing.assert_frame_equal(store['ftor'], frame)
+    assert list(store.columns('ftor')) == list(frame.columns)
+
+
+def test_frame_round_trip_with_missing_columns():
+    frame = make_frame().drop(columns=['2_bis_oil_true', '2_bis_oil_pred', '101_liq_pred'])
+    store = StatisticsStore({'ftor': frame})
+
+    result = store['ftor']
+    assert sorted(result.columns) == sorted(frame.columns)
+    pd.testing.assert_frame_equal(result[frame.columns], frame)
+
+
+def test_interval_kinds_are_kept_apart():
+    frame = make_frame()
+    for column in list(frame.columns):
+        if column.endswith('_pred'):
+            frame[column.replace('_pred', '_lower')] = frame[column] - 1
+            frame[column.replace('_pred', '_upper')] = frame[column] + 1
+    store = StatisticsStore({'ensemble': frame})
+
+    assert store.block('ensemble').kinds == KINDS
+    assert all(column.endswith(('_true', '_pred')) for column in store['ensemble'].columns)
+    interval = store.frame('ensemble', kinds=('lower', 'upper'))
+    expected = frame[[column for column in frame.columns if column.endswith(('_lower', '_upper'))]]
+    pd.testing.assert_frame_equal(interval[expected.columns], expected)
+
+
+def test_non_standard_frame_is_stored_as_is():
+    frame = pd.DataFrame({'well': ['101', '102'], 'value': [1.0, 2.0]})
+    store = StatisticsStore({'user': frame})
+
+    assert store.block('user') is None
+    assert store['user'] is frame
+
+
+def test_model_block_from_frame_rejects_other_columns():
+    frame = make_frame()
+    frame['comment'] = 'x'
+    assert ModelBlock.from_frame(frame) is None
+
+
+def test_compact_keeps_values():
+    frame = make_frame()
+    frame.iloc[:2] = np.nan
+    store = StatisticsStore({'ftor': frame})
+    store.compact()
+
+    block = store.block('ftor')
+    assert block.is_compact
+    assert len(block.dates) == len(DATES) - 2
+    pd.testing.assert_frame_equal(store['ftor'].astype(float), frame.iloc[2:], check_exact=False, rtol=1e-6)
+
+
+def test_write_after_compact_expands_period():
+    store = StatisticsStore({'ftor': make_frame()})
+    store.compact()
+    store.write('ftor', DATES, {('3', 'liq', 'pred'): pd.Series([5.0], index=DATES[:1])})
+
+    block = store.block('ftor')
+    assert not block.is_compact
+    assert store.series('ftor', '3', 'liq', 'pred').iloc[0] == 5.0
+
+
+def test_period_view_consecutive_days():
+    frame = make_frame()
+    store = StatisticsStore({'ftor': frame})
+    dates = pd.date_range(DATES[2], DATES[4], freq='D')
+    view = PeriodView(store, dates)
+
+    result = view['ftor']
+    assert list(result.index) == list(dates)
+    np.testing.assert_array_equal(result.to_numpy(), frame.iloc[2:5].to_numpy())
+
+
+def test_period_view_days_outside_model():
+    store = StatisticsStore({'ftor': make_frame()})
+    dates = pd.date_range(DATES[-2], periods=4, freq='D')
+    view = PeriodView(store, dates)
+
+    result = view['ftor']
+    assert list(result.index) == list(dates)
+    assert result.iloc[2:].isna().all().all()
+    assert not filled_frames(view)['ftor'].isna().any().any()
+
+
+def test_period_view_keeps_added_frames():
+    store = StatisticsStore({'ftor': make_frame()})
+    view = PeriodView(store, pd.date_range(DATES[0], DATES[1], freq='D'))
+    user_frame = pd.DataFrame({'101_liq_pred': [1.0]})
+    view['user'] = user_frame
+
+    assert view['user'] is user_frame
+    assert list(view) == ['user', 'ftor']
+    assert len(view) == 2
+    assert 'user' not in store
+
+
+@pytest.mark.parametrize('kinds', [('true', 'pred'), KINDS])
+def test_well_frame_matches_model_frame(kinds):
+    frame = make_frame()
+    store = StatisticsStore({'ftor': frame})
+
+    well_frame = store.well_frame('ftor', '2_bis', kinds)
+    expected = frame[[column for column in frame.columns if column.startswith('2_bis_')]]
+    pd.testing.assert_frame_equal(well_frame[expected.columns], expected, check_names=False)